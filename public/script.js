@@ -11,6 +11,9 @@ const PREVIEW_WIDTH = 100;
 const PREVIEW_HEIGHT = 100;
 const CROPPER_BACKGROUND_GRAY = 'rgb(46, 46, 46)';
 const MONTHS_FR_ABBR = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"];
+const THESAURUS_URL = '/lib/hashtag-thesaurus.json';
+const THESAURUS_SHARDS_URL = '/lib/hashtag-thesaurus/'; // Fragments + manifest.json (scripts/thesaurus_fragments.py)
+const THESAURUS_AUTOMATON_URL = '/lib/hashtag-thesaurus.automate.json'; // Automate des clés (scripts/automate_thesaurus.py)
 
 let app = null;
 
@@ -6510,15 +6513,41 @@ class HashtagManager {
         this.container = document.getElementById('hashtagContainer');
         this.insertBtn = document.getElementById('insertHashtagsBtn');
         this.cancelBtn = document.getElementById('cancelHashtagsBtn');
-        this.thesaurus = null; // Le dictionnaire sera chargé ici
+        this.thesaurus = null; // Le dictionnaire (ou ses fragments déjà chargés) sera chargé ici
+        this.shardIndex = null; // Préfixe de clé -> nom du fragment, si le dictionnaire est fragmenté
+        this.prefixLength = 0;
+        this.shardLoads = new Map(); // Nom du fragment -> promesse de chargement
+        this.shardKeysHash = null; // Empreinte des clés du dictionnaire fragmenté
+        this.automaton = null; // Automate Aho-Corasick des clés, s'il correspond au dictionnaire
 
         this._initListeners();
-        this._loadThesaurus(); // Charger le dictionnaire au démarrage
+        this.thesaurusLoading = this._loadThesaurus().then(() => this._loadAutomaton()); // Charger le dictionnaire au démarrage
+    }
+
+    _normalize(text) {
+        return text.toLowerCase().normalize("NFD").replace(/[\u0300-\u036f]/g, "");
     }
 
     async _loadThesaurus() {
+        // Dictionnaire fragmenté : seul le manifeste est chargé, les fragments le sont à la demande
+        try {
+            const response = await fetch(`${THESAURUS_SHARDS_URL}manifest.json`);
+            if (response.ok) {
+                const manifest = await response.json();
+                this.prefixLength = manifest.longueur_prefixe;
+                this.shardKeysHash = manifest.empreinte_cles;
+                this.shardIndex = new Map(Object.entries(manifest.prefixes)
+                    .map(([prefix, index]) => [prefix, manifest.fragments[index]]));
+                this.thesaurus = {};
+                console.log(`📚 Manifeste du dictionnaire de hashtags chargé (${manifest.entrees} entrées, ${manifest.fragments.length} fragments).`);
+                return;
+            }
+        } catch (error) {
+            // Pas de manifeste exploitable : dictionnaire complet
+        }
+
         try {
-            const response = await fetch('/lib/hashtag-thesaurus.json');
+            const response = await fetch(THESAURUS_URL);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -6531,6 +6560,106 @@ class HashtagManager {
         }
     }
 
+    async _loadAutomaton() {
+        try {
+            const response = await fetch(THESAURUS_AUTOMATON_URL);
+            if (!response.ok) return; // Pas d'automate : recherche clé par clé
+            const automaton = await response.json();
+            // Un automate d'une autre génération que le dictionnaire (ex. dictionnaire modifié à la main) est ignoré
+            const matches = this.shardIndex
+                ? automaton.empreinte_cles === this.shardKeysHash
+                : automaton.cles.length === Object.keys(this.thesaurus).length
+                    && automaton.cles.every(key => Object.prototype.hasOwnProperty.call(this.thesaurus, key));
+            if (!matches) {
+                console.warn("L'automate des clés ne correspond pas au dictionnaire de hashtags : recherche clé par clé.");
+                return;
+            }
+            this.automaton = {
+                keys: automaton.cles,
+                symbols: new Map(automaton.alphabet.map((char, index) => [char, index])),
+                edgeStart: Int32Array.from(automaton.debut_aretes),
+                edgeSymbols: Int32Array.from(automaton.symboles),
+                edgeTargets: Int32Array.from(automaton.cibles),
+                fail: Int32Array.from(automaton.echecs),
+                outputStart: Int32Array.from(automaton.debut_sorties),
+                outputs: Int32Array.from(automaton.sorties),
+                nextOutput: Int32Array.from(automaton.suivantes)
+            };
+            console.log(`🔤 Automate des clés chargé (${automaton.echecs.length} états).`);
+        } catch (error) {
+            console.warn("Impossible de charger l'automate des clés:", error.message);
+        }
+    }
+
+    _transition(state, symbol) {
+        // Recherche dichotomique parmi les transitions de l'état (symboles croissants)
+        const { edgeStart, edgeSymbols, edgeTargets } = this.automaton;
+        let low = edgeStart[state];
+        let high = edgeStart[state + 1];
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (edgeSymbols[middle] < symbol) low = middle + 1;
+            else high = middle;
+        }
+        return low < edgeStart[state + 1] && edgeSymbols[low] === symbol ? edgeTargets[low] : -1;
+    }
+
+    _matchKeys(normalizedText) {
+        // Un seul passage sur le texte : toutes les clés (ou leurs formes normalisées) présentes, dans l'ordre du dictionnaire
+        const { keys, symbols, fail, outputStart, outputs, nextOutput } = this.automaton;
+        const found = new Set(outputs.subarray(outputStart[0], outputStart[1])); // Clé vide
+        let state = 0;
+        for (const char of normalizedText) {
+            const symbol = symbols.get(char);
+            if (symbol === undefined) {
+                state = 0;
+                continue;
+            }
+            let next = this._transition(state, symbol);
+            while (next === -1 && state !== 0) {
+                state = fail[state];
+                next = this._transition(state, symbol);
+            }
+            state = Math.max(next, 0);
+            for (let match = nextOutput[state]; match !== -1; match = nextOutput[fail[match]]) {
+                for (let i = outputStart[match]; i < outputStart[match + 1]; i++) found.add(outputs[i]);
+            }
+        }
+        return [...found].sort((a, b) => a - b).map(index => keys[index]);
+    }
+
+    _shardsForText(normalizedText) {
+        // Une clé ne peut apparaître dans le texte que si son préfixe y apparaît aussi
+        const chars = Array.from(normalizedText);
+        const shards = new Set();
+        for (let length = 1; length <= this.prefixLength; length++) {
+            for (let i = 0; i + length <= chars.length; i++) {
+                const shard = this.shardIndex.get(chars.slice(i, i + length).join(''));
+                if (shard) shards.add(shard);
+            }
+        }
+        return shards;
+    }
+
+    async _loadShards(shards) {
+        await Promise.all([...shards].map(shard => {
+            if (!this.shardLoads.has(shard)) {
+                const loading = fetch(THESAURUS_SHARDS_URL + shard)
+                    .then(response => {
+                        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                        return response.json();
+                    })
+                    .then(entries => Object.assign(this.thesaurus, entries))
+                    .catch(error => {
+                        console.warn(`Impossible de charger le fragment ${shard} du dictionnaire de hashtags:`, error.message);
+                        this.shardLoads.delete(shard); // Nouvel essai à la prochaine génération
+                    });
+                this.shardLoads.set(shard, loading);
+            }
+            return this.shardLoads.get(shard);
+        }));
+    }
+
     _initListeners() {
         this.insertBtn.addEventListener('click', () => this._insertSelectedHashtags());
         this.cancelBtn.addEventListener('click', () => this.hide());
@@ -6545,7 +6674,7 @@ class HashtagManager {
     }
 
     async generateAndShow(text) {
-        if (!this.thesaurus) await this._loadThesaurus();
+        await this.thesaurusLoading;
 
         // Garde de sécurité pour la librairie NLP
         if (!window.nlp || typeof window.nlp.generateHashtags !== 'function') {
@@ -6559,14 +6688,31 @@ class HashtagManager {
         const keywordsFromNLP = window.nlp.generateHashtags(text);
 
         const suggestedHashtags = new Map();
-        const normalizedText = text.toLowerCase().normalize("NFD").replace(/[\u0300-\u036f]/g, "");
-
-        // 2. Enrichir avec le thésaurus en cherchant les mots-clés du thésaurus dans le texte
-        for (const [key, value] of Object.entries(this.thesaurus)) {
-            if (normalizedText.includes(key)) {
-                value.h.forEach(tag => suggestedHashtags.set(tag, value.p));
+        const normalizedText = this._normalize(text);
+
+        // 2. Enrichir avec le thésaurus en cherchant les mots-clés du thésaurus (ou leur forme normalisée) dans le texte
+        let entries;
+        if (this.automaton) {
+            const keys = this._matchKeys(normalizedText);
+            if (this.shardIndex) {
+                const shards = keys.map(key => this.shardIndex.get(Array.from(this._normalize(key)).slice(0, this.prefixLength).join('')));
+                await this._loadShards(new Set(shards.filter(Boolean)));
+            }
+            entries = keys
+                .filter(key => Object.prototype.hasOwnProperty.call(this.thesaurus, key))
+                .map(key => [key, this.thesaurus[key]]);
+        } else {
+            if (this.shardIndex) await this._loadShards(this._shardsForText(normalizedText));
+            entries = Object.entries(this.thesaurus)
+                .filter(([key]) => normalizedText.includes(key) || normalizedText.includes(this._normalize(key)));
+            if (this.shardIndex) {
+                // Priorités décroissantes, comme dans le fichier complet (quel que soit l'ordre d'arrivée des fragments)
+                entries.sort((a, b) => b[1].p - a[1].p);
             }
         }
+        for (const [, value] of entries) {
+            value.h.forEach(tag => suggestedHashtags.set(tag, value.p));
+        }
 
         // 3. Ajouter les mots-clés extraits par NLP (avec une priorité plus basse)
         keywordsFromNLP.forEach(keyword => {
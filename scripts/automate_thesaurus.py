@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Automate Aho-Corasick des clés du thésaurus, chargé par `HashtagManager` (public/script.js).
+
+Le client normalise le texte analysé (minuscules, décomposition NFD, diacritiques
+U+0300-U+036F retirés) puis cherche chaque clé du thésaurus dans ce texte. L'automate
+reconnaît toutes les clés en un seul passage sur le texte, au lieu d'un test de sous-chaîne
+par clé. Chaque clé y figure telle quelle et sous sa forme normalisée (`Mariée` ->
+`mariee`) : une clé accentuée correspond aussi au texte normalisé.
+
+L'automate est sérialisé en tableaux plats (JSON), parcourus par caractère (point de code) :
+
+- `alphabet` : caractères des clés, dans l'ordre des numéros de symbole ;
+- `debut_aretes`, `symboles`, `cibles` : transitions de chaque état (lignes compressées,
+  symboles croissants, recherche dichotomique) ;
+- `echecs` : lien d'échec de chaque état (plus long suffixe propre présent dans l'arbre) ;
+- `debut_sorties`, `sorties` : numéros des clés reconnues en chaque état ;
+- `suivantes` : état le plus proche, sur la chaîne des liens d'échec en partant de l'état
+  lui-même, qui reconnaît une clé (-1 si aucun) ;
+- `cles` : clés dans l'ordre du thésaurus, et leur empreinte `empreinte_cles`.
+
+Avant l'écriture, l'automate relu depuis ses tableaux est comparé à la recherche naïve
+(`cle in texte`) sur un corpus de test.
+"""
+
+import hashlib
+import json
+import os
+import random
+import unicodedata
+from collections import deque
+
+
+def normaliser(texte):
+    """Normalise comme le client : `toLowerCase().normalize("NFD")` sans les diacritiques U+0300-U+036F."""
+    return ''.join(c for c in unicodedata.normalize('NFD', texte.lower()) if not '\u0300' <= c <= '\u036f')
+
+
+def empreinte_cles(cles):
+    """Empreinte (SHA-256) de la liste des clés, partagée par l'automate et le manifeste des fragments."""
+    return hashlib.sha256(json.dumps(list(cles), ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def compiler_automate(cles):
+    """Construit l'automate des `cles` (et de leurs formes normalisées) en tableaux plats."""
+    cles = list(cles)
+    enfants, sorties = [{}], [[]]
+    for numero, cle in enumerate(cles):
+        for motif in dict.fromkeys((cle, normaliser(cle))):
+            etat = 0
+            for caractere in motif:
+                if caractere not in enfants[etat]:
+                    enfants[etat][caractere] = len(enfants)
+                    enfants.append({})
+                    sorties.append([])
+                etat = enfants[etat][caractere]
+            if numero not in sorties[etat]:
+                sorties[etat].append(numero)
+
+    # Liens d'échec en largeur : le lien d'un état est calculé après celui de son parent
+    echecs = [0] * len(enfants)
+    suivantes = [-1] * len(enfants)
+    file = deque(enfants[0].values())
+    while file:
+        etat = file.popleft()
+        suivantes[etat] = etat if sorties[etat] else suivantes[echecs[etat]]
+        for caractere, enfant in enfants[etat].items():
+            repli = echecs[etat]
+            while repli and caractere not in enfants[repli]:
+                repli = echecs[repli]
+            # Les enfants de la racine n'ont pas de suffixe propre : lien vers la racine
+            echecs[enfant] = enfants[repli].get(caractere, 0) if etat else 0
+            file.append(enfant)
+
+    alphabet = sorted({caractere for transitions in enfants for caractere in transitions})
+    symbole = {caractere: i for i, caractere in enumerate(alphabet)}
+    debut_aretes, symboles, cibles = [0], [], []
+    debut_sorties, liste_sorties = [0], []
+    for etat, transitions in enumerate(enfants):
+        for caractere, enfant in sorted(transitions.items(), key=lambda item: symbole[item[0]]):
+            symboles.append(symbole[caractere])
+            cibles.append(enfant)
+        debut_aretes.append(len(symboles))
+        liste_sorties.extend(sorted(sorties[etat]))
+        debut_sorties.append(len(liste_sorties))
+    return {"version": 1, "cles": cles, "empreinte_cles": empreinte_cles(cles),
+            "alphabet": alphabet, "debut_aretes": debut_aretes, "symboles": symboles, "cibles": cibles,
+            "echecs": echecs, "debut_sorties": debut_sorties, "sorties": liste_sorties,
+            "suivantes": suivantes}
+
+
+def rechercher(automate, texte):
+    """Numéros (triés) des clés reconnues dans `texte` normalisé, comme le parcours du client."""
+    symbole = {caractere: i for i, caractere in enumerate(automate["alphabet"])}
+    debut_aretes, symboles, cibles = automate["debut_aretes"], automate["symboles"], automate["cibles"]
+    echecs, suivantes = automate["echecs"], automate["suivantes"]
+    debut_sorties, sorties = automate["debut_sorties"], automate["sorties"]
+
+    def transition(etat, s):
+        bas, haut = debut_aretes[etat], debut_aretes[etat + 1]
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            if symboles[milieu] < s:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        return cibles[bas] if bas < debut_aretes[etat + 1] and symboles[bas] == s else -1
+
+    # Clé vide : présente dans tout texte
+    trouvees = set(sorties[debut_sorties[0]:debut_sorties[1]])
+    etat = 0
+    for caractere in normaliser(texte):
+        s = symbole.get(caractere)
+        if s is None:
+            etat = 0
+            continue
+        suivant = transition(etat, s)
+        while suivant == -1 and etat:
+            etat = echecs[etat]
+            suivant = transition(etat, s)
+        etat = max(suivant, 0)
+        reconnu = suivantes[etat]
+        while reconnu != -1:
+            trouvees.update(sorties[debut_sorties[reconnu]:debut_sorties[reconnu + 1]])
+            reconnu = suivantes[echecs[reconnu]]
+    return sorted(trouvees)
+
+
+def corpus_de_test(cles, textes=(), nombre=500, graine=0):
+    """
+    Textes de vérification : `textes` fournis, plus `nombre` textes mêlant des clés (telles
+    quelles, en majuscules ou tronquées), des fragments de clés et du texte sans rapport.
+    """
+    generateur = random.Random(graine)
+    cles = list(cles)
+    corpus = list(textes)
+    remplissage = ["photo", "séance", "lumière", "été", "Paris", "et", "de", "la", "un", "2024", "!", "…"]
+    for _ in range(nombre if cles else 0):
+        morceaux = []
+        for _ in range(generateur.randint(1, 30)):
+            tirage = generateur.random()
+            if tirage < 0.3:
+                morceaux.append(generateur.choice(cles))
+            elif tirage < 0.4:
+                morceaux.append(generateur.choice(cles).upper())
+            elif tirage < 0.6:
+                cle = generateur.choice(cles)
+                morceaux.append(cle[:generateur.randint(0, len(cle))])
+            else:
+                morceaux.append(generateur.choice(remplissage))
+        corpus.append(generateur.choice(("", " ", "\n")).join(morceaux))
+    return corpus
+
+
+def verifier_automate(automate, corpus):
+    """Compare l'automate à la recherche naïve sur `corpus` ; renvoie le nombre de textes en désaccord."""
+    cles = automate["cles"]
+    formes = [(cle, normaliser(cle)) for cle in cles]
+    desaccords = 0
+    for texte in corpus:
+        texte_normalise = normaliser(texte)
+        attendues = [numero for numero, (cle, forme) in enumerate(formes)
+                     if cle in texte_normalise or forme in texte_normalise]
+        if rechercher(automate, texte) != attendues:
+            desaccords += 1
+    return desaccords
+
+
+def ecrire_automate(thesaurus, chemin, textes=()):
+    """
+    Compile les clés de `thesaurus`, vérifie l'automate sur un corpus de test (`textes` en
+    plus du corpus généré) et l'écrit dans `chemin`. En cas de désaccord, rien n'est écrit
+    (et un automate précédent est supprimé) : le client revient à la recherche naïve.
+    """
+    automate = compiler_automate(thesaurus)
+    # Vérification sur l'automate relu, tel que le client le recevra
+    contenu = json.dumps(automate, ensure_ascii=False, separators=(',', ':'))
+    corpus = corpus_de_test(automate["cles"], textes)
+    desaccords = verifier_automate(json.loads(contenu), corpus)
+    if desaccords:
+        print(f"❌ Automate des clés en désaccord avec la recherche naïve sur {desaccords} textes : non écrit.")
+        if os.path.exists(chemin):
+            os.remove(chemin)
+        return None
+    with open(chemin + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(contenu)
+    os.replace(chemin + '.tmp', chemin)
+    print(f"🔤 Automate des clés écrit dans '{chemin}' ({len(automate['echecs']):,} états, "
+          f"vérifié sur {len(corpus):,} textes).")
+    return automate
\ No newline at end of file
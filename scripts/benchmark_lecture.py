@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compare les moteurs de lecture du fichier HIERTAGS (`pandas` et `mmap`, voir `hiertags_mmap.py`).
+
+Chaque moteur parcourt le fichier entier par lots, dans un processus neuf (pour mesurer
+son pic de mémoire résidente indépendamment des autres), en filtrant sur `min_weight`
+comme le fait l'ingestion. Affiche la durée, le débit et le pic de mémoire de chacun.
+"""
+
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from hiertags_lecture import lire_plage
+from hiertags_mmap import MOTEURS, lire_plage_mmap
+
+
+def _mesurer(input_filename, moteur, min_weight, chunk_size, categoriel):
+    """Parcourt le fichier avec `moteur` ; renvoie (durée, lignes lues, lignes gardées, pic RSS en octets)."""
+    taille = os.path.getsize(input_filename)
+    debut = time.perf_counter()
+    lues = gardees = 0
+    if moteur == "mmap":
+        lots = lire_plage_mmap(input_filename, 0, taille, chunk_size, categoriel, min_weight)
+    else:
+        lots = lire_plage(input_filename, 0, taille, chunk_size, categoriel)
+    for chunk, _ in lots:
+        lues += chunk.attrs.get("lignes", len(chunk))
+        gardees += int((chunk['weight'] >= min_weight).sum())
+    duree = time.perf_counter() - debut
+    return duree, lues, gardees, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def comparer_moteurs(input_filename="flickr_tag_co-occurrence_network.tsv",
+                     min_weight=0.1,
+                     chunk_size=500000,
+                     categoriel=True,  # Tags en type `category`, comme le format "entiers"
+                     repetitions=3):
+    """Mesure chaque moteur `repetitions` fois (meilleure durée retenue) et affiche la comparaison."""
+    print(f"⏱️ Comparaison des moteurs de lecture sur '{input_filename}' "
+          f"({os.path.getsize(input_filename) / 1024 / 1024:,.0f} Mo, min_weight = {min_weight})...")
+    resultats = {}
+    for moteur in MOTEURS:
+        mesures = []
+        for _ in range(repetitions):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                mesures.append(executor.submit(_mesurer, input_filename, moteur, min_weight,
+                                               chunk_size, categoriel).result())
+        duree, lues, gardees, pic = min(mesures)
+        resultats[moteur] = duree
+        print(f"  {moteur:>7} : {duree:6.2f} s, {lues / duree:12,.0f} lignes/s, "
+              f"{gardees:,}/{lues:,} lignes gardées, pic mémoire {pic / 1024 / 1024:,.0f} Mo")
+    print(f"🏁 mmap / pandas : ×{resultats['pandas'] / resultats['mmap']:.2f}")
+    return resultats
+
+
+if __name__ == "__main__":
+    import sys
+    comparer_moteurs(*sys.argv[1:2])
\ No newline at end of file
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Échantillonnage reproductible du fichier HIERTAGS, pour itérer vite sur le thésaurus.
+
+Le fichier est lu une seule fois, en flux. Chaque ligne reçoit une clé aléatoire tirée
+d'un générateur initialisé par `graine` (dans l'ordre du fichier : le résultat ne dépend
+pas de la taille des lots) :
+
+- `reservoir` : les `taille` lignes de plus petites clés, soit un échantillon uniforme
+                sans remise ;
+- `strates`   : un réservoir par classe de poids (`statistiques_poids.SEUILS`), puis une
+                allocation proportionnelle à l'effectif de chaque classe : la distribution
+                des poids, donc la part des relations gardées par `min_weight`, est celle
+                du fichier complet ;
+- avec une `taille` inférieure à 1, chaque ligne est gardée avec cette probabilité.
+
+`estimer_similarite` estime ensuite, sans construction complète, la ressemblance entre
+le thésaurus obtenu sur l'échantillon et celui du fichier entier.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from hiertags_compression import lire_lots
+from statistiques_poids import SEUILS
+
+METHODES = ("reservoir", "strates")
+
+
+def _garder_plus_petites(candidats, taille):
+    """Garde, dans chaque strate, les `taille` lignes de plus petites clés."""
+    candidats = candidats.sort_values(['strate', 'cle'], kind='stable')
+    rangs = candidats.groupby('strate', sort=False).cumcount().to_numpy()
+    return candidats[rangs < taille]
+
+
+def _allouer(effectifs, taille):
+    """Répartit `taille` lignes entre les strates proportionnellement à leurs effectifs (plus forts restes)."""
+    parts = taille * effectifs / max(effectifs.sum(), 1)
+    allocation = np.floor(parts).astype(np.int64)
+    restes = np.argsort(-(parts - allocation), kind='stable')[:taille - allocation.sum()]
+    allocation[restes] += 1
+    return np.minimum(allocation, effectifs)
+
+
+def echantillonner(input_filename, output_filename="hiertags_echantillon.tsv",
+                   taille=100000,  # Nombre de lignes, ou proportion des lignes si < 1
+                   methode="reservoir",  # "reservoir" (uniforme) ou "strates" (par classe de poids)
+                   graine=0,
+                   chunk_size=500000):
+    """
+    Écrit un échantillon du fichier HIERTAGS (lignes dans l'ordre d'origine) au format TSV.
+
+    Renvoie un dictionnaire {lignes, echantillon, taux} : nombre de lignes lues, gardées,
+    et taux d'échantillonnage effectif.
+    """
+    if methode not in METHODES:
+        raise ValueError(f"Méthode inconnue : '{methode}' (attendu : {', '.join(METHODES)})")
+
+    print(f"🎲 Échantillonnage de '{input_filename}' ({methode}, taille {taille:g}, graine {graine})...")
+    rng = np.random.default_rng(graine)
+    bornes = np.asarray(SEUILS, dtype=np.float64)
+    effectifs = np.zeros(len(bornes) + 1, dtype=np.int64)
+    gardes, lignes = [], 0
+
+    for chunk, _ in lire_lots(input_filename, chunk_size):
+        cles = rng.random(len(chunk))
+        if taille < 1:
+            gardes.append(chunk[cles < taille])
+            lignes += len(chunk)
+            continue
+
+        # Strate 0 : poids négatifs ou manquants ; strates suivantes : classes de poids
+        if methode == "strates":
+            poids = chunk['weight'].to_numpy(dtype=np.float64)
+            strates = np.searchsorted(bornes, np.nan_to_num(poids, nan=-np.inf), side='right')
+        else:
+            strates = np.zeros(len(chunk), dtype=np.int64)
+        effectifs += np.bincount(strates, minlength=len(effectifs))
+
+        chunk = chunk.assign(cle=cles, strate=strates, rang=np.arange(lignes, lignes + len(chunk)))
+        gardes = [_garder_plus_petites(pd.concat(gardes + [chunk], ignore_index=True), taille)]
+        lignes += len(chunk)
+
+    if gardes:
+        echantillon = pd.concat(gardes, ignore_index=True)
+    else:
+        echantillon = pd.DataFrame(columns=['tag1', 'tag2', 'weight'])
+    if taille >= 1 and len(echantillon):
+        allocation = _allouer(effectifs, int(taille))
+        echantillon = echantillon.sort_values(['strate', 'cle'], kind='stable')
+        rangs = echantillon.groupby('strate', sort=False).cumcount().to_numpy()
+        echantillon = echantillon[rangs < allocation[echantillon['strate'].to_numpy()]]
+        echantillon = echantillon.sort_values('rang')
+
+    echantillon[['tag1', 'tag2', 'weight']].to_csv(output_filename, sep='\t', header=False, index=False)
+    taux = len(echantillon) / max(lignes, 1)
+    print(f"✅ {len(echantillon):,} lignes sur {lignes:,} ({taux:.2%}) écrites dans '{output_filename}'.")
+    return {"lignes": lignes, "echantillon": len(echantillon), "taux": taux}
+
+
+def _degres(relations, termes):
+    """Nombre de voisins distincts de chaque terme."""
+    deux_sens = pd.concat([relations[['tag1', 'tag2']],
+                           relations.rename(columns={'tag1': 'tag2', 'tag2': 'tag1'})[['tag1', 'tag2']]],
+                          ignore_index=True)
+    deux_sens = deux_sens[deux_sens['tag1'].isin(termes)].drop_duplicates()
+    degres = deux_sens['tag1'].value_counts()
+    return {terme: int(degres.get(terme, 0)) for terme in termes}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def estimer_similarite(echantillon_filename, termes, taux, min_weight=0.1, k=10):
+    """
+    Estime la similarité de Jaccard moyenne entre les `k` meilleurs voisins de chaque terme
+    dans l'échantillon et dans le fichier complet, sans construction complète.
+
+    Une relation de l'échantillon parmi les `k` meilleures du fichier complet y reste parmi
+    les `k` meilleures : l'intersection contient donc en moyenne `taux · k'` voisins, où
+    k' = min(k, degré complet), le degré complet étant estimé par degré observé / `taux`.
+    Seuls les termes présents dans l'échantillon sont comptés.
+    Renvoie (similarité moyenne, similarité par terme).
+    """
+    relations = pd.read_csv(echantillon_filename, sep='\t', header=None, names=['tag1', 'tag2', 'weight'],
+                            dtype={'tag1': str, 'tag2': str})
+    relations = relations[relations['weight'] >= min_weight]
+
+    similarites = {}
+    for terme, degre in _degres(relations, termes).items():
+        if not degre:
+            continue
+        voisins_complet = min(k, round(degre / taux))
+        voisins_echantillon = min(k, degre)
+        communs = min(taux * voisins_complet, voisins_echantillon)
+        similarites[terme] = communs / (voisins_complet + voisins_echantillon - communs)
+    if not similarites:
+        return 0.0, {}
+    return float(np.mean(list(similarites.values()))), similarites
+
+
+def comparer_thesaurus(thesaurus_file, reference_file):
+    """Renvoie la similarité de Jaccard moyenne des hashtags de chaque entrée entre deux thésaurus."""
+    with open(thesaurus_file, 'r', encoding='utf-8') as f:
+        thesaurus = json.load(f)
+    with open(reference_file, 'r', encoding='utf-8') as f:
+        reference = json.load(f)
+    entrees = set(thesaurus) | set(reference)
+    if not entrees:
+        return 1.0
+    return float(np.mean([_jaccard(set(thesaurus.get(e, {}).get("h", [])), set(reference.get(e, {}).get("h", [])))
+                          for e in entrees]))
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Expansion sémantique multi-sauts sur le graphe de co-occurrence HIERTAGS.
+
+Le stockage CSR (voir `hiertags_csr.py`) est chargé tel quel comme matrice creuse SciPy,
+sans analyse ni copie des relations. Pour tous les mots-clés à la fois, un PageRank
+personnalisé (ou une marche aléatoire de quelques pas) est calculé par produits
+matrice creuse × matrice dense : chaque itération traite un lot de graines en un seul
+produit, et les tags reliés indirectement (à deux sauts ou plus) sont classés avec les
+voisins directs.
+
+Les graines sont traitées par lots de colonnes dont la taille dépend du nombre de tags
+et de `memoire_mo` : seuls les `k` meilleurs tags de chaque graine sont gardés d'un lot
+à l'autre, si bien que la mémoire ne croît pas avec le nombre de mots-clés.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from hiertags_csr import RelationsCSR
+
+METHODES = ("ppr", "marche")
+
+# Matrices denses (n_tags × lot) présentes à la fois pendant une itération :
+# départ, scores, produit P^T × R et scores suivants
+MATRICES_PAR_LOT = 4
+
+# Mémoire allouée par défaut aux matrices denses d'un lot de graines (Mo)
+MEMOIRE_MO = 512
+
+
+def charger_matrice(relations):
+    """Renvoie la matrice d'adjacence pondérée (scipy.sparse.csr_matrix) d'un stockage `RelationsCSR`."""
+    n = len(relations)
+    return sparse.csr_matrix((relations.poids, relations.voisins_ids, relations.offsets), shape=(n, n))
+
+
+def matrice_transition(adjacence):
+    """
+    Normalise les lignes de la matrice d'adjacence (matrice de transition d'une marche aléatoire).
+
+    Renvoie la transposée de la matrice de transition, prête pour les produits P^T × R,
+    et le masque des tags sans voisins.
+    """
+    degres = np.asarray(adjacence.sum(axis=1)).ravel()
+    isoles = degres == 0
+    inverses = np.divide(1.0, degres, out=np.zeros_like(degres), where=~isoles)
+    transition = sparse.diags(inverses.astype(np.float32)) @ adjacence
+    return transition.T.tocsr(), isoles
+
+
+def scores_propagation(transition_t, isoles, graines, methode="ppr", alpha=0.15,
+                       iterations=30, pas=2, tolerance=1e-6):
+    """
+    Calcule, pour chaque graine (identifiant de tag), un score de proximité pour tous les tags.
+
+    - `ppr`    : PageRank personnalisé, avec une probabilité `alpha` de revenir à la graine
+                 à chaque pas (itérations jusqu'à convergence ou `iterations`)
+    - `marche` : somme des probabilités d'atteindre chaque tag en 1 à `pas` pas
+
+    Renvoie une matrice dense (n_tags × n_graines) : une colonne de scores par graine.
+    """
+    if methode not in METHODES:
+        raise ValueError(f"Méthode inconnue : '{methode}' (attendu : {', '.join(METHODES)})")
+
+    n = transition_t.shape[0]
+    depart = np.zeros((n, len(graines)), dtype=np.float32)
+    depart[graines, np.arange(len(graines))] = 1.0
+
+    if methode == "marche":
+        courant, scores = depart, np.zeros_like(depart)
+        for _ in range(pas):
+            courant = transition_t @ courant
+            scores += courant
+        return scores
+
+    scores = depart.copy()
+    for _ in range(iterations):
+        # La probabilité arrivée sur un tag sans voisins repart vers la graine
+        perdue = scores[isoles].sum(axis=0)
+        suivants = (1 - alpha) * (transition_t @ scores) + (alpha + (1 - alpha) * perdue) * depart
+        ecart = np.abs(suivants - scores).sum(axis=0).max()
+        scores = suivants
+        if ecart < tolerance:
+            break
+    return scores
+
+
+def taille_lot(n_tags, memoire_mo=MEMOIRE_MO):
+    """Nombre de graines par lot pour que les matrices denses float32 tiennent dans `memoire_mo` Mo."""
+    octets_par_graine = MATRICES_PAR_LOT * max(n_tags, 1) * np.dtype(np.float32).itemsize
+    return max(1, int(memoire_mo * 1024 * 1024) // octets_par_graine)
+
+
+def meilleurs_tags(scores, k):
+    """Renvoie, pour chaque colonne de `scores`, les indices de ses `k` plus grands scores positifs, triés."""
+    resultats = []
+    for j in range(scores.shape[1]):
+        colonne = scores[:, j]
+        candidats = np.flatnonzero(colonne > 0)
+        if len(candidats) > k:
+            candidats = candidats[np.argpartition(-colonne[candidats], k - 1)[:k]]
+        resultats.append(candidats[np.argsort(-colonne[candidats], kind='stable')])
+    return resultats
+
+
+def expansion_semantique(termes, csr_dir="hiertags_csr", k=10, methode="ppr", alpha=0.15,
+                         iterations=30, pas=2, relations=None, memoire_mo=MEMOIRE_MO):
+    """
+    Renvoie, pour chaque terme, ses `k` tags les plus proches dans le graphe, sous forme
+    de paires (tag, score) triées par score décroissant. Les termes inconnus du graphe
+    reçoivent une liste vide.
+
+    Les graines sont propagées par lots (voir `taille_lot`) : les matrices denses d'un lot
+    occupent au plus `memoire_mo` Mo (une seule graine par lot au minimum), et seuls les
+    `k` meilleurs tags de chaque graine sont conservés.
+    """
+    if relations is None:
+        relations = RelationsCSR(csr_dir)
+    transition_t, isoles = matrice_transition(charger_matrice(relations))
+
+    ids = {terme: relations.id_de(terme) for terme in dict.fromkeys(termes)}
+    connus = [terme for terme, tag_id in ids.items() if tag_id is not None]
+    resultats = {terme: [] for terme in ids}
+    if not connus:
+        return resultats
+
+    lot = taille_lot(transition_t.shape[0], memoire_mo)
+    for debut in range(0, len(connus), lot):
+        termes_lot = connus[debut:debut + lot]
+        graines = np.array([ids[terme] for terme in termes_lot], dtype=np.int64)
+        scores = scores_propagation(transition_t, isoles, graines, methode, alpha, iterations, pas)
+        scores[graines, np.arange(len(graines))] = 0  # La graine elle-même n'est pas une suggestion
+
+        for j, (terme, candidats) in enumerate(zip(termes_lot, meilleurs_tags(scores, k))):
+            resultats[terme] = [(relations.nom(int(i)), float(scores[i, j])) for i in candidats]
+        del scores  # Libérer le lot avant d'allouer le suivant
+    return resultats
+
+
+if __name__ == "__main__":
+    import sys
+    for terme, voisins in expansion_semantique(sys.argv[1:] or ["wedding", "portrait"]).items():
+        print(f"{terme} : {[tag for tag, _ in voisins]}")
\ No newline at end of file
@@ -4,15 +4,17 @@ Script principal pour générer automatiquement le thésaurus de hashtags
 en combinant les données de Predis.ai et HIERTAGS.
 """
 
+import argparse
 import os
 import sys
+import shutil
 import subprocess
 import json
 from pathlib import Path
 
 def install_requirements():
     """Installe les dépendances nécessaires."""
-    required_packages = ['requests', 'beautifulsoup4', 'pandas']
+    required_packages = ['requests', 'beautifulsoup4', 'pandas', 'numpy', 'scipy']
     
     for package in required_packages:
         try:
@@ -22,9 +24,15 @@ def install_requirements():
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
 
 def check_hiertags_file():
-    """Vérifie si le fichier HIERTAGS est présent."""
+    """
+    Vérifie si le fichier HIERTAGS est présent, tel quel ou compressé (.gz, .xz, .zst).
+
+    Renvoie le chemin du fichier trouvé, ou None.
+    """
     hiertags_file = "flickr_tag_co-occurrence_network.tsv"
-    if not os.path.exists(hiertags_file):
+    candidats = [hiertags_file] + [hiertags_file + ext for ext in ('.gz', '.xz', '.zst')]
+    trouves = [chemin for chemin in candidats if os.path.exists(chemin)]
+    if not trouves:
         print(f"""
 ❌ ATTENTION: Le fichier '{hiertags_file}' n'est pas trouvé.
 
@@ -33,12 +41,84 @@ Pour télécharger les données HIERTAGS :
 2. Téléchargez le fichier 'flickr_tag_co-occurrence_network.tsv'
 3. Placez-le dans le dossier racine du projet
 
+Le fichier peut aussi être laissé compressé (gzip, xz ou zstd) : il sera décompressé
+à la volée.
+
 Le script continuera sans les données sémantiques HIERTAGS.
         """)
-        return False
-    return True
+        return None
+
+    from hiertags_compression import detecter_compression, zstandard
+    compression = detecter_compression(trouves[0])
+    if compression == "zstd" and zstandard is None:
+        print(f"❌ ATTENTION: '{trouves[0]}' est compressé en zstd : installez le module 'zstandard' "
+              "(pip install zstandard). Le script continuera sans les données HIERTAGS.")
+        return None
+    if compression:
+        print(f"🗜️ Fichier HIERTAGS compressé ({compression}) : '{trouves[0]}', décompression à la volée.")
+    return trouves[0]
+
+def main_echantillon(hiertags_file, taille, methode, graine, expansion=None, synonymes=False):
+    """
+    Mode d'itération rapide : ingestion, fusion et rapport sur un échantillon du fichier HIERTAGS.
+
+    Toutes les sorties portent le préfixe `hiertags_echantillon` (ou `.echantillon` pour le
+    thésaurus) : la construction complète et le fichier copié dans public/lib sont intacts.
+    """
+    from echantillonnage_hiertags import comparer_thesaurus, echantillonner, estimer_similarite
+    from generer_thesaurus_final import KEYWORDS_MAP, generer_thesaurus_final
+    from process_hiertags_resilient import process_hiertags_resilient
+
+    rapport = echantillonner(hiertags_file, "hiertags_echantillon.tsv", taille, methode, graine)
+    process_hiertags_resilient(input_filename="hiertags_echantillon.tsv",
+                               output_filename="hiertags_echantillon_relations.jsonl",
+                               progress_file="hiertags_echantillon_progress.json",
+                               format_sortie="entiers", csr_dir="hiertags_echantillon_csr",
+                               synonymes_file="hiertags_echantillon_synonymes.json" if synonymes else None)
+    generer_thesaurus_final(semantic_file="hiertags_echantillon_relations.jsonl",
+                            output_file="hashtag-thesaurus.echantillon.json",
+                            csr_dir="hiertags_echantillon_csr", sqlite_file=None, parquet_dir=None,
+                            expansion=expansion,
+                            synonymes_file="hiertags_echantillon_synonymes.json" if synonymes else None,
+                            automate_file="hashtag-thesaurus.echantillon.automate.json")
+
+    termes = [keyword_en.split()[0] for keyword_en in KEYWORDS_MAP.values()]
+    similarite, par_terme = estimer_similarite("hiertags_echantillon.tsv", termes, rapport["taux"])
+    print(f"\n📏 Échantillon de {rapport['echantillon']:,} lignes sur {rapport['lignes']:,} "
+          f"({rapport['taux']:.2%}, {methode}, graine {graine})")
+    print(f"   Similarité estimée des voisins HIERTAGS avec une construction complète : {similarite:.1%}")
+    for terme, valeur in par_terme.items():
+        print(f"     - {terme} : {valeur:.1%}")
+    if os.path.exists("hashtag-thesaurus.json"):
+        print(f"   Similarité mesurée avec 'hashtag-thesaurus.json' : "
+              f"{comparer_thesaurus('hashtag-thesaurus.echantillon.json', 'hashtag-thesaurus.json'):.1%}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Génération automatique du thésaurus de hashtags")
+    parser.add_argument("--echantillon", type=float, default=None,
+                        help="Travailler sur un échantillon du fichier HIERTAGS : nombre de lignes, "
+                             "ou proportion si < 1")
+    parser.add_argument("--methode", choices=("reservoir", "strates"), default="reservoir",
+                        help="Échantillon uniforme (reservoir) ou stratifié par classe de poids (strates)")
+    parser.add_argument("--graine", type=int, default=0, help="Graine de l'échantillonnage")
+    parser.add_argument("--budget-memoire", "--memory-budget", dest="budget_memoire", type=float, default=None,
+                        help="Budget mémoire (Mo) de l'ingestion HIERTAGS : taille des lots adaptée en continu")
+    parser.add_argument("--moteur", "--engine", dest="moteur", choices=("pandas", "mmap"), default="pandas",
+                        help="Lecture du TSV HIERTAGS : pandas (read_csv) ou mmap (balayage NumPy)")
+    parser.add_argument("--expansion", choices=("ppr", "marche"), default=None,
+                        help="Enrichissement multi-sauts des mots-clés sur le stockage CSR : PageRank "
+                             "personnalisé (ppr) ou marche aléatoire (marche) ; voisins directs par défaut")
+    parser.add_argument("--synonymes", action="store_true",
+                        help="Détecter les hashtags quasi synonymes (MinHash/LSH) et n'en garder qu'un par "
+                             "groupe dans chaque entrée du thésaurus")
+    parser.add_argument("--plongements", type=int, default=None, metavar="DIMENSION",
+                        help="Calculer les plongements des tags (PPMI + SVD, ex. 64) pour enrichir les "
+                             "mots-clés absents du graphe HIERTAGS")
+    parser.add_argument("--fragments", action="store_true",
+                        help="Écrire aussi le thésaurus en fragments par préfixe (public/lib/hashtag-thesaurus/), "
+                             "chargés à la demande par le client")
+    args = parser.parse_args()
+
     print("🚀 Génération automatique du thésaurus de hashtags")
     print("=" * 50)
     
@@ -48,7 +128,7 @@ def main():
     
     # Vérifier le fichier HIERTAGS
     print("2. Vérification du fichier HIERTAGS...")
-    has_hiertags = check_hiertags_file()
+    hiertags_file = check_hiertags_file()
     
     # Étape 1: Scraping Predis.ai
     print("3. Scraping des données Predis.ai...")
@@ -59,34 +139,69 @@ def main():
         print(f"❌ Erreur lors du scraping : {e}")
         return
     
+    if args.echantillon and hiertags_file:
+        print("4. Mode échantillon : traitement d'une partie des données HIERTAGS...")
+        try:
+            main_echantillon(hiertags_file, args.echantillon, args.methode, args.graine, args.expansion,
+                             args.synonymes)
+        except Exception as e:
+            print(f"❌ Erreur en mode échantillon : {e}")
+        return
+    
     # Étape 2: Traitement HIERTAGS (si disponible)
-    if has_hiertags:
+    if hiertags_file:
         print("4. Traitement des données HIERTAGS (résilient)...")
         try:
             from process_hiertags_resilient import process_hiertags_resilient
-            process_hiertags_resilient()
+            # Mode incrémental : après une mise à jour du fichier, seuls les blocs modifiés sont retraités
+            process_hiertags_resilient(input_filename=hiertags_file, format_sortie="entiers",
+                                       csr_dir="hiertags_csr", incremental=True,
+                                       synonymes_file="hiertags_synonymes.json" if args.synonymes else None,
+                                       dimension_plongements=args.plongements,
+                                       budget_memoire_mo=args.budget_memoire, moteur=args.moteur)
         except Exception as e:
             print(f"❌ Erreur lors du traitement HIERTAGS : {e}")
             # Créer un fichier vide pour que la fusion fonctionne
             with open("hiertags_relations_raw.jsonl", 'w') as f:
                 pass  # Fichier JSONL vide
+            shutil.rmtree("hiertags_csr", ignore_errors=True)  # Ne pas fusionner un stockage CSR obsolète
+            shutil.rmtree("hiertags_relations_raw.parquet", ignore_errors=True)  # Ni un jeu Parquet obsolète
+            for obsolete in ("hiertags_relations_raw.sqlite", "hiertags_synonymes.json"):
+                if os.path.exists(obsolete):
+                    os.remove(obsolete)
     else:
         print("4. Création d'un fichier HIERTAGS vide...")
         with open("hiertags_relations_raw.jsonl", 'w') as f:
             pass  # Fichier JSONL vide
+        shutil.rmtree("hiertags_csr", ignore_errors=True)
+        shutil.rmtree("hiertags_relations_raw.parquet", ignore_errors=True)
+        for obsolete in ("hiertags_relations_raw.sqlite", "hiertags_synonymes.json"):
+            if os.path.exists(obsolete):
+                os.remove(obsolete)
     
     # Étape 3: Fusion et génération finale
     print("5. Génération du thésaurus final...")
     try:
         from generer_thesaurus_final import generer_thesaurus_final
-        generer_thesaurus_final()
+        # Fragments écrits directement dans public/lib, chargés à la demande par le client
+        fragments_dir = "public/lib/hashtag-thesaurus" if args.fragments else None
+        generer_thesaurus_final(expansion=args.expansion, fragments_dir=fragments_dir,
+                                synonymes_file="hiertags_synonymes.json" if args.synonymes else None)
         
         # Copier le fichier vers le dossier public/lib
         if os.path.exists("hashtag-thesaurus.json"):
             os.makedirs("public/lib", exist_ok=True)
-            import shutil
             shutil.copy("hashtag-thesaurus.json", "public/lib/hashtag-thesaurus.json")
             print("📁 Fichier copié vers public/lib/hashtag-thesaurus.json")
+        # Automate des clés : absent si sa vérification a échoué (le client fait alors une recherche naïve)
+        if os.path.exists("hashtag-thesaurus.automate.json"):
+            shutil.copy("hashtag-thesaurus.automate.json", "public/lib/hashtag-thesaurus.automate.json")
+            print("📁 Automate copié vers public/lib/hashtag-thesaurus.automate.json")
+        elif os.path.exists("public/lib/hashtag-thesaurus.automate.json"):
+            os.remove("public/lib/hashtag-thesaurus.automate.json")
+        # Sans --fragments, le client ne doit pas préférer un manifeste d'une construction précédente
+        if not args.fragments:
+            shutil.rmtree("public/lib/hashtag-thesaurus", ignore_errors=True)
             
     except Exception as e:
         print(f"❌ Erreur lors de la génération finale : {e}")
@@ -1,95 +1,369 @@
 import json
+import multiprocessing
+import os
 from collections import defaultdict
 
-def generer_thesaurus_final(scraped_file="predis_ai_raw.json", 
+from index_categories import IndexCategories, charger_categories
+
+# Mots-clés principaux pour notre thésaurus. 
+# La clé est le mot à détecter dans le texte, la valeur est le terme à chercher dans les données.
+KEYWORDS_MAP = {
+    "mariage": "wedding photography",
+    "portrait": "portrait photography", 
+    "voyage": "travel photography",
+    "mode": "fashion photography",
+    "noir et blanc": "black and white photography",
+    "paysage": "landscape photography",
+    "studio": "studio photography",
+    "maquilleuse": "makeup",  # Terme plus générique pour HIERTAGS
+    "couturiere": "fashion"   # On se rattache à la mode
+}
+
+# Début des lignes du JSONL de relations, tel que l'écrit hiertags_sorties
+ENTETE_JSONL = b'{"tag": "'
+SUITE_JSONL = b'", "related": '
+
+def _top_relations(semantic_data, terme, k):
+    """Renvoie les k relations les plus fortes de `terme` sous forme de paires (tag, poids)."""
+    if hasattr(semantic_data, 'top'):
+        return semantic_data.top(terme, k)
+    return sorted(semantic_data[terme].items(), key=lambda item: item[1], reverse=True)[:k]
+
+def _cles_jsonl(termes):
+    """Encodages JSON possibles (avec ou sans échappements ASCII) de chaque terme, sans les guillemets."""
+    return {json.dumps(terme, ensure_ascii=ascii_seul)[1:-1].encode('utf-8')
+            for terme in termes for ascii_seul in (False, True)}
+
+def _charger_relations_jsonl(semantic_file, min_weight=None, termes=None):
+    """
+    Charge les relations du fichier JSONL en dictionnaire tag -> {voisin: poids}.
+
+    Avec `termes`, seules les relations de ces tags sont gardées : une ligne écrite par
+    `hiertags_sorties` (`{"tag": "<tag>", "related": ...`) est écartée d'après ses premiers
+    octets, sans analyse JSON, si son tag n'est pas l'un des termes. Les lignes d'une autre
+    forme sont analysées puis filtrées.
+    """
+    semantic_data = defaultdict(dict)
+    termes = set(termes) if termes is not None else None
+    cles = _cles_jsonl(termes) if termes is not None else None
+    with open(semantic_file, 'rb') as f:
+        for line_num, line in enumerate(f, 1):
+            if cles is not None and line.startswith(ENTETE_JSONL):
+                fin = line.find(SUITE_JSONL, len(ENTETE_JSONL))
+                tag = line[len(ENTETE_JSONL):fin]
+                # Un tag terminé par une barre oblique inverse peut contenir la suite elle-même : analyse complète
+                if fin != -1 and not tag.endswith(b'\\') and tag not in cles:
+                    continue
+            if line.strip():  # Ignorer les lignes vides
+                try:
+                    rel = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Ligne {line_num} ignorée (JSON invalide)")
+                    continue
+                if termes is not None and rel['tag'] not in termes:
+                    continue
+                if min_weight is None or rel['weight'] >= min_weight:
+                    semantic_data[rel['tag']][rel['related']] = rel['weight']
+    return semantic_data
+
+def _charger_synonymes(synonymes_file):
+    """Renvoie l'association tag -> représentant de son groupe de synonymes (vide si pas de fichier)."""
+    if not synonymes_file or not os.path.exists(synonymes_file):
+        return {}
+    with open(synonymes_file, 'r', encoding='utf-8') as f:
+        groupes = json.load(f)["groupes"]
+    print(f"✅ {len(groupes):,} groupes de synonymes chargés depuis '{synonymes_file}'.")
+    return {tag: groupe[0] for groupe in groupes for tag in groupe}
+
+def charger_mots_cles(keywords_file):
+    """
+    Charge un fichier de mots-clés : objet JSON {mot-clé: terme à chercher}, ou texte à une
+    ligne par mot-clé, `mot-clé<TAB>terme` (terme facultatif, lignes `#` ignorées).
+    """
+    with open(keywords_file, 'r', encoding='utf-8') as f:
+        if keywords_file.endswith('.json'):
+            return json.load(f)
+        mots_cles = {}
+        for ligne in f:
+            if not ligne.strip() or ligne.lstrip().startswith('#'):
+                continue
+            keyword_fr, _, keyword_en = ligne.rstrip('\n').partition('\t')
+            mots_cles[keyword_fr.strip()] = keyword_en.strip() or keyword_fr.strip()
+        return mots_cles
+
+def _regrouper_synonymes(hashtags, representants):
+    """Ne garde qu'un hashtag par groupe de synonymes : le représentant s'il est présent, sinon le premier."""
+    retenus = {}
+    for tag in sorted(hashtags):
+        cle = representants.get(tag, tag)
+        if cle not in retenus or tag == cle:
+            retenus[cle] = tag
+    return set(retenus.values())
+
+# Priorités des entrées : au-dessus des mots-clés NLP (10) et des hashtags de base (5) du client
+PRIORITE_MAX = 100
+PRIORITE_MIN = 11
+PAS_PRIORITE = 5
+
+def _priorites(nombre):
+    """
+    Priorités décroissantes des `nombre` entrées du thésaurus, dans l'ordre des mots-clés.
+
+    Le pas est de 5 (100, 95, 90...) tant que la dernière entrée reste à au moins 11 ;
+    au-delà, les rangs sont répartis linéairement sur [11, 100].
+    """
+    if nombre <= 1:
+        return [PRIORITE_MAX] * nombre
+    pas = min(PAS_PRIORITE, (PRIORITE_MAX - PRIORITE_MIN) / (nombre - 1))
+    return [PRIORITE_MAX - rang * pas if pas == PAS_PRIORITE else round(PRIORITE_MAX - rang * pas, 3)
+            for rang in range(nombre)]
+
+# Données partagées avec les processus du pool (copie sur écriture après fork)
+_CONTEXTE = None
+
+def _entree_thesaurus(mot_cle):
+    """Calcule les hashtags d'un mot-clé à partir de `_CONTEXTE` ; renvoie (hashtags triés, journal)."""
+    keyword_fr, keyword_en = mot_cle
+    contexte = _CONTEXTE
+    scraped_data, semantic_data = contexte["scraped_data"], contexte["semantic_data"]
+    expansions, voisins_plongements = contexte["expansions"], contexte["voisins_plongements"]
+    representants = contexte["representants"]
+    journal = [f"Traitement de '{keyword_fr}' (mappé sur '{keyword_en}')"]
+    base_hashtags = set()
+    
+    # 1. Trouver les hashtags de base dans les données scrapées
+    for identifiant in contexte["index_categories"].correspondances(keyword_en.split()):
+        category_info = scraped_data[identifiant]
+        journal.append(f"  -> Correspondance trouvée dans la catégorie scrapée : '{category_info['category']}'")
+        for tag in category_info["hashtags"]:
+            base_hashtags.add(tag)
+    
+    # 2. Enrichir avec les données sémantiques de HIERTAGS
+    # On cherche le terme le plus simple (ex: "wedding" pour "wedding photography")
+    main_semantic_term = keyword_en.split()[0]
+    
+    if main_semantic_term in semantic_data:
+        if main_semantic_term in expansions:
+            # Tags les mieux classés par l'expansion multi-sauts
+            top_semantic_tags = expansions[main_semantic_term]
+        else:
+            # Trier les relations par poids et prendre les 10 meilleures
+            top_semantic_tags = _top_relations(semantic_data, main_semantic_term, 10)
+        journal.append(f"  -> Top 5 tags sémantiques de HIERTAGS : {[tag for tag, w in top_semantic_tags[:5]]}")
+        
+        for tag, weight in top_semantic_tags:
+            base_hashtags.add(tag)
+    elif voisins_plongements.get(keyword_en):
+        # Terme absent du graphe : tags les plus proches de l'expression dans l'espace des plongements
+        top_semantic_tags = voisins_plongements[keyword_en]
+        journal.append(f"  -> Top 5 tags proches (plongements) : {[tag for tag, s in top_semantic_tags[:5]]}")
+        for tag, similarite in top_semantic_tags:
+            base_hashtags.add(tag)
+    
+    # Ajouter le mot-clé lui-même s'il est simple
+    if len(keyword_fr.split()) == 1:
+        base_hashtags.add(keyword_fr.replace(' ', ''))
+    
+    if representants:
+        nombre = len(base_hashtags)
+        base_hashtags = _regrouper_synonymes(base_hashtags, representants)
+        if len(base_hashtags) < nombre:
+            journal.append(f"  -> {nombre - len(base_hashtags)} hashtags synonymes fusionnés")
+    
+    return sorted(base_hashtags), journal
+
+def _initialiser_processus():
+    """Rouvre, dans un processus du pool, les connexions qui ne survivent pas à `fork`."""
+    from hiertags_sqlite import RelationsSQLite
+    semantic_data = _CONTEXTE["semantic_data"]
+    if isinstance(semantic_data, RelationsSQLite):
+        _CONTEXTE["semantic_data"] = RelationsSQLite(semantic_data.chemin)
+
+def generer_thesaurus_final(scraped_file="predis_ai_raw.json",  # Un fichier scrapé ou une liste de fichiers
                           semantic_file="hiertags_relations_raw.jsonl",  # Format JSONL
-                          output_file="hashtag-thesaurus.json"):
-    """Fusionne les données scrapées et sémantiques pour créer le dictionnaire final."""
+                          output_file="hashtag-thesaurus.json",
+                          csr_dir="hiertags_csr",  # Stockage CSR prioritaire sur le JSONL s'il existe
+                          sqlite_file="hiertags_relations_raw.sqlite",  # Base SQLite, si pas de CSR
+                          parquet_dir="hiertags_relations_raw.parquet",  # Jeu de données Parquet, si pas de CSR ni de SQLite
+                          min_weight=None,  # Poids minimal des relations lues (Parquet et JSONL)
+                          expansion=None,  # "ppr" ou "marche" : enrichissement multi-sauts (CSR requis)
+                          synonymes_file=None,  # Groupes de synonymes à fusionner (ex. "hiertags_synonymes.json")
+                          keywords_file=None,  # Mots-clés à la place de KEYWORDS_MAP (JSON ou TSV, voir charger_mots_cles)
+                          workers=1,  # Processus générant les entrées en parallèle (fork)
+                          graphe_complet=False,  # JSONL : charger tout le graphe, pas seulement les termes cherchés
+                          fragments_dir=None,  # Dossier du thésaurus découpé en fragments (voir thesaurus_fragments.py)
+                          automate_file="hashtag-thesaurus.automate.json"):  # Automate des clés (voir automate_thesaurus.py)
+    """
+    Fusionne les données scrapées et sémantiques pour créer le dictionnaire final.
+
+    Les catégories de tous les fichiers scrapés sont indexées une seule fois par mot de leur
+    titre (minuscules, sans accents, voir `index_categories.py`) : les catégories d'un
+    mot-clé s'obtiennent par consultation de l'index plutôt que par un parcours complet.
+
+    Avec `expansion`, l'enrichissement ne se limite plus aux voisins directs : les tags
+    sont classés par PageRank personnalisé (`ppr`) ou marche aléatoire (`marche`) sur le
+    graphe CSR, pour tous les mots-clés à la fois (voir `expansion_semantique.py`).
+
+    Si le stockage CSR contient des plongements (voir `plongements_tags.py`), les mots-clés
+    dont le terme principal est absent du graphe sont enrichis par les tags les plus proches
+    de l'expression complète dans l'espace des plongements.
+
+    Si `synonymes_file` est donné et existe (voir `synonymes_minhash.py`), les hashtags quasi synonymes
+    d'une même entrée (`bnw`, `blackandwhite`...) sont réduits à un seul.
+
+    Avec le jeu de données Parquet (voir `hiertags_parquet.py`), seuls les termes cherchés
+    et les relations de poids au moins `min_weight` sont lus, en une seule passe : les
+    tranches de poids et groupes de lignes qui ne peuvent pas les contenir sont ignorés.
+
+    Avec le JSONL, seules les relations des termes cherchés (premier mot de chaque terme
+    anglais) sont gardées : les autres lignes sont écartées sur leurs premiers octets,
+    sans analyse JSON, et le graphe complet n'est jamais en mémoire (`graphe_complet=True`
+    pour tout charger).
+
+    Avec `workers > 1`, les entrées sont calculées par un pool de processus créés par `fork` :
+    les index chargés (catégories, relations, expansions) sont partagés en copie sur écriture,
+    sans copie ni sérialisation. Les résultats sont repris dans l'ordre des mots-clés, si bien
+    que le journal et les priorités ne dépendent pas de la répartition du travail.
+
+    Les priorités suivent l'ordre des mots-clés : 100, 95, 90... tant que la dernière reste
+    à au moins 11, sinon les rangs sont répartis linéairement sur [11, 100] (voir
+    `_priorites`). Toutes les entrées passent ainsi avant les mots-clés NLP (10) et les
+    hashtags de base (5) ajoutés par le client.
+
+    Avec `fragments_dir`, le thésaurus est aussi écrit en fragments par préfixe de clé, avec
+    un manifeste (voir `thesaurus_fragments.py`) : le client ne télécharge que les fragments
+    dont les clés peuvent apparaître dans le texte analysé.
+
+    `automate_file` reçoit l'automate Aho-Corasick des clés (voir `automate_thesaurus.py`),
+    vérifié sur les titres des catégories scrapées et un corpus généré : le client trouve
+    toutes les clés présentes dans le texte en un seul passage.
+    """
     
+    keywords_map = charger_mots_cles(keywords_file) if keywords_file else KEYWORDS_MAP
+    print(f"🔑 {len(keywords_map):,} mots-clés à traiter.")
+
     try:
-        with open(scraped_file, 'r', encoding='utf-8') as f:
-            scraped_data = json.load(f)
+        scraped_data = charger_categories(scraped_file)
     except FileNotFoundError as e:
         print(f"❌ ERREUR: Fichier manquant : {e.filename}. Veuillez d'abord exécuter le script de scraping.")
         return
     
-    # Chargement des données sémantiques depuis le fichier JSONL
-    print(f"📊 Chargement des données sémantiques depuis '{semantic_file}'...")
-    semantic_data = defaultdict(dict)
+    csr_ouvert = bool(csr_dir and os.path.isdir(csr_dir))
+    if csr_ouvert:
+        # Stockage CSR en mémoire mappée : aucun chargement, lecture des voisins à la demande
+        from hiertags_csr import RelationsCSR
+        semantic_data = RelationsCSR(csr_dir)
+        print(f"✅ Stockage CSR '{csr_dir}' ouvert ({len(semantic_data):,} tags).")
+    elif sqlite_file and os.path.exists(sqlite_file):
+        # Base SQLite indexée : une requête par terme recherché, sans charger le graphe
+        from hiertags_sqlite import RelationsSQLite
+        semantic_data = RelationsSQLite(sqlite_file)
+        print(f"✅ Base SQLite '{sqlite_file}' ouverte ({len(semantic_data):,} tags).")
+    elif parquet_dir and os.path.isdir(parquet_dir):
+        # Jeu de données Parquet : filtres de tags et de poids poussés dans la lecture
+        from hiertags_parquet import RelationsParquet
+        semantic_data = RelationsParquet(parquet_dir, min_weight=min_weight)
+        semantic_data.precharger(keyword_en.split()[0] for keyword_en in keywords_map.values())
+        print(f"✅ Jeu de données Parquet '{parquet_dir}' ouvert ({len(semantic_data):,} tags).")
+    else:
+        # Chargement des données sémantiques depuis le fichier JSONL
+        print(f"📊 Chargement des données sémantiques depuis '{semantic_file}'...")
+        termes = None if graphe_complet else [keyword_en.split()[0] for keyword_en in keywords_map.values()]
+        
+        try:
+            semantic_data = _charger_relations_jsonl(semantic_file, min_weight, termes)
+            print(f"✅ {len(semantic_data):,} tags avec relations sémantiques chargés.")
+        except FileNotFoundError:
+            print(f"⚠️ Fichier '{semantic_file}' non trouvé. Génération sans données sémantiques.")
+            semantic_data = {}
+    
+    index_categories = IndexCategories(scraped_data)
+    
+    expansions = {}
+    if expansion and not csr_ouvert:
+        print("⚠️ L'expansion multi-sauts nécessite le stockage CSR : enrichissement par voisins directs.")
+    elif expansion:
+        try:
+            from expansion_semantique import expansion_semantique
+        except ImportError:
+            print("⚠️ SciPy n'est pas installé : enrichissement par voisins directs.")
+        else:
+            termes = [keyword_en.split()[0] for keyword_en in keywords_map.values()]
+            expansions = expansion_semantique(termes, k=10, methode=expansion, relations=semantic_data)
+            print(f"✅ Expansion sémantique ({expansion}) calculée pour {len(termes)} termes.")
+    
+    voisins_plongements = {}
+    if csr_ouvert and os.path.exists(os.path.join(csr_dir, "plongements.npy")):
+        from plongements_tags import PlongementsTags
+        absents = [keyword_en for keyword_en in keywords_map.values()
+                   if keyword_en.split()[0] not in semantic_data]
+        if absents:
+            plongements = PlongementsTags(csr_dir, relations=semantic_data)
+            voisins_plongements = plongements.plus_proches(absents, k=10)
+            print(f"✅ Plongements : voisins calculés pour {len(absents)} termes absents du graphe.")
+    
+    representants = _charger_synonymes(synonymes_file)
+    
+    global _CONTEXTE
+    _CONTEXTE = {"scraped_data": scraped_data, "index_categories": index_categories,
+                 "semantic_data": semantic_data, "expansions": expansions,
+                 "voisins_plongements": voisins_plongements, "representants": representants}
+    mots_cles = list(keywords_map.items())
+    
+    entrees = []
+    
+    pool = None
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        print(f"⚙️ Génération des entrées avec {workers} processus...")
+        pool = multiprocessing.get_context("fork").Pool(workers, initializer=_initialiser_processus)
+        resultats = pool.imap(_entree_thesaurus, mots_cles, chunksize=max(1, len(mots_cles) // (workers * 8)))
+    else:
+        if workers > 1:
+            print("ℹ️ fork indisponible sur ce système : génération séquentielle.")
+        resultats = map(_entree_thesaurus, mots_cles)
     
     try:
-        with open(semantic_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                if line.strip():  # Ignorer les lignes vides
-                    try:
-                        rel = json.loads(line)
-                        semantic_data[rel['tag']][rel['related']] = rel['weight']
-                    except json.JSONDecodeError:
-                        print(f"⚠️ Ligne {line_num} ignorée (JSON invalide)")
-                        continue
-        print(f"✅ {len(semantic_data):,} tags avec relations sémantiques chargés.")
-    except FileNotFoundError:
-        print(f"⚠️ Fichier '{semantic_file}' non trouvé. Génération sans données sémantiques.")
-        semantic_data = {}
-    
-    # Mots-clés principaux pour notre thésaurus. 
-    # La clé est le mot à détecter dans le texte, la valeur est le terme à chercher dans les données.
-    keywords_map = {
-        "mariage": "wedding photography",
-        "portrait": "portrait photography", 
-        "voyage": "travel photography",
-        "mode": "fashion photography",
-        "noir et blanc": "black and white photography",
-        "paysage": "landscape photography",
-        "studio": "studio photography",
-        "maquilleuse": "makeup",  # Terme plus générique pour HIERTAGS
-        "couturiere": "fashion"   # On se rattache à la mode
-    }
-    
-    final_thesaurus = {}
-    priority_counter = 100
-    
-    for keyword_fr, keyword_en in keywords_map.items():
-        print(f"Traitement de '{keyword_fr}' (mappé sur '{keyword_en}')")
-        base_hashtags = set()
-        
-        # 1. Trouver les hashtags de base dans les données scrapées
-        for category_info in scraped_data:
-            if any(term in category_info["category"].lower() for term in keyword_en.split()):
-                print(f"  -> Correspondance trouvée dans la catégorie scrapée : '{category_info['category']}'")
-                for tag in category_info["hashtags"]:
-                    base_hashtags.add(tag)
-        
-        # 2. Enrichir avec les données sémantiques de HIERTAGS
-        # On cherche le terme le plus simple (ex: "wedding" pour "wedding photography")
-        main_semantic_term = keyword_en.split()[0]
-        
-        if main_semantic_term in semantic_data:
-            relations = semantic_data[main_semantic_term]
-            # Trier les relations par poids et prendre les 10 meilleures
-            top_semantic_tags = sorted(relations.items(), key=lambda item: item[1], reverse=True)[:10]
-            print(f"  -> Top 5 tags sémantiques de HIERTAGS : {[tag for tag, w in top_semantic_tags[:5]]}")
-            
-            for tag, weight in top_semantic_tags:
-                base_hashtags.add(tag)
-        
-        # Ajouter le mot-clé lui-même s'il est simple
-        if len(keyword_fr.split()) == 1:
-            base_hashtags.add(keyword_fr.replace(' ', ''))
-        
-        if base_hashtags:
-            final_thesaurus[keyword_fr] = {
-                "p": priority_counter,
-                "h": sorted(list(base_hashtags))
-            }
-            priority_counter -= 5  # Diminuer la priorité pour le prochain
+        # Résultats dans l'ordre des mots-clés, quel que soit le processus qui les a calculés
+        for (keyword_fr, _), (hashtags, journal) in zip(mots_cles, resultats):
+            print("\n".join(journal))
+            if hashtags:
+                entrees.append((keyword_fr, hashtags))
+    finally:
+        if pool is not None:
+            pool.terminate()  # Tous les résultats sont lus (ou le traitement est interrompu)
+            pool.join()
+        _CONTEXTE = None
+    
+    # Priorités fixées une fois connu le nombre d'entrées non vides
+    final_thesaurus = {keyword_fr: {"p": priorite, "h": hashtags}
+                       for (keyword_fr, hashtags), priorite in zip(entrees, _priorites(len(entrees)))}
     
     # Sauvegarde du fichier final
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(final_thesaurus, f, ensure_ascii=False, indent=2)
     
+    if automate_file:
+        from automate_thesaurus import ecrire_automate
+        ecrire_automate(final_thesaurus, automate_file,
+                        textes=[categorie["category"] for categorie in scraped_data])
+    
+    if fragments_dir:
+        from thesaurus_fragments import ecrire_fragments
+        ecrire_fragments(final_thesaurus, fragments_dir)
+    
     print(f"\n✅ Thésaurus final généré avec succès dans '{output_file}' !")
     print(f"Ce fichier est prêt à être utilisé dans votre application.")
 
 if __name__ == "__main__":
-    generer_thesaurus_final()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Fusion des données scrapées et sémantiques en thésaurus")
+    parser.add_argument("scraped_files", nargs="*", default=["predis_ai_raw.json"],
+                        help="Fichiers scrapés (ex. predis_ai_raw.json hashtags_complet_multi_sources.json)")
+    parser.add_argument("--mots-cles", "--keywords", dest="keywords_file", default=None,
+                        help="Fichier de mots-clés (JSON {mot-clé: terme} ou TSV mot-clé<TAB>terme)")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus")
+    parser.add_argument("--fragments", dest="fragments_dir", default=None,
+                        help="Dossier où écrire aussi le thésaurus en fragments (ex. ../public/lib/hashtag-thesaurus)")
+    args = parser.parse_args()
+    generer_thesaurus_final(scraped_file=args.scraped_files, keywords_file=args.keywords_file,
+                            workers=args.workers, fragments_dir=args.fragments_dir)
\ No newline at end of file
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Lecture en flux des fichiers HIERTAGS compressés (gzip, xz, zstd).
+
+Le format est reconnu à ses octets magiques, quelle que soit l'extension du fichier.
+La décompression tourne dans un thread séparé qui alimente une file de blocs, pendant
+que le thread principal découpe les lignes et les analyse : les deux étapes se recouvrent.
+
+Les positions sont exprimées en octets du flux décompressé. Pour la reprise, le lecteur
+note des points de reprise (offset compressé, offset décompressé) au début de chaque
+membre gzip, flux xz ou trame zstd : une reprise redémarre le décompresseur au dernier
+point précédant la position validée, puis saute les octets déjà traités sans les analyser.
+Un fichier produit par `bgzip` ou `pzstd` (nombreux membres) reprend donc presque
+immédiatement ; un fichier à un seul membre est redécompressé depuis le début.
+"""
+
+import lzma
+import os
+import queue
+import threading
+import zlib
+
+import numpy as np
+
+from hiertags_lecture import lire_plage, lire_tsv
+from hiertags_mmap import analyser_tsv
+
+try:
+    import zstandard
+except ImportError:  # Nécessaire uniquement pour les fichiers .zst
+    zstandard = None
+
+COMPRESSIONS = ("gzip", "xz", "zstd")
+
+# Taille des lectures dans le fichier compressé
+TAILLE_LECTURE = 1024 * 1024
+
+
+def detecter_compression(input_filename):
+    """Renvoie le format de compression du fichier ("gzip", "xz" ou "zstd"), ou None s'il n'est pas compressé."""
+    with open(input_filename, 'rb') as f:
+        entete = f.read(6)
+    if entete.startswith(b'\x1f\x8b'):
+        return "gzip"
+    if entete.startswith(b'\xfd7zXZ\x00'):
+        return "xz"
+    # Trame zstd, ou trame « ignorable » (0x184D2A50 à 0x184D2A5F) placée en tête par pzstd
+    if entete.startswith(b'\x28\xb5\x2f\xfd') or (len(entete) >= 4 and entete[0] & 0xF0 == 0x50
+                                                  and entete[1:4] == b'\x2a\x4d\x18'):
+        return "zstd"
+    return None
+
+
+def lire_lots(input_filename, chunk_size, categoriel=False):
+    """Parcourt le fichier entier, compressé ou non, par couples (lot, position) de `chunk_size` lignes."""
+    if detecter_compression(input_filename):
+        return LotsCompresses(input_filename, 0, chunk_size, categoriel)
+    return lire_plage(input_filename, 0, os.path.getsize(input_filename), chunk_size, categoriel)
+
+
+def _decompresseur(compression):
+    """Crée un décompresseur pour un seul membre (gzip), flux (xz) ou trame (zstd)."""
+    if compression == "gzip":
+        return zlib.decompressobj(wbits=31)
+    if compression == "xz":
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Le module 'zstandard' est nécessaire pour lire les fichiers zstd "
+                              "(pip install zstandard).")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Compression inconnue : '{compression}' (attendu : {', '.join(COMPRESSIONS)})")
+
+
+class LotsCompresses:
+    """
+    Parcourt un fichier compressé par lots d'au plus `chunk_size` lignes, à partir de
+    l'offset décompressé `debut`.
+
+    Produit des couples (lot, position) comme `lire_plage`, `position` étant l'offset,
+    dans le flux décompressé, de la première ligne non encore lue après ce lot.
+    `point_reprise` est un point (offset compressé, offset décompressé) situé avant `debut`,
+    tel que renvoyé par `point_reprise_avant` lors d'un traitement précédent.
+    Comme pour `lire_plage`, `chunk_size` peut être une fonction rappelée avant chaque lot.
+    Avec `moteur="mmap"`, les blocs décompressés sont analysés par `hiertags_mmap.analyser_tsv`
+    (lignes sous `min_weight` écartées).
+    """
+
+    def __init__(self, input_filename, debut, chunk_size, categoriel=False, point_reprise=None,
+                 taille_file=8, moteur="pandas", min_weight=None):
+        self.input_filename = input_filename
+        self.compression = detecter_compression(input_filename)
+        self.debut = debut
+        self.chunk_size = chunk_size
+        self.categoriel = categoriel
+        self.moteur = moteur
+        self.min_weight = min_weight
+        self.depart = tuple(point_reprise) if point_reprise and point_reprise[1] <= debut else (0, 0)
+        self.points = [self.depart]
+        self.position_compressee = self.depart[0]
+        self.file = queue.Queue(maxsize=taille_file)
+        self.arret = threading.Event()
+
+    def _envoyer(self, element):
+        """Dépose un élément dans la file, sauf si la lecture a été abandonnée."""
+        while not self.arret.is_set():
+            try:
+                self.file.put(element, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decompresser(self):
+        """Thread de décompression : dépose (bloc, points de reprise, offset compressé) dans la file."""
+        try:
+            position_c, position_d = self.depart
+            decompresseur = _decompresseur(self.compression)
+            neuf = True
+            with open(self.input_filename, 'rb') as f:
+                f.seek(position_c)
+                while not self.arret.is_set():
+                    donnees = f.read(TAILLE_LECTURE)
+                    if not donnees:
+                        break
+                    lu = position_c + len(donnees)
+                    morceaux, points = [], []
+                    while donnees:
+                        if neuf and self.compression == "xz":
+                            donnees = donnees.lstrip(b'\x00')  # Remplissage entre deux flux xz
+                            if not donnees:
+                                break
+                        neuf = False
+                        sortie = decompresseur.decompress(donnees)
+                        morceaux.append(sortie)
+                        position_d += len(sortie)
+                        if not decompresseur.eof:
+                            break
+                        # Fin d'un membre : le suivant commence dans les données non consommées
+                        donnees = decompresseur.unused_data
+                        points.append((lu - len(donnees), position_d))
+                        decompresseur = _decompresseur(self.compression)
+                        neuf = True
+                    position_c = lu
+                    if not self._envoyer((b''.join(morceaux), points, position_c)):
+                        return
+            self._envoyer(None)
+        except BaseException as e:
+            self._envoyer(e)
+
+    def _blocs(self):
+        """Blocs décompressés à partir de `debut`, les octets précédents étant ignorés."""
+        thread = threading.Thread(target=self._decompresser, daemon=True)
+        thread.start()
+        a_ignorer = self.debut - self.depart[1]
+        try:
+            while True:
+                element = self.file.get()
+                if element is None:
+                    return
+                if isinstance(element, BaseException):
+                    raise element
+                bloc, points, self.position_compressee = element
+                self.points.extend(points)
+                if a_ignorer:
+                    ignores = min(a_ignorer, len(bloc))
+                    bloc, a_ignorer = bloc[ignores:], a_ignorer - ignores
+                if bloc:
+                    yield bloc
+        finally:
+            self.arret.set()
+            thread.join()
+
+    def point_reprise_avant(self, position):
+        """Renvoie le dernier point de reprise connu dont l'offset décompressé précède `position`."""
+        while len(self.points) > 1 and self.points[1][1] <= position:
+            self.points.pop(0)
+        return list(self.points[0])
+
+    def _analyser(self, donnees):
+        if self.moteur == "mmap":
+            return analyser_tsv(donnees, self.categoriel, self.min_weight)
+        return lire_tsv(donnees, self.categoriel)
+
+    def _taille_lot(self):
+        return self.chunk_size() if callable(self.chunk_size) else self.chunk_size
+
+    def __iter__(self):
+        position = self.debut
+        morceaux, lignes = [], 0
+        for bloc in self._blocs():
+            morceaux.append(bloc)
+            lignes += bloc.count(b'\n')
+            if lignes < self._taille_lot():
+                continue
+            donnees = b''.join(morceaux)
+            fins = np.flatnonzero(np.frombuffer(donnees, dtype=np.uint8) == 0x0A) + 1
+            debut_lot, lu = 0, 0
+            # Découper les lots complets au niveau des fins de ligne
+            while len(fins) - lu >= self._taille_lot():
+                lu += self._taille_lot()
+                fin_lot = int(fins[lu - 1])
+                position += fin_lot - debut_lot
+                yield self._analyser(memoryview(donnees)[debut_lot:fin_lot]), position
+                debut_lot = fin_lot
+            morceaux = [donnees[debut_lot:]]
+            lignes = len(fins) - lu
+        donnees = b''.join(morceaux)
+        if donnees:
+            position += len(donnees)
+            yield self._analyser(donnees), position
\ No newline at end of file
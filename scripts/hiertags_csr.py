@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Stockage compact (CSR) des relations sémantiques HIERTAGS.
+
+Les relations sont rangées sous forme de matrice creuse compressée par ligne :
+- `offsets.npy`  : début des voisins de chaque tag (int64, n_tags + 1 valeurs)
+- `voisins.npy`  : identifiants des tags voisins (int32)
+- `poids.npy`    : poids des relations (float32), triés par poids décroissant pour chaque tag
+- `vocab.bin` / `vocab_offsets.npy` : noms des tags en UTF-8, triés par ordre lexicographique
+
+Chaque relation non orientée y figure dans les deux sens, ce qui permet d'obtenir les
+voisins d'un tag quelle que soit l'extrémité de l'arête où il apparaît.
+
+Tous les fichiers sont ouverts en mémoire mappée : le chargement est instantané et
+seules les pages réellement lues sont chargées en mémoire.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from hiertags_elagage import (afficher_degres, calculer_degres, normaliser_poids, plafonner_degre,
+                             retirer_hubs)
+from hiertags_sorties import ARETE, aggreger_aretes, lire_vocabulaire
+
+
+def construire_csr(input_filename="hiertags_relations_raw.jsonl",
+                   csr_dir="hiertags_csr",
+                   chunk_size=500000):
+    """Construit le stockage CSR à partir du fichier de relations JSONL."""
+
+    print(f"🧱 Construction du stockage CSR depuis '{input_filename}'...")
+
+    vocab = {}
+    sources, cibles, poids = [], [], []
+
+    lecteur = pd.read_json(
+        input_filename,
+        lines=True,
+        chunksize=chunk_size,
+        dtype={'tag': str, 'related': str, 'weight': float},
+        convert_dates=False
+    )
+    with lecteur:
+        for chunk in lecteur:
+            # Enregistrer les nouveaux tags du lot dans le vocabulaire
+            for tag in pd.unique(pd.concat([chunk['tag'], chunk['related']])):
+                if tag not in vocab:
+                    vocab[tag] = len(vocab)
+
+            sources.append(chunk['tag'].map(vocab).to_numpy(dtype=np.int32))
+            cibles.append(chunk['related'].map(vocab).to_numpy(dtype=np.int32))
+            poids.append(chunk['weight'].to_numpy(dtype=np.float32))
+
+    ecrire_csr(
+        list(vocab),
+        np.concatenate(sources) if sources else np.empty(0, dtype=np.int32),
+        np.concatenate(cibles) if cibles else np.empty(0, dtype=np.int32),
+        np.concatenate(poids) if poids else np.empty(0, dtype=np.float32),
+        csr_dir
+    )
+
+
+def construire_csr_entiers(vocab_filename="hiertags_relations_raw.vocab.txt",
+                           aretes_filename="hiertags_relations_raw.aretes.bin",
+                           csr_dir="hiertags_csr",
+                           reducteur="max",
+                           degre_max=None,  # Nombre maximal de voisins gardés par tag
+                           normalisation=None,  # Repondération des hubs : "pmi" ou "tfidf"
+                           degre_hub=None):  # Supprimer les arêtes des tags de degré supérieur
+    """
+    Construit le stockage CSR à partir de la sortie encodée en identifiants (format `entiers`).
+
+    Les arêtes présentes plusieurs fois dans le fichier source, dans un sens ou dans l'autre,
+    sont fusionnées et leurs poids combinés par `reducteur` (`max`, `sum` ou `mean`).
+
+    Le degré et le degré pondéré de chaque tag sont ensuite calculés sur les arêtes fusionnées,
+    pour retirer les hubs, normaliser les poids ou plafonner le nombre de voisins de chaque
+    tag (voir `hiertags_elagage.py`).
+    """
+
+    print(f"🧱 Construction du stockage CSR depuis '{aretes_filename}'...")
+
+    noms = lire_vocabulaire(vocab_filename)
+    aretes = np.fromfile(aretes_filename, dtype=ARETE)
+    total = len(aretes)
+    aretes = aggreger_aretes(aretes, reducteur)
+    if len(aretes) < total:
+        print(f"🔗 {total - len(aretes):,} arêtes en double fusionnées ({reducteur}).")
+
+    degres, forces = calculer_degres(aretes, len(noms))
+    afficher_degres(noms, degres, forces)
+    if degre_hub is not None:
+        avant = len(aretes)
+        aretes = retirer_hubs(aretes, degres, degre_hub)
+        print(f"✂️ {avant - len(aretes):,} arêtes de hubs (degré > {degre_hub:,}) supprimées.")
+    if normalisation:
+        avant = len(aretes)
+        aretes = normaliser_poids(aretes, degres, forces, normalisation)
+        print(f"⚖️ Poids normalisés ({normalisation}), {avant - len(aretes):,} arêtes sans information retirées.")
+
+    # Chaque relation est stockée une fois : on la déplie dans les deux sens
+    sources = np.column_stack((aretes['tag1'], aretes['tag2'])).ravel()
+    cibles = np.column_stack((aretes['tag2'], aretes['tag1'])).ravel()
+    poids = np.repeat(aretes['weight'], 2)
+    if degre_max is not None:
+        # Une boucle (a, a) ne doit compter qu'une fois parmi les voisins de a
+        doublons = np.zeros(len(sources), dtype=bool)
+        doublons[1::2] = aretes['tag1'] == aretes['tag2']
+        sources, cibles, poids = sources[~doublons], cibles[~doublons], poids[~doublons]
+        avant = len(sources)
+        sources, cibles, poids = plafonner_degre(sources, cibles, poids, degre_max)
+        print(f"✂️ {avant - len(sources):,} relations au-delà de {degre_max} voisins par tag supprimées.")
+
+    ecrire_csr(noms, sources, cibles, poids, csr_dir)
+
+
+def ecrire_csr(noms, sources, cibles, poids, csr_dir):
+    """
+    Écrit un stockage CSR à partir de listes d'arêtes orientées exprimées en identifiants.
+
+    `noms[i]` est le nom du tag d'identifiant `i`. Les identifiants sont renumérotés
+    dans l'ordre lexicographique des noms pour permettre une recherche dichotomique.
+    En cas de doublon (tag, related), la dernière occurrence l'emporte, comme avec un dict.
+    """
+    n_tags = len(noms)
+
+    # Renumérotation alphabétique du vocabulaire
+    ordre = np.argsort(np.array(noms, dtype=object), kind='stable')
+    rang = np.empty(n_tags, dtype=np.int32)
+    rang[ordre] = np.arange(n_tags, dtype=np.int32)
+
+    aretes = pd.DataFrame({
+        'source': rang[sources] if n_tags else sources,
+        'cible': rang[cibles] if n_tags else cibles,
+        'poids': poids
+    }).drop_duplicates(subset=['source', 'cible'], keep='last')
+
+    # Tri par tag puis par poids décroissant (tri stable : l'ordre d'origine départage les égalités)
+    src = aretes['source'].to_numpy()
+    tri = np.lexsort((-aretes['poids'].to_numpy(), src))
+
+    offsets = np.zeros(n_tags + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_tags), out=offsets[1:])
+
+    noms_tries = [noms[i].encode('utf-8') for i in ordre]
+    vocab_offsets = np.zeros(n_tags + 1, dtype=np.int64)
+    np.cumsum([len(nom) for nom in noms_tries], out=vocab_offsets[1:])
+
+    # Écriture dans un dossier temporaire puis remplacement, pour ne jamais laisser un stockage partiel
+    dossier_tmp = csr_dir.rstrip('/\\') + '.tmp'
+    shutil.rmtree(dossier_tmp, ignore_errors=True)
+    os.makedirs(dossier_tmp)
+
+    np.save(os.path.join(dossier_tmp, 'offsets.npy'), offsets)
+    np.save(os.path.join(dossier_tmp, 'voisins.npy'), aretes['cible'].to_numpy(dtype=np.int32)[tri])
+    np.save(os.path.join(dossier_tmp, 'poids.npy'), aretes['poids'].to_numpy(dtype=np.float32)[tri])
+    np.save(os.path.join(dossier_tmp, 'vocab_offsets.npy'), vocab_offsets)
+    with open(os.path.join(dossier_tmp, 'vocab.bin'), 'wb') as f:
+        f.write(b''.join(noms_tries))
+
+    shutil.rmtree(csr_dir, ignore_errors=True)
+    os.replace(dossier_tmp, csr_dir)
+
+    print(f"✅ Stockage CSR sauvegardé dans '{csr_dir}' ({n_tags:,} tags, {len(aretes):,} relations).")
+
+
+class RelationsCSR:
+    """Accès en lecture seule, sans copie, à un stockage CSR en mémoire mappée."""
+
+    def __init__(self, csr_dir="hiertags_csr"):
+        self.csr_dir = csr_dir
+        self.offsets = np.load(os.path.join(csr_dir, 'offsets.npy'), mmap_mode='r')
+        self.voisins_ids = np.load(os.path.join(csr_dir, 'voisins.npy'), mmap_mode='r')
+        self.poids = np.load(os.path.join(csr_dir, 'poids.npy'), mmap_mode='r')
+        self.vocab_offsets = np.load(os.path.join(csr_dir, 'vocab_offsets.npy'), mmap_mode='r')
+
+        chemin_vocab = os.path.join(csr_dir, 'vocab.bin')
+        if os.path.getsize(chemin_vocab) > 0:
+            self.vocab = np.memmap(chemin_vocab, dtype=np.uint8, mode='r')
+        else:
+            self.vocab = np.empty(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __contains__(self, tag):
+        return self.id_de(tag) is not None
+
+    def nom(self, tag_id):
+        """Renvoie le nom du tag d'identifiant `tag_id`."""
+        debut, fin = self.vocab_offsets[tag_id], self.vocab_offsets[tag_id + 1]
+        return self.vocab[debut:fin].tobytes().decode('utf-8')
+
+    def id_de(self, tag):
+        """Renvoie l'identifiant de `tag` (recherche dichotomique), ou None s'il est inconnu."""
+        cle = tag.encode('utf-8')
+        bas, haut = 0, len(self)
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            debut, fin = self.vocab_offsets[milieu], self.vocab_offsets[milieu + 1]
+            if self.vocab[debut:fin].tobytes() < cle:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        if bas < len(self):
+            debut, fin = self.vocab_offsets[bas], self.vocab_offsets[bas + 1]
+            if self.vocab[debut:fin].tobytes() == cle:
+                return bas
+        return None
+
+    def voisins(self, tag):
+        """Renvoie (identifiants, poids) des voisins de `tag`, triés par poids décroissant, sans copie."""
+        tag_id = self.id_de(tag)
+        if tag_id is None:
+            return self.voisins_ids[0:0], self.poids[0:0]
+        debut, fin = self.offsets[tag_id], self.offsets[tag_id + 1]
+        return self.voisins_ids[debut:fin], self.poids[debut:fin]
+
+    def top(self, tag, k=10):
+        """Renvoie les k relations les plus fortes de `tag` sous forme de paires (tag, poids)."""
+        ids, poids = self.voisins(tag)
+        return [(self.nom(i), float(w)) for i, w in zip(ids[:k], poids[:k])]
+
+
+if __name__ == "__main__":
+    construire_csr()
\ No newline at end of file
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Degrés des tags, élagage des hubs et normalisation des poids avant la construction du CSR.
+
+Quelques tags très généraux (`photography`, `nature`, `travel`...) sont reliés à presque
+tous les autres : ils gonflent le fichier de relations et envahissent les meilleurs
+voisins de chaque mot-clé. Le degré (nombre de voisins) et le degré pondéré (somme des
+poids) de chaque tag sont calculés en une passe sur le tableau des arêtes canoniques,
+puis, au choix :
+
+- `degre_hub`     : les arêtes touchant un tag de degré supérieur sont supprimées ;
+- `normalisation` : les poids sont repondérés pour pénaliser les hubs
+    - `pmi`   : information mutuelle ponctuelle positive, log(w·S / (s_a·s_b)), où s est
+                le degré pondéré et S la somme des degrés pondérés ; les arêtes dont la
+                PMI est nulle ou négative sont supprimées ;
+    - `tfidf` : w·√(idf_a·idf_b), avec idf = log(n_tags / degré) ;
+- `degre_max`     : chaque tag ne garde que ses `degre_max` voisins les plus forts
+                    (après normalisation).
+
+Toutes les opérations sont vectorisées sur les tableaux d'arêtes.
+"""
+
+import numpy as np
+
+NORMALISATIONS = ("pmi", "tfidf")
+
+
+def calculer_degres(aretes, n_tags):
+    """Renvoie le degré (int64) et le degré pondéré (float64) de chaque tag d'un tableau d'arêtes canoniques."""
+    extremites = np.concatenate((aretes['tag1'], aretes['tag2']))
+    poids = np.tile(aretes['weight'].astype(np.float64), 2)
+    return (np.bincount(extremites, minlength=n_tags),
+            np.bincount(extremites, weights=poids, minlength=n_tags))
+
+
+def afficher_degres(noms, degres, forces, n=10):
+    """Affiche la répartition des degrés et les `n` tags les plus connectés."""
+    connectes = degres[degres > 0]
+    if not len(connectes):
+        return
+    print(f"📈 Degrés : médiane {np.median(connectes):g}, 99e centile {np.percentile(connectes, 99):g}, "
+          f"maximum {connectes.max():,}")
+    hubs = np.argsort(-degres, kind='stable')[:n]
+    print("   Tags les plus connectés : "
+          + ", ".join(f"{noms[i]} ({degres[i]:,} / {forces[i]:.1f})" for i in hubs if degres[i] > 0))
+
+
+def retirer_hubs(aretes, degres, degre_hub):
+    """Supprime les arêtes dont l'une des extrémités a un degré supérieur à `degre_hub`."""
+    return aretes[(degres[aretes['tag1']] <= degre_hub) & (degres[aretes['tag2']] <= degre_hub)]
+
+
+def normaliser_poids(aretes, degres, forces, methode):
+    """
+    Repondère les arêtes selon `methode` (`pmi` ou `tfidf`) à partir des degrés de leurs extrémités.
+
+    Renvoie un nouveau tableau d'arêtes, dont celles de poids nul ou négatif sont retirées.
+    """
+    if methode not in NORMALISATIONS:
+        raise ValueError(f"Normalisation inconnue : '{methode}' (attendu : {', '.join(NORMALISATIONS)})")
+
+    poids = aretes['weight'].astype(np.float64)
+    if methode == "pmi":
+        total = forces.sum()
+        with np.errstate(divide='ignore'):
+            poids = np.log(poids * total / (forces[aretes['tag1']] * forces[aretes['tag2']]))
+    else:
+        idf = np.log(np.count_nonzero(degres) / np.maximum(degres, 1))
+        poids = poids * np.sqrt(idf[aretes['tag1']] * idf[aretes['tag2']])
+
+    resultat = aretes[poids > 0]
+    resultat['weight'] = poids[poids > 0]
+    return resultat
+
+
+def plafonner_degre(sources, cibles, poids, degre_max):
+    """
+    Ne garde, pour chaque tag source, que ses `degre_max` arêtes orientées les plus fortes.
+
+    Les égalités de poids sont départagées par l'ordre d'origine.
+    """
+    if not len(sources):
+        return sources, cibles, poids
+    ordre = np.lexsort((-poids, sources))
+    sources_triees = sources[ordre]
+    debuts = np.flatnonzero(np.r_[True, sources_triees[1:] != sources_triees[:-1]])
+    rangs = np.arange(len(ordre)) - np.repeat(debuts, np.diff(np.r_[debuts, len(ordre)]))
+    gardes = np.sort(ordre[rangs < degre_max])
+    return sources[gardes], cibles[gardes], poids[gardes]
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Lecture du fichier HIERTAGS par plages d'octets.
+
+Le fichier TSV est découpé en plages alignées sur les fins de ligne, que l'on peut
+traiter indépendamment (et donc en parallèle) puis recoller dans l'ordre.
+"""
+
+import hashlib
+import io
+import os
+from itertools import islice
+
+import pandas as pd
+
+COLONNES = ['tag1', 'tag2', 'weight']
+
+# Taille des lectures pour le calcul des empreintes
+TAILLE_LECTURE = 4 * 1024 * 1024
+
+
+def decouper_en_plages(input_filename, taille_plage):
+    """Découpe le fichier en plages [debut, fin) d'environ `taille_plage` octets, alignées sur les lignes."""
+    taille = os.path.getsize(input_filename)
+    plages = []
+
+    with open(input_filename, 'rb') as f:
+        debut = 0
+        while debut < taille:
+            fin = min(debut + taille_plage, taille)
+            if fin < taille:
+                # Avancer jusqu'à la fin de la ligne en cours
+                f.seek(fin)
+                f.readline()
+                fin = f.tell()
+            plages.append((debut, fin))
+            debut = fin
+
+    return plages
+
+
+def empreinte_plage(input_filename, debut, fin):
+    """Renvoie l'empreinte BLAKE2b (hexadécimale, 128 bits) du contenu de la plage [debut, fin)."""
+    empreinte = hashlib.blake2b(digest_size=16)
+    with open(input_filename, 'rb') as f:
+        f.seek(debut)
+        restant = fin - debut
+        while restant > 0:
+            donnees = f.read(min(TAILLE_LECTURE, restant))
+            if not donnees:
+                break
+            empreinte.update(donnees)
+            restant -= len(donnees)
+    return empreinte.hexdigest()
+
+
+def lire_tsv(donnees, categoriel=False):
+    """
+    Analyse un bloc d'octets TSV complet (lignes entières) en DataFrame.
+
+    Avec `categoriel=True`, les colonnes de tags sont lues en type `category` :
+    chaque tag distinct du bloc n'est alors stocké qu'une fois.
+    """
+    dtype = {'tag1': 'category', 'tag2': 'category'} if categoriel else None
+    try:
+        return pd.read_csv(io.BytesIO(donnees), sep='\t', header=None, names=COLONNES, dtype=dtype)
+    except pd.errors.EmptyDataError:
+        # Bloc composé uniquement de lignes vides
+        vide = pd.DataFrame({colonne: pd.Series(dtype=object) for colonne in COLONNES})
+        return vide.astype(dtype or {})
+
+
+def lire_plage(input_filename, debut, fin, chunk_size, categoriel=False):
+    """
+    Parcourt la plage [debut, fin) par lots d'au plus `chunk_size` lignes.
+
+    Produit des couples (lot, position) où `position` est l'offset, dans le fichier,
+    de la première ligne non encore lue après ce lot. `chunk_size` peut être une fonction
+    sans argument, rappelée avant chaque lot (taille variable, voir `hiertags_memoire.py`).
+    """
+    with open(input_filename, 'rb') as f:
+        f.seek(debut)
+        position = debut
+        while position < fin:
+            lignes = []
+            for ligne in islice(f, chunk_size() if callable(chunk_size) else chunk_size):
+                lignes.append(ligne)
+                position += len(ligne)
+                if position >= fin:
+                    break
+            if not lignes:
+                break
+            yield lire_tsv(b''.join(lignes), categoriel), position
\ No newline at end of file
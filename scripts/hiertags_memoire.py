@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Taille des lots adaptée à un budget mémoire pendant l'ingestion HIERTAGS.
+
+Après chaque lot, le régulateur mesure la mémoire résidente du processus (RSS) et le
+débit (lignes/s), puis choisit la taille du lot suivant :
+
+- la mémoire occupée par ligne est estimée à partir de l'écart entre le RSS mesuré et
+  celui du démarrage ; la taille ne dépasse jamais celle qui remplirait `MARGE` du budget ;
+- tant que le débit progresse, la taille augmente (×`PAS`) ; si le débit baisse, elle
+  revient à la meilleure taille connue ;
+- si le RSS dépasse le budget, la taille est divisée par deux.
+
+Le RSS est lu dans /proc/self/statm (Linux), ou à défaut avec `psutil` s'il est installé.
+"""
+
+import os
+import time
+
+try:
+    import psutil
+except ImportError:  # Nécessaire uniquement hors Linux
+    psutil = None
+
+# Part du budget que les lots peuvent occuper (le reste absorbe les pics d'analyse)
+MARGE = 0.8
+
+# Facteur d'augmentation de la taille des lots tant que le débit progresse
+PAS = 1.5
+
+TAILLE_MIN = 10000
+TAILLE_MAX = 5000000
+
+
+def memoire_residente():
+    """Renvoie la mémoire résidente du processus en octets, ou None si elle n'est pas mesurable."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+class RegulateurLots:
+    """
+    Taille de lot ajustée après chaque lot pour maximiser le débit sous `budget_mo` mégaoctets.
+
+    S'utilise à la place d'une taille fixe : appeler l'objet renvoie la taille du prochain lot.
+    """
+
+    def __init__(self, taille_initiale, budget_mo):
+        self.taille = int(taille_initiale)
+        self.budget = budget_mo * 1024 * 1024
+        self.base = memoire_residente()
+        self.octets_par_ligne = None
+        self.meilleur_debit, self.meilleure_taille = 0.0, self.taille
+        self.averti = False
+        self.debut = time.perf_counter()
+        if self.base is None:
+            print("⚠️ Mémoire résidente non mesurable (ni /proc, ni psutil) : taille de lot fixe.")
+
+    def __call__(self):
+        return self.taille
+
+    def mesurer(self, lignes):
+        """Enregistre un lot de `lignes` lignes (terminé maintenant) et choisit la taille du suivant."""
+        maintenant = time.perf_counter()
+        duree, self.debut = maintenant - self.debut, maintenant
+        debit = lignes / duree if duree > 0 else 0.0
+        rss = memoire_residente()
+        if self.base is None or rss is None or not lignes:
+            return
+
+        taille_lot = self.taille
+        estimation = max(rss - self.base, 0) / lignes
+        # Le RSS redescend rarement : on garde l'estimation la plus prudente des derniers lots
+        if self.octets_par_ligne is None:
+            self.octets_par_ligne = estimation
+        else:
+            self.octets_par_ligne = max(estimation, 0.5 * self.octets_par_ligne)
+        plafond = (self.budget * MARGE - self.base) / max(self.octets_par_ligne, 1)
+
+        if rss > self.budget:
+            self.taille //= 2
+        elif debit >= self.meilleur_debit or taille_lot == self.meilleure_taille:
+            if debit >= self.meilleur_debit:
+                self.meilleur_debit, self.meilleure_taille = debit, taille_lot
+            self.taille = int(taille_lot * PAS)
+        else:
+            self.taille = self.meilleure_taille
+        self.taille = int(min(max(min(self.taille, plafond), TAILLE_MIN), TAILLE_MAX))
+
+        print(f"  ⚙️ {lignes:,} lignes en {duree:.2f} s ({debit:,.0f} lignes/s), "
+              f"RSS {rss / 1024 / 1024:,.0f} Mo / {self.budget / 1024 / 1024:,.0f} Mo "
+              f"→ prochain lot : {self.taille:,} lignes")
+        if rss > self.budget and self.taille == TAILLE_MIN and not self.averti:
+            print(f"⚠️ Budget dépassé même avec des lots de {TAILLE_MIN:,} lignes : "
+                  "la mémoire est occupée par le reste du traitement.")
+            self.averti = True
\ No newline at end of file
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Moteur de lecture `mmap` du fichier HIERTAGS, alternative à `pandas.read_csv`.
+
+Le fichier est projeté en mémoire (`mmap`) et chaque lot est analysé directement dans
+le tampon d'octets, par des balayages NumPy vectorisés :
+
+1. les fins de ligne et les tabulations sont repérées en une passe (`octets == 0x0A`, `0x09`) ;
+2. les poids sont convertis sans passer par des chaînes Python : les chiffres de chaque
+   champ sont accumulés en un entier (mantisse), divisé par la puissance de 10 voulue,
+   ce qui donne le même flottant que `float()` ; les champs d'une autre forme
+   (exposant, `nan`, plus de 15 chiffres...) sont convertis un par un. L'analyseur par
+   défaut de `read_csv` n'est pas toujours correctement arrondi au-delà de 15 chiffres :
+   les poids les plus longs peuvent alors différer de ceux du moteur `pandas` ;
+3. les lignes sous `min_weight` sont écartées avant toute création de chaîne ;
+4. les tags des lignes gardées sont factorisés sur leurs octets (par tranches de 8 octets
+   lues comme des entiers) : seuls les tags distincts du lot sont décodés en `str`, et
+   les colonnes peuvent être renvoyées en type `category` sans autre conversion.
+
+Un lot qui sort du cas simple (champ entre guillemets, nombre de champs inattendu) est confié à
+`pandas.read_csv`, pour un résultat identique. Contrairement à `read_csv` sans type
+imposé, les tags sont toujours lus comme du texte (`007` reste `007`).
+"""
+
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from hiertags_lecture import lire_tsv
+
+MOTEURS = ("pandas", "mmap")
+
+# Valeurs lues comme manquantes par pandas.read_csv (na_values par défaut)
+VALEURS_MANQUANTES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                      '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+# Au-delà de cette longueur, les tags d'un lot ne sont pas regroupés en tableau de largeur fixe
+LARGEUR_MAX_TAG = 128
+
+# Au-delà de cette longueur, un champ de poids est converti par float()
+LARGEUR_MAX_POIDS = 24
+
+# Puissances de 10 exactes en float64 : mantisse / 10**k est alors arrondie comme float()
+PUISSANCES_10 = np.array([float(10 ** k) for k in range(16)])
+
+
+def _colonne_octets(octets, debuts, longueurs, j):
+    """Octet n° `j` de chaque champ (0 au-delà de sa longueur)."""
+    return np.where(j < longueurs, octets[np.minimum(debuts + j, len(octets) - 1)], 0)
+
+
+def _convertir_poids(octets, debuts, longueurs):
+    """Convertit les champs de poids en float64, comme float() (NaN pour un champ invalide)."""
+    poids = np.full(len(debuts), np.nan)
+    simples = (longueurs > 0) & (longueurs <= LARGEUR_MAX_POIDS)
+    if simples.any():
+        indices = np.flatnonzero(simples)
+        d, n = debuts[indices], longueurs[indices]
+        mantisses = np.zeros(len(d), dtype=np.int64)
+        n_chiffres = np.zeros(len(d), dtype=np.int64)
+        apres_point = np.zeros(len(d), dtype=np.int64)
+        vu_point = np.zeros(len(d), dtype=bool)
+        negatifs = np.zeros(len(d), dtype=bool)
+        valides = np.ones(len(d), dtype=bool)
+        # Forme acceptée : [signe] chiffres [. chiffres], parcourue colonne par colonne
+        for j in range(int(n.max())):
+            c = _colonne_octets(octets, d, n, j)
+            chiffre = (c >= 0x30) & (c <= 0x39)
+            point = c == 0x2E
+            autorise = chiffre | point | (j >= n)
+            if j == 0:
+                negatifs = c == 0x2D
+                autorise |= negatifs | (c == 0x2B)
+            valides &= autorise & ~(point & vu_point)
+            mantisses = np.where(chiffre, mantisses * 10 + (c.astype(np.int64) - 0x30), mantisses)
+            n_chiffres += chiffre
+            apres_point += chiffre & vu_point
+            vu_point |= point
+        # Au plus 15 chiffres : la mantisse est un entier exact en float64
+        valides &= (n_chiffres > 0) & (n_chiffres <= 15)
+        valeurs = mantisses / PUISSANCES_10[np.minimum(apres_point, 15)]
+        valeurs = np.where(negatifs, -valeurs, valeurs)
+        poids[indices[valides]] = valeurs[valides]
+        simples[indices[~valides]] = False
+
+    # Autres formes (exposant, inf, nan...) : conversion individuelle
+    for i in np.flatnonzero(~simples & (longueurs > 0)).tolist():
+        try:
+            poids[i] = float(bytes(octets[debuts[i]:debuts[i] + longueurs[i]]))
+        except ValueError:
+            pass
+    return poids
+
+
+def _decoder(octets, debuts, longueurs):
+    """
+    Décode les champs [debut, debut + longueur) en chaînes, en un seul appel : les champs sont
+    copiés bout à bout, séparés par des tabulations (absentes des champs), puis découpés.
+    """
+    if not len(debuts):
+        return []
+    fins = np.cumsum(longueurs + 1)
+    sources = np.repeat(debuts - (fins - longueurs - 1), longueurs + 1) + np.arange(fins[-1])
+    tampon = octets[np.minimum(sources, len(octets) - 1)]
+    tampon[fins - 1] = 0x09
+    return tampon[:-1].tobytes().decode('utf-8').split('\t')
+
+
+def _colonne_tags(octets, debuts, longueurs, categoriel):
+    """
+    Construit une colonne de tags (catégorielle ou objet) ; seuls les tags distincts sont décodés.
+
+    Les tags sont factorisés par tranches de 8 octets lues comme des entiers (tables de
+    hachage de pandas), en combinant à chaque tranche le code obtenu avec le précédent :
+    aucune chaîne n'est créée avant de connaître les tags distincts.
+    """
+    largeur = int(longueurs.max()) if len(longueurs) else 0
+    if largeur <= LARGEUR_MAX_TAG:
+        # La longueur fait partie de la clé : 'a' et 'a\0' restent distincts
+        codes, _ = pd.factorize(longueurs)
+        for tranche in range(0, largeur, 8):
+            mot = np.zeros(len(debuts), dtype=np.uint64)
+            for j in range(tranche, min(tranche + 8, largeur)):
+                mot |= _colonne_octets(octets, debuts, longueurs, j).astype(np.uint64) << np.uint64(8 * (j - tranche))
+            codes_mot, mots = pd.factorize(mot)
+            codes, _ = pd.factorize(codes * len(mots) + codes_mot)
+        # Première occurrence de chaque code (les codes suivent l'ordre d'apparition)
+        premiers = np.flatnonzero(np.r_[True, np.diff(np.maximum.accumulate(codes)) > 0]) if len(codes) else codes
+        noms = _decoder(octets, debuts[premiers], longueurs[premiers])
+    else:
+        champs = [bytes(octets[d:d + n]) for d, n in zip(debuts.tolist(), longueurs.tolist())]
+        codes, uniques = pd.factorize(np.array(champs, dtype=object))
+        noms = [u.decode('utf-8') for u in uniques]
+
+    # Valeurs manquantes au sens de pandas : code -1
+    if VALEURS_MANQUANTES.intersection(noms):
+        manquants = np.array([nom in VALEURS_MANQUANTES for nom in noms], dtype=bool)
+        renumerotation = np.r_[np.where(manquants, -1, np.cumsum(~manquants) - 1), -1]
+        codes = renumerotation[codes]
+        noms = [nom for nom, manquant in zip(noms, manquants) if not manquant]
+    if not categoriel:
+        return np.array(noms + [np.nan], dtype=object)[codes]  # Code -1 : dernier élément (NaN)
+    return pd.Categorical.from_codes(codes, categories=pd.Index(noms, dtype=object))
+
+
+def analyser_tsv(donnees, categoriel=False, min_weight=None):
+    """
+    Analyse un bloc d'octets TSV complet (lignes entières) comme `lire_tsv`, sans créer de
+    chaîne pour les lignes dont le poids est inférieur à `min_weight`.
+
+    Le nombre de lignes analysées (avant filtrage) est conservé dans `lot.attrs["lignes"]`.
+    """
+    octets = np.frombuffer(donnees, dtype=np.uint8) if not isinstance(donnees, np.ndarray) else donnees
+    fins = np.flatnonzero(octets == 0x0A)
+    if len(octets) and (not len(fins) or fins[-1] != len(octets) - 1):
+        fins = np.append(fins, len(octets))  # Dernière ligne sans fin de ligne
+    debuts = np.r_[0, fins[:-1] + 1].astype(np.int64)
+    # Fin de ligne Windows : le \r final ne fait pas partie du poids
+    fins_champ = fins - ((fins > debuts) & (octets[np.maximum(fins - 1, 0)] == 0x0D))
+    vides = fins_champ == debuts
+
+    tabulations = np.flatnonzero(octets == 0x09)
+    par_ligne = np.bincount(np.searchsorted(fins, tabulations), minlength=len(fins))
+    # Un guillemet n'a de sens pour read_csv qu'en début de champ (ailleurs, il est lu tel quel)
+    guillemets = np.flatnonzero(octets == 0x22)
+    if len(guillemets):
+        precedents = octets[np.maximum(guillemets - 1, 0)]
+        guillemets = guillemets[(guillemets == 0) | (precedents == 0x09) | (precedents == 0x0A)]
+    if (par_ligne[~vides] != 2).any() or par_ligne[vides].any() or len(guillemets):
+        # Cas que seul read_csv sait traiter (champs entre guillemets, manquants ou en trop)
+        lot = lire_tsv(octets.tobytes(), categoriel)
+        lignes = len(lot)
+        if min_weight is not None and len(lot):
+            lot = lot[lot['weight'] >= min_weight]
+        lot.attrs["lignes"] = lignes
+        return lot
+
+    debuts, fins_champ = debuts[~vides], fins_champ[~vides]
+    tab1, tab2 = tabulations[0::2], tabulations[1::2]
+    poids = _convertir_poids(octets, tab2 + 1, fins_champ - tab2 - 1)
+
+    gardes = poids >= min_weight if min_weight is not None else np.ones(len(poids), dtype=bool)
+    debuts, tab1, tab2, poids = debuts[gardes], tab1[gardes], tab2[gardes], poids[gardes]
+    lot = pd.DataFrame({
+        'tag1': _colonne_tags(octets, debuts, tab1 - debuts, categoriel),
+        'tag2': _colonne_tags(octets, tab1 + 1, tab2 - tab1 - 1, categoriel),
+        'weight': poids,
+    })
+    lot.attrs["lignes"] = len(gardes)
+    return lot
+
+
+def lire_plage_mmap(input_filename, debut, fin, chunk_size, categoriel=False, min_weight=None):
+    """
+    Équivalent de `hiertags_lecture.lire_plage` sur un fichier projeté en mémoire : produit
+    des couples (lot, position) de `chunk_size` lignes au plus (lignes sous `min_weight`
+    écartées). `chunk_size` peut être une fonction rappelée avant chaque lot.
+    """
+    if fin <= debut or os.path.getsize(input_filename) == 0:
+        return
+    with open(input_filename, 'rb') as f:
+        projection = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    octets = np.frombuffer(projection, dtype=np.uint8)
+    try:
+        position, octets_par_ligne = debut, 64
+        while position < fin:
+            taille = chunk_size() if callable(chunk_size) else chunk_size
+            # Fenêtre élargie jusqu'à contenir `taille` lignes (ou la fin de la plage)
+            fenetre = min(fin, position + taille * octets_par_ligne)
+            fins = np.flatnonzero(octets[position:fenetre] == 0x0A)
+            while len(fins) < taille and fenetre < fin:
+                suite = min(fin, fenetre + max(fenetre - position, 1 << 20))
+                fins = np.concatenate((fins, np.flatnonzero(octets[fenetre:suite] == 0x0A) + fenetre - position))
+                fenetre = suite
+            fin_lot = position + int(fins[taille - 1]) + 1 if len(fins) >= taille else fenetre
+            yield analyser_tsv(octets[position:fin_lot], categoriel, min_weight), fin_lot
+            octets_par_ligne = max(1, int(1.1 * (fin_lot - position) / max(min(len(fins), taille), 1)))
+            position = fin_lot
+    finally:
+        del octets
+        projection.close()
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Stockage des relations HIERTAGS en Parquet (format de sortie `parquet`, nécessite `pyarrow`).
+
+Pendant l'ingestion, chaque lot est écrit dans son propre fichier Parquet brut, sous forme
+canonique (tag1 < tag2), dans `<prefixe>.parquet.brut/`. En fin de traitement, les doublons
+sont fusionnés puis les relations sont écrites dans les deux sens (colonnes `tag`,
+`related`, `weight`, comme le JSONL) dans un jeu de données `<prefixe>.parquet/` :
+
+- partitionné par tranche de poids (`bande=<i>/`, bornes de `statistiques_poids.SEUILS`) :
+  un filtre sur le poids écarte des dossiers entiers ;
+- trié par tag puis par poids décroissant dans chaque tranche, découpé en groupes de lignes
+  dont les statistiques min/max sont enregistrées : un filtre sur les tags ne lit que les
+  quelques groupes qui peuvent les contenir ;
+- colonnes de tags encodées par dictionnaire.
+
+`RelationsParquet` lit ce jeu de données en poussant les filtres de tags et de poids dans
+la lecture, et offre la même interface (`in`, `top`) que les autres stockages.
+"""
+
+import json
+import os
+import shutil
+from functools import reduce
+from operator import or_
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Nécessaire uniquement pour le format parquet
+    pa = None
+
+from statistiques_poids import SEUILS
+
+# Fonctions d'agrégation Arrow correspondant à `hiertags_sorties.REDUCTEURS`
+AGREGATIONS_ARROW = {"max": "max", "sum": "sum", "mean": "mean"}
+
+# Description du jeu de données (ignorée par la lecture Arrow, comme tout fichier commençant par '_')
+FICHIER_BANDES = '_bandes.json'
+
+# Au-delà de ce nombre de tags, le filtre de lecture est un test d'appartenance
+TAGS_PAR_EGALITES = 32
+
+
+def _verifier_pyarrow():
+    if pa is None:
+        raise ImportError("Le format parquet nécessite pyarrow (pip install pyarrow).")
+
+
+def _colonne_arrow(colonne):
+    """Convertit une colonne de tags en tableau Arrow de chaînes (tag manquant : 'nan', comme en JSONL)."""
+    return pa.array(colonne.astype(object).fillna('nan').astype(str).to_numpy(dtype=object), type=pa.string())
+
+
+class SortieParquet:
+    """
+    Sortie Parquet : un fichier brut par lot dans `<chemin>.brut/`, relations canoniques (tag1 < tag2).
+
+    L'état validé est le nombre de fichiers de lot : une reprise supprime ceux qui le dépassent.
+    Avec `oriente`, chaque lot contient les deux sens d'une même relation ; seule sa forme
+    canonique est écrite.
+    """
+
+    categoriel = False
+
+    def __init__(self, chemin, oriente=False):
+        _verifier_pyarrow()
+        self.chemin = chemin
+        self.dossier_brut = chemin + '.brut'
+        self.oriente = oriente
+        self.lots = 0
+
+    def _chemin_lot(self, numero):
+        return os.path.join(self.dossier_brut, f"lot_{numero:06d}.parquet")
+
+    def _fichiers_lots(self):
+        if not os.path.isdir(self.dossier_brut):
+            return []
+        return sorted(nom for nom in os.listdir(self.dossier_brut) if nom.startswith('lot_'))
+
+    def coherente(self, etat):
+        return len(self._fichiers_lots()) >= etat["lots"]
+
+    def ouvrir(self, etat=None):
+        if etat is None:
+            shutil.rmtree(self.dossier_brut, ignore_errors=True)
+        os.makedirs(self.dossier_brut, exist_ok=True)
+        self.lots = etat["lots"] if etat else 0
+        # Effacer les lots écrits après le dernier état validé
+        for nom in self._fichiers_lots()[self.lots:]:
+            os.remove(os.path.join(self.dossier_brut, nom))
+
+    def _ajouter(self, table):
+        chemin = self._chemin_lot(self.lots)
+        pq.write_table(table, chemin + '.tmp')
+        os.replace(chemin + '.tmp', chemin)
+        self.lots += 1
+
+    def ecrire(self, chunk_filtered):
+        if not len(chunk_filtered):
+            return
+        tags1 = _colonne_arrow(chunk_filtered['tag1'])
+        tags2 = _colonne_arrow(chunk_filtered['tag2'])
+        inverser = pc.greater(tags1, tags2)
+        table = pa.table({'tag1': pc.if_else(inverser, tags2, tags1),
+                          'tag2': pc.if_else(inverser, tags1, tags2),
+                          'weight': pa.array(chunk_filtered['weight'].to_numpy(dtype=np.float64))})
+        if self.oriente:
+            table = table.group_by(['tag1', 'tag2', 'weight'], use_threads=False).aggregate([])
+        self._ajouter(table)
+
+    def valider(self):
+        return {"lots": self.lots}
+
+    def fermer(self):
+        pass
+
+    def assembler(self, parties):
+        """Recopie, dans l'ordre, les fichiers de lot des sorties partielles `parties`."""
+        self.ouvrir()
+        for partie in parties:
+            for nom in partie._fichiers_lots():
+                shutil.copyfile(os.path.join(partie.dossier_brut, nom), self._chemin_lot(self.lots))
+                self.lots += 1
+
+
+def indexer_parquet(chemin, reducteur="max", taille_groupe=65536):
+    """
+    Fusionne les lots bruts de `<chemin>.brut/` et écrit le jeu de données Parquet `chemin`.
+
+    Les paires présentes plusieurs fois sont combinées par `reducteur` (`max`, `sum` ou `mean`).
+    `taille_groupe` est le nombre de lignes des groupes de lignes (unité de lecture sélective).
+    """
+    _verifier_pyarrow()
+    print(f"🗂️ Écriture du jeu de données Parquet '{chemin}'...")
+    dossier_brut = chemin + '.brut'
+    brut = ds.dataset(dossier_brut, format='parquet').to_table()
+    aretes = brut.group_by(['tag1', 'tag2'], use_threads=False).aggregate(
+        [("weight", AGREGATIONS_ARROW[reducteur])])
+    aretes = aretes.rename_columns(['tag1', 'tag2', 'weight'])
+
+    # Les deux sens de chaque relation (une seule fois pour une boucle tag -> tag)
+    inverses = aretes.filter(pc.not_equal(aretes['tag1'], aretes['tag2']))
+    relations = pa.concat_tables([
+        pa.table({'tag': aretes['tag1'], 'related': aretes['tag2'], 'weight': aretes['weight']}),
+        pa.table({'tag': inverses['tag2'], 'related': inverses['tag1'], 'weight': inverses['weight']}),
+    ])
+    bornes = np.asarray(SEUILS, dtype=np.float64)
+    bandes = np.maximum(np.searchsorted(bornes, relations['weight'].to_numpy(), side='right') - 1, 0)
+
+    temporaire = chemin + '.tmp'
+    shutil.rmtree(temporaire, ignore_errors=True)
+    os.makedirs(temporaire)
+    for bande in np.unique(bandes).tolist():
+        partie = relations.filter(pa.array(bandes == bande)).sort_by(
+            [('tag', 'ascending'), ('weight', 'descending'), ('related', 'ascending')])
+        os.makedirs(os.path.join(temporaire, f"bande={bande}"))
+        pq.write_table(partie, os.path.join(temporaire, f"bande={bande}", "relations.parquet"),
+                       row_group_size=taille_groupe, use_dictionary=['tag', 'related'],
+                       write_statistics=True)
+
+    n_tags = len(pc.unique(pa.chunked_array(aretes['tag1'].chunks + aretes['tag2'].chunks)))
+    with open(os.path.join(temporaire, FICHIER_BANDES), 'w', encoding='utf-8') as f:
+        json.dump({"bornes": bornes.tolist(), "reducteur": reducteur,
+                   "relations": len(relations), "tags": n_tags}, f)
+    shutil.rmtree(chemin, ignore_errors=True)
+    os.replace(temporaire, chemin)
+    shutil.rmtree(dossier_brut, ignore_errors=True)
+    print(f"✅ Jeu de données Parquet écrit ({len(aretes):,} relations, {n_tags:,} tags, "
+          f"{len(np.unique(bandes))} tranches de poids).")
+
+
+class RelationsParquet:
+    """
+    Accès en lecture au jeu de données écrit par `indexer_parquet`.
+
+    Seules les relations de poids au moins `min_weight` sont lues. Les voisins d'un tag sont
+    lus à la première demande ; `precharger` lit ceux de plusieurs tags en une seule passe.
+    """
+
+    def __init__(self, chemin="hiertags_relations_raw.parquet", min_weight=None):
+        _verifier_pyarrow()
+        self.chemin = chemin
+        self.min_weight = min_weight
+        with open(os.path.join(chemin, FICHIER_BANDES), 'r', encoding='utf-8') as f:
+            self.description = json.load(f)
+        self.dataset = ds.dataset(chemin, format='parquet', partitioning='hive')
+        self.voisins = {}
+
+    def __len__(self):
+        return self.description["tags"]
+
+    def _filtre(self, tags):
+        """Filtre Arrow des relations de `tags` au-dessus de `min_weight` (tranches et groupes de lignes)."""
+        # Peu de tags : égalités (élagage le plus fin des groupes de lignes) ; beaucoup : `isin`,
+        # dont le coût ne croît pas avec le nombre de tags
+        if len(tags) <= TAGS_PAR_EGALITES:
+            filtre = reduce(or_, (ds.field('tag') == tag for tag in tags))
+        else:
+            filtre = ds.field('tag').isin(tags)
+        if self.min_weight is not None:
+            # Tranches dont la borne supérieure est au-dessus du seuil, puis filtre exact
+            premiere = max(int(np.searchsorted(self.description["bornes"], self.min_weight, side='right')) - 1, 0)
+            filtre &= (ds.field('bande') >= premiere) & (ds.field('weight') >= self.min_weight)
+        return filtre
+
+    def precharger(self, tags):
+        """Lit en une passe les voisins des `tags` non encore lus."""
+        tags = [tag for tag in dict.fromkeys(tags) if tag not in self.voisins]
+        if not tags:
+            return
+        table = self.dataset.to_table(columns=['tag', 'related', 'weight'], filter=self._filtre(tags))
+        table = table.sort_by([('tag', 'ascending'), ('weight', 'descending'), ('related', 'ascending')])
+        for tag in tags:
+            self.voisins[tag] = []
+        for tag, voisin, poids in zip(*(table[colonne].to_pylist() for colonne in ('tag', 'related', 'weight'))):
+            self.voisins[tag].append((voisin, poids))
+
+    def __contains__(self, tag):
+        self.precharger([tag])
+        return bool(self.voisins[tag])
+
+    def top(self, tag, k=10):
+        """Renvoie les k relations les plus fortes de `tag` sous forme de paires (tag, poids)."""
+        self.precharger([tag])
+        return self.voisins[tag][:k]
+
+    def fermer(self):
+        self.voisins.clear()
\ No newline at end of file
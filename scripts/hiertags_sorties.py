@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Formats de sortie de l'ingestion HIERTAGS.
+
+- `jsonl`   : une ligne JSON par sens de relation (format historique, lu par la fusion)
+- `entiers` : vocabulaire des tags (`<prefixe>.vocab.txt`, une ligne par tag, l'identifiant
+              int32 est le numéro de ligne) et arêtes binaires (`<prefixe>.aretes.bin`,
+              enregistrements int32/int32/float32, une seule fois par ligne du TSV, sous
+              forme canonique non orientée : tag1 < tag2)
+- `sqlite`  : base SQLite indexée (`<prefixe>.sqlite`), voir `hiertags_sqlite.py`
+- `parquet` : jeu de données Parquet partitionné par tranche de poids (`<prefixe>.parquet/`),
+              voir `hiertags_parquet.py`
+
+Chaque sortie sait se tronquer à un état validé, ce qui permet une reprise après
+interruption sans doublon ni ligne partielle.
+"""
+
+import json
+import os
+import shutil
+from json.encoder import encode_basestring
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("jsonl", "entiers", "sqlite", "parquet")
+
+# Agrégations possibles des poids d'une même arête non orientée présente plusieurs fois
+REDUCTEURS = ("max", "sum", "mean")
+
+# Enregistrement binaire d'une arête : identifiants des deux tags et poids
+ARETE = np.dtype([('tag1', '<i4'), ('tag2', '<i4'), ('weight', '<f4')])
+
+
+def serialiser_relations(chunk_filtered, deux_sens=True):
+    """
+    Sérialise un lot filtré en JSONL, les deux sens de chaque relation à la suite
+    (ou seulement le sens tag1 -> tag2 si `deux_sens` est faux).
+
+    Le travail est fait par colonnes : chaque tag et chaque poids distinct du lot
+    n'est encodé qu'une seule fois, puis les lignes sont assemblées par indexation.
+    Le résultat est identique octet pour octet à deux `json.dumps(..., ensure_ascii=False)`
+    par relation, appliqués à `str(tag)` et `float(weight)`.
+    """
+    n = len(chunk_filtered)
+    if n == 0:
+        return ''
+
+    tags = pd.concat([chunk_filtered['tag1'], chunk_filtered['tag2']], ignore_index=True)
+    codes, uniques = pd.factorize(tags.astype(str).fillna('nan'))
+    codes1, codes2 = codes[:n], codes[n:]
+    tags_json = np.array(list(map(encode_basestring, uniques)), dtype=object)
+    debuts = '{"tag": ' + tags_json + ', "related": '
+
+    codes_poids, poids = pd.factorize(chunk_filtered['weight'].to_numpy(dtype=np.float64))
+    if np.isinf(poids).any():
+        poids_json = [json.dumps(w) for w in poids.tolist()]  # json écrit "Infinity"
+    else:
+        poids_json = list(map(float.__repr__, poids.tolist()))
+    fins = (', "weight": ' + np.array(poids_json, dtype=object) + '}\n')[codes_poids]
+
+    if not deux_sens:
+        return ''.join(debuts[codes1] + tags_json[codes2] + fins)
+
+    lignes = np.empty(2 * n, dtype=object)
+    lignes[0::2] = debuts[codes1] + tags_json[codes2] + fins
+    lignes[1::2] = debuts[codes2] + tags_json[codes1] + fins
+    return ''.join(lignes)
+
+
+def canoniser(aretes):
+    """Remet en place chaque arête sous sa forme canonique (plus petit identifiant en `tag1`)."""
+    tag1 = np.minimum(aretes['tag1'], aretes['tag2'])
+    aretes['tag2'] = np.maximum(aretes['tag1'], aretes['tag2'])
+    aretes['tag1'] = tag1
+    return aretes
+
+
+def aggreger_aretes(aretes, reducteur="max"):
+    """
+    Fusionne les arêtes non orientées en double, (a, b) et (b, a) comprises.
+
+    Les poids d'une même arête sont combinés par `reducteur` (`max`, `sum` ou `mean`).
+    Renvoie un tableau d'arêtes canoniques uniques, trié par (tag1, tag2).
+    """
+    if reducteur not in REDUCTEURS:
+        raise ValueError(f"Agrégation inconnue : '{reducteur}' (attendu : {', '.join(REDUCTEURS)})")
+
+    aretes = canoniser(aretes.copy())
+    cles = (aretes['tag1'].astype(np.int64) << 32) | aretes['tag2'].astype(np.int64)
+    poids = pd.Series(aretes['weight'], dtype=np.float64).groupby(cles, sort=True).agg(reducteur)
+
+    cles = poids.index.to_numpy(dtype=np.int64)
+    resultat = np.empty(len(poids), dtype=ARETE)
+    resultat['tag1'] = cles >> 32
+    resultat['tag2'] = cles & 0xFFFFFFFF
+    resultat['weight'] = poids.to_numpy()
+    return resultat
+
+
+def lire_vocabulaire(chemin, longueur=None):
+    """Lit les `longueur` premiers octets d'un fichier de vocabulaire et renvoie la liste des tags."""
+    with open(chemin, 'rb') as f:
+        contenu = f.read() if longueur is None else f.read(longueur)
+    return contenu.decode('utf-8').split('\n')[:-1]
+
+
+def _ouvrir_tronque(chemin, longueur):
+    """Ouvre un fichier binaire en écriture, tronqué à `longueur` octets et positionné à la fin."""
+    f = open(chemin, 'r+b' if os.path.exists(chemin) else 'w+b')
+    f.truncate(longueur)
+    f.seek(longueur)
+    return f
+
+
+def _synchroniser(f):
+    """Force l'écriture sur disque du contenu d'un fichier ouvert."""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class Vocabulaire:
+    """Association tag -> identifiant int32, attribué dans l'ordre d'apparition."""
+
+    def __init__(self, noms=()):
+        self.noms = list(noms)
+        self.ids = {nom: i for i, nom in enumerate(self.noms)}
+
+    def __len__(self):
+        return len(self.noms)
+
+    def ajouter(self, noms):
+        """Attribue un identifiant aux tags inconnus et renvoie la liste de ces nouveaux tags."""
+        nouveaux = [nom for nom in dict.fromkeys(noms) if nom not in self.ids]
+        for nom in nouveaux:
+            self.ids[nom] = len(self.noms)
+            self.noms.append(nom)
+        return nouveaux
+
+    def table(self, noms):
+        """Renvoie le tableau des identifiants des tags `noms`, supposés connus."""
+        return np.fromiter((self.ids[nom] for nom in noms), dtype=np.int32, count=len(noms))
+
+    def identifiants(self, colonne):
+        """
+        Convertit une colonne catégorielle de tags en identifiants (int32).
+
+        Seules les catégories du lot sont consultées dans le dictionnaire, pas chaque ligne.
+        Renvoie (identifiants, nouveaux tags).
+        """
+        colonne = colonne.cat.remove_unused_categories()
+        categories = colonne.cat.categories.astype(str).tolist()
+        codes = colonne.cat.codes.to_numpy()
+        manquants = codes < 0
+        if manquants.any():
+            categories.append('nan')  # str(NaN), comme dans la sortie JSONL
+            codes = np.where(manquants, len(categories) - 1, codes)
+
+        nouveaux = self.ajouter(categories)
+        return self.table(categories)[codes], nouveaux
+
+
+class SortieJsonl:
+    """Sortie JSONL historique : deux lignes par relation (une seule si `oriente`)."""
+
+    categoriel = False
+
+    def __init__(self, chemin, oriente=False):
+        self.chemin = chemin
+        self.oriente = oriente
+        self.fichier = None
+        self.longueur = 0
+
+    def coherente(self, etat):
+        """Vérifie que les fichiers sur disque contiennent au moins l'état validé."""
+        return os.path.exists(self.chemin) and os.path.getsize(self.chemin) >= etat["output_length"]
+
+    def ouvrir(self, etat=None):
+        self.longueur = etat["output_length"] if etat else 0
+        self.fichier = _ouvrir_tronque(self.chemin, self.longueur)
+
+    def ecrire(self, chunk_filtered):
+        donnees = serialiser_relations(chunk_filtered, deux_sens=not self.oriente).encode('utf-8')
+        self.fichier.write(donnees)
+        self.longueur += len(donnees)
+
+    def valider(self):
+        _synchroniser(self.fichier)
+        return {"output_length": self.longueur}
+
+    def fermer(self):
+        self.fichier.close()
+
+    def assembler(self, parties):
+        """Concatène, dans l'ordre, les sorties `parties` de même format dans cette sortie."""
+        with open(self.chemin + '.tmp', 'wb') as sortie:
+            for partie in parties:
+                with open(partie.chemin, 'rb') as f:
+                    shutil.copyfileobj(f, sortie)
+        os.replace(self.chemin + '.tmp', self.chemin)
+
+
+class SortieEntiers:
+    """
+    Sortie encodée par dictionnaire : vocabulaire des tags et arêtes canoniques en identifiants int32.
+
+    Avec `oriente`, chaque lot contient les deux sens d'une même relation ; seule sa forme
+    canonique est écrite.
+    """
+
+    categoriel = True
+
+    def __init__(self, prefixe, oriente=False):
+        self.oriente = oriente
+        self.chemin_vocab = prefixe + '.vocab.txt'
+        self.chemin_aretes = prefixe + '.aretes.bin'
+        self.vocab = Vocabulaire()
+        self.f_vocab = self.f_aretes = None
+        self.longueur_vocab = self.longueur_aretes = 0
+
+    def coherente(self, etat):
+        return (os.path.exists(self.chemin_vocab) and os.path.exists(self.chemin_aretes)
+                and os.path.getsize(self.chemin_vocab) >= etat["vocab_length"]
+                and os.path.getsize(self.chemin_aretes) >= etat["aretes_length"])
+
+    def ouvrir(self, etat=None):
+        self.longueur_vocab = etat["vocab_length"] if etat else 0
+        self.longueur_aretes = etat["aretes_length"] if etat else 0
+        self.f_vocab = _ouvrir_tronque(self.chemin_vocab, self.longueur_vocab)
+        self.f_aretes = _ouvrir_tronque(self.chemin_aretes, self.longueur_aretes)
+        # Recharger le vocabulaire déjà validé
+        noms = lire_vocabulaire(self.chemin_vocab, self.longueur_vocab) if self.longueur_vocab else []
+        self.vocab = Vocabulaire(noms)
+
+    def _ecrire_vocabulaire(self, nouveaux):
+        """Ajoute les nouveaux tags à la fin du fichier de vocabulaire."""
+        if nouveaux:
+            donnees = ('\n'.join(nouveaux) + '\n').encode('utf-8')
+            self.f_vocab.write(donnees)
+            self.longueur_vocab += len(donnees)
+
+    def identifiants(self, colonne):
+        """Convertit une colonne catégorielle de tags en identifiants globaux (int32)."""
+        ids, nouveaux = self.vocab.identifiants(colonne)
+        self._ecrire_vocabulaire(nouveaux)
+        return ids
+
+    def ecrire(self, chunk_filtered):
+        aretes = np.empty(len(chunk_filtered), dtype=ARETE)
+        aretes['tag1'] = self.identifiants(chunk_filtered['tag1'])
+        aretes['tag2'] = self.identifiants(chunk_filtered['tag2'])
+        aretes['weight'] = chunk_filtered['weight'].to_numpy(dtype=np.float32)
+        canoniser(aretes)
+        if self.oriente:
+            aretes = np.unique(aretes)
+        self.f_aretes.write(aretes.tobytes())
+        self.longueur_aretes += aretes.nbytes
+
+    def valider(self):
+        _synchroniser(self.f_vocab)
+        _synchroniser(self.f_aretes)
+        return {"vocab_length": self.longueur_vocab, "aretes_length": self.longueur_aretes}
+
+    def fermer(self):
+        self.f_vocab.close()
+        self.f_aretes.close()
+
+    def assembler(self, parties):
+        """Fusionne, dans l'ordre, des sorties partielles en renumérotant leurs vocabulaires."""
+        self.ouvrir()
+        for partie in parties:
+            table = np.empty(0, dtype=np.int32)
+            noms = lire_vocabulaire(partie.chemin_vocab)
+            if noms:
+                self._ecrire_vocabulaire(self.vocab.ajouter(noms))
+                table = self.vocab.table(noms)
+            aretes = np.fromfile(partie.chemin_aretes, dtype=ARETE)
+            aretes['tag1'] = table[aretes['tag1']]
+            aretes['tag2'] = table[aretes['tag2']]
+            canoniser(aretes)
+            self.f_aretes.write(aretes.tobytes())
+            self.longueur_aretes += aretes.nbytes
+        self.valider()
+        self.fermer()
+
+
+def creer_sortie(format_sortie, chemin, oriente=False):
+    """
+    Crée la sortie correspondant à `format_sortie`.
+
+    Pour les formats `entiers`, `sqlite` et `parquet`, l'extension de `chemin` est retirée pour
+    former le préfixe des fichiers de vocabulaire et d'arêtes, de la base ou du jeu de données.
+    Avec `oriente`, les lots reçus sont des relations orientées tag1 -> tag2, écrites une seule
+    fois en JSONL (et une seule fois par paire de tags dans les autres formats).
+    """
+    if format_sortie == "jsonl":
+        return SortieJsonl(chemin, oriente)
+    if format_sortie == "entiers":
+        return SortieEntiers(os.path.splitext(chemin)[0], oriente)
+    if format_sortie == "sqlite":
+        from hiertags_sqlite import SortieSqlite
+        return SortieSqlite(os.path.splitext(chemin)[0] + '.sqlite', oriente)
+    if format_sortie == "parquet":
+        from hiertags_parquet import SortieParquet  # Nécessite pyarrow
+        return SortieParquet(os.path.splitext(chemin)[0] + '.parquet', oriente)
+    raise ValueError(f"Format de sortie inconnu : '{format_sortie}' (attendu : {', '.join(FORMATS)})")
\ No newline at end of file
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Stockage des relations HIERTAGS dans une base SQLite indexée (format de sortie `sqlite`).
+
+Pendant l'ingestion, les relations sont insérées par lots (`executemany`, une transaction
+par lot, journal WAL) dans une table brute sans index. En fin de traitement, les doublons
+sont fusionnés dans la table `relations` (une ligne par paire de tags, sous forme canonique
+tag1 < tag2), couverte par deux index (tag1, weight DESC, tag2) et (tag2, weight DESC, tag1) :
+les k voisins les plus forts d'un tag s'obtiennent alors par une seule requête indexée,
+sans charger le graphe.
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+
+# Fonctions SQL correspondant aux agrégations de `hiertags_sorties.REDUCTEURS`
+AGREGATIONS_SQL = {"max": "MAX", "sum": "SUM", "mean": "AVG"}
+
+
+def _connecter(chemin):
+    """Ouvre la base en écriture, en mode WAL."""
+    connexion = sqlite3.connect(chemin)
+    connexion.execute("PRAGMA journal_mode=WAL")
+    connexion.execute("PRAGMA synchronous=NORMAL")
+    return connexion
+
+
+def _supprimer_base(chemin):
+    """Supprime la base et ses fichiers de journal WAL."""
+    for suffixe in ('', '-wal', '-shm'):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+
+
+class SortieSqlite:
+    """
+    Sortie SQLite : relations canoniques (tag1 < tag2) insérées dans la table `aretes_brutes`.
+
+    L'état validé est le nombre de lignes de cette table : les lignes étant numérotées
+    (rowid) dans l'ordre d'insertion, une reprise supprime simplement celles qui le dépassent.
+    Avec `oriente`, chaque lot contient les deux sens d'une même relation ; seule sa forme
+    canonique est insérée.
+    """
+
+    categoriel = False
+
+    def __init__(self, chemin, oriente=False):
+        self.chemin = chemin
+        self.oriente = oriente
+        self.connexion = None
+        self.lignes = 0
+
+    def coherente(self, etat):
+        if not os.path.exists(self.chemin):
+            return False
+        connexion = sqlite3.connect(self.chemin)
+        try:
+            lignes = connexion.execute("SELECT COUNT(*) FROM aretes_brutes").fetchone()[0]
+        except sqlite3.DatabaseError:
+            return False
+        finally:
+            connexion.close()
+        return lignes >= etat["lignes"]
+
+    def ouvrir(self, etat=None):
+        if etat is None:
+            _supprimer_base(self.chemin)
+        self.connexion = _connecter(self.chemin)
+        self.connexion.execute("CREATE TABLE IF NOT EXISTS aretes_brutes (tag1 TEXT, tag2 TEXT, weight REAL)")
+        self.lignes = etat["lignes"] if etat else 0
+        # Effacer les lignes validées dans la base mais pas encore dans le manifeste
+        self.connexion.execute("DELETE FROM aretes_brutes WHERE rowid > ?", (self.lignes,))
+        self.connexion.commit()
+
+    def ecrire(self, chunk_filtered):
+        tags1 = chunk_filtered['tag1'].astype(str).fillna('nan').to_numpy()
+        tags2 = chunk_filtered['tag2'].astype(str).fillna('nan').to_numpy()
+        inverser = tags1 > tags2
+        lignes = zip(np.where(inverser, tags2, tags1).tolist(),
+                     np.where(inverser, tags1, tags2).tolist(),
+                     chunk_filtered['weight'].to_numpy(dtype=np.float64).tolist())
+        if self.oriente:
+            lignes = dict.fromkeys(lignes)
+        curseur = self.connexion.executemany("INSERT INTO aretes_brutes VALUES (?, ?, ?)", lignes)
+        self.lignes += curseur.rowcount
+
+    def valider(self):
+        self.connexion.commit()
+        return {"lignes": self.lignes}
+
+    def fermer(self):
+        self.connexion.close()
+
+    def assembler(self, parties):
+        """Recopie, dans l'ordre, les tables brutes des bases partielles `parties` dans cette base."""
+        self.ouvrir()
+        for partie in parties:
+            self.connexion.execute("ATTACH DATABASE ? AS partie", (partie.chemin,))
+            self.connexion.execute("INSERT INTO aretes_brutes SELECT tag1, tag2, weight "
+                                   "FROM partie.aretes_brutes ORDER BY rowid")
+            self.connexion.commit()
+            self.connexion.execute("DETACH DATABASE partie")
+        self.fermer()
+
+
+def indexer_sqlite(chemin, reducteur="max"):
+    """
+    Fusionne les relations brutes de la base en une table `relations` indexée.
+
+    Les paires présentes plusieurs fois sont combinées par `reducteur` (`max`, `sum` ou `mean`).
+    """
+    print(f"🗂️ Indexation de la base SQLite '{chemin}'...")
+    connexion = _connecter(chemin)
+    try:
+        connexion.executescript(f"""
+            BEGIN;
+            DROP TABLE IF EXISTS relations;
+            CREATE TABLE relations (
+                tag1 TEXT NOT NULL, tag2 TEXT NOT NULL, weight REAL NOT NULL,
+                PRIMARY KEY (tag1, tag2)
+            ) WITHOUT ROWID;
+            INSERT INTO relations
+                SELECT tag1, tag2, {AGREGATIONS_SQL[reducteur]}(weight)
+                FROM aretes_brutes GROUP BY tag1, tag2;
+            CREATE INDEX relations_tag1 ON relations (tag1, weight DESC, tag2);
+            CREATE INDEX relations_tag2 ON relations (tag2, weight DESC, tag1);
+            DROP TABLE aretes_brutes;
+            CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur);
+            INSERT OR REPLACE INTO meta VALUES ('tags',
+                (SELECT COUNT(*) FROM (SELECT tag1 FROM relations UNION SELECT tag2 FROM relations)));
+            INSERT OR REPLACE INTO meta VALUES ('reducteur', '{reducteur}');
+            COMMIT;
+        """)
+        relations = connexion.execute("SELECT COUNT(*) FROM relations").fetchone()[0]
+        connexion.execute("VACUUM")
+    finally:
+        connexion.close()
+    print(f"✅ Base SQLite indexée ({relations:,} relations).")
+
+
+class RelationsSQLite:
+    """Accès en lecture seule à une base SQLite indexée par `indexer_sqlite`."""
+
+    def __init__(self, chemin="hiertags_relations_raw.sqlite"):
+        self.chemin = chemin
+        self.connexion = sqlite3.connect(f"file:{os.path.abspath(chemin)}?mode=ro", uri=True)
+
+    def __len__(self):
+        ligne = self.connexion.execute("SELECT valeur FROM meta WHERE cle = 'tags'").fetchone()
+        return ligne[0] if ligne else 0
+
+    def __contains__(self, tag):
+        return self.connexion.execute(
+            "SELECT EXISTS (SELECT 1 FROM relations WHERE tag1 = ?) "
+            "OR EXISTS (SELECT 1 FROM relations WHERE tag2 = ?)", (tag, tag)).fetchone()[0] == 1
+
+    def top(self, tag, k=10):
+        """
+        Renvoie les k relations les plus fortes de `tag` sous forme de paires (tag, poids).
+
+        Une boucle (tag, tag) vérifie les deux conditions : seule la première la renvoie.
+        """
+        return self.connexion.execute("""
+            SELECT voisin, weight FROM (
+                SELECT * FROM (SELECT tag2 AS voisin, weight FROM relations
+                               WHERE tag1 = ? ORDER BY weight DESC, tag2 LIMIT ?)
+                UNION ALL
+                SELECT * FROM (SELECT tag1 AS voisin, weight FROM relations
+                               WHERE tag2 = ? AND tag1 <> ? ORDER BY weight DESC, tag1 LIMIT ?)
+            ) ORDER BY weight DESC, voisin LIMIT ?
+        """, (tag, k, tag, tag, k, k)).fetchall()
+
+    def fermer(self):
+        self.connexion.close()
\ No newline at end of file
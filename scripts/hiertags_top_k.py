@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Sélection en flux des k voisins les plus forts de chaque tag HIERTAGS.
+
+La fusion n'utilise que les relations les plus fortes de chaque tag : en ne gardant
+que celles-ci pendant la lecture, le graphe produit reste en O(tags × k).
+"""
+
+import numpy as np
+import pandas as pd
+
+from hiertags_sorties import REDUCTEURS
+
+
+class TopKVoisins:
+    """
+    Conserve, pour chaque tag, les k voisins de plus fort poids vus jusqu'ici.
+
+    Les arêtes reçues sont mises en tampon puis fusionnées avec les voisins retenus
+    dès que le tampon dépasse la taille de ceux-ci : chaque arête n'est ainsi triée
+    qu'un nombre logarithmique de fois, et la mémoire reste bornée par ~2 × tags × k.
+
+    Les doublons (tag, voisin), (a, b) et (b, a) compris, sont fusionnés par `reducteur`
+    (`max`, `sum` ou `mean`) comme dans les autres formats ; sans `reducteur`, la dernière
+    occurrence dans l'ordre du fichier l'emporte, comme avec un dict. Une relation écartée
+    du top-k perd les poids déjà vus : les suivants sont agrégés sans eux.
+    """
+
+    def __init__(self, k, reducteur=None, taille_tampon_min=1000000):
+        if reducteur is not None and reducteur not in REDUCTEURS:
+            raise ValueError(f"Agrégation inconnue : '{reducteur}' (attendu : {', '.join(REDUCTEURS)})")
+        self.k = k
+        self.reducteur = reducteur
+        self.taille_tampon_min = taille_tampon_min
+        self.sources = np.empty(0, dtype=np.int32)
+        self.cibles = np.empty(0, dtype=np.int32)
+        self.poids = np.empty(0, dtype=np.float64)
+        # Nombre d'occurrences agrégées dans chaque poids retenu (somme à diviser pour `mean`)
+        self.comptes = np.empty(0, dtype=np.int64)
+        self.tampon = []
+        self.taille_tampon = 0
+
+    def ajouter(self, tags1, tags2, poids):
+        """Ajoute des relations non orientées (tags1[i], tags2[i], poids[i]), dans les deux sens."""
+        # Les deux sens d'une relation se suivent : l'ordre du fichier est conservé.
+        # Une boucle (a, a) n'est ajoutée qu'une fois, comme son arête canonique.
+        garder = np.ones(2 * len(poids), dtype=bool)
+        garder[1::2] = np.asarray(tags1) != np.asarray(tags2)
+        self.tampon.append((np.column_stack((tags1, tags2)).ravel()[garder],
+                            np.column_stack((tags2, tags1)).ravel()[garder],
+                            np.repeat(poids, 2)[garder]))
+        self.taille_tampon += int(garder.sum())
+        if self.taille_tampon >= max(len(self.poids), self.taille_tampon_min):
+            self._compacter()
+
+    def _compacter(self):
+        """Fusionne le tampon avec les voisins retenus et ne garde que les k meilleurs par tag."""
+        if not self.tampon:
+            return
+        sources = np.concatenate([self.sources] + [t[0] for t in self.tampon])
+        cibles = np.concatenate([self.cibles] + [t[1] for t in self.tampon])
+        poids = np.concatenate([self.poids] + [t[2] for t in self.tampon])
+        comptes = np.concatenate([self.comptes] + [np.ones(len(t[2]), dtype=np.int64) for t in self.tampon])
+        self.tampon = []
+        self.taille_tampon = 0
+
+        cles = (sources.astype(np.int64) << 32) | cibles.astype(np.int64)
+        if self.reducteur is None:
+            # Doublons (tag, related) : la dernière occurrence l'emporte, comme avec un dict
+            _, derniers = np.unique(cles[::-1], return_index=True)
+            garder = np.sort(len(cles) - 1 - derniers)
+            sources, cibles, poids, comptes = sources[garder], cibles[garder], poids[garder], comptes[garder]
+        else:
+            # Doublons agrégés : maximum, ou somme (divisée par le nombre d'occurrences pour `mean`)
+            groupes = pd.DataFrame({'poids': poids, 'comptes': comptes}).groupby(cles, sort=True)
+            agreges = groupes.agg({'poids': 'max' if self.reducteur == 'max' else 'sum', 'comptes': 'sum'})
+            cles = agreges.index.to_numpy(dtype=np.int64)
+            sources, cibles = (cles >> 32).astype(np.int32), (cles & 0xFFFFFFFF).astype(np.int32)
+            poids, comptes = agreges['poids'].to_numpy(), agreges['comptes'].to_numpy()
+        scores = poids / comptes if self.reducteur == 'mean' else poids
+
+        # Tri par tag puis poids décroissant ; rang de chaque arête dans son groupe
+        ordre = np.lexsort((-scores, sources))
+        sources, cibles, poids, comptes = sources[ordre], cibles[ordre], poids[ordre], comptes[ordre]
+        debuts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+        rangs = np.arange(len(sources)) - np.repeat(debuts, np.diff(np.r_[debuts, len(sources)]))
+
+        retenus = rangs < self.k
+        self.sources, self.cibles = sources[retenus], cibles[retenus]
+        self.poids, self.comptes = poids[retenus], comptes[retenus]
+
+    def resultat(self):
+        """Renvoie (sources, cibles, poids) des voisins retenus, triés par tag puis poids décroissant."""
+        self._compacter()
+        if self.reducteur == 'mean':
+            return self.sources, self.cibles, self.poids / self.comptes
+        return self.sources, self.cibles, self.poids
\ No newline at end of file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Index inversé des catégories scrapées, pour associer rapidement les mots-clés aux catégories.
+
+Les titres de catégories sont repliés une seule fois, comme le texte analysé par le client
+(minuscules, décomposition NFD, diacritiques retirés : voir `automate_thesaurus.normaliser`),
+et découpés en mots ; chaque mot distinct pointe vers la liste des catégories qui le
+contiennent. Un terme correspond à une catégorie s'il apparaît dans son titre, y compris au
+milieu d'un mot (`wedding` dans `Weddings`), comme le test `terme in categorie.lower()`
+d'origine.
+
+Pour trouver les mots qui contiennent un terme sans parcourir tout le vocabulaire, chaque
+mot est aussi indexé par ses n-grammes (sous-chaînes de 1 à `N_GRAMMES` caractères) : un
+terme court est lui-même un n-gramme, un terme plus long n'est cherché que dans les mots qui
+possèdent tous ses n-grammes. Un terme de plusieurs mots n'est vérifié (`in`) que sur les
+catégories qui contiennent chacun de ses mots (intersection des listes).
+
+Les fichiers scrapés peuvent être une liste de catégories (`predis_ai_raw.json`) ou un objet
+`{"metadata": ..., "categories": [...]}` (`predis_ai_complet.json`,
+`hashtags_complet_multi_sources.json`).
+"""
+
+import json
+from collections import defaultdict
+
+from automate_thesaurus import normaliser
+
+# Longueur maximale des n-grammes indexés pour chaque mot des titres
+N_GRAMMES = 3
+
+
+def replier(texte):
+    """Minuscules sans accents ('Mariée' -> 'mariee'), exactement comme le client (voir `normaliser`)."""
+    return normaliser(texte)
+
+
+def charger_categories(fichiers):
+    """Charge et concatène les catégories d'un ou plusieurs fichiers scrapés."""
+    if isinstance(fichiers, str):
+        fichiers = [fichiers]
+    categories = []
+    for fichier in fichiers:
+        with open(fichier, 'r', encoding='utf-8') as f:
+            donnees = json.load(f)
+        categories.extend(donnees["categories"] if isinstance(donnees, dict) else donnees)
+    return categories
+
+
+class IndexCategories:
+    """Index des mots (repliés) des titres de catégories vers les identifiants de catégories."""
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.titres = [replier(categorie["category"]) for categorie in categories]
+        self.index = defaultdict(list)
+        for identifiant, titre in enumerate(self.titres):
+            for mot in dict.fromkeys(titre.split()):
+                self.index[mot].append(identifiant)
+        self.mots = list(self.index)
+        self.ngrammes = defaultdict(set)
+        for numero, mot in enumerate(self.mots):
+            for n in range(1, N_GRAMMES + 1):
+                for debut in range(len(mot) - n + 1):
+                    self.ngrammes[mot[debut:debut + n]].add(numero)
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _mots_contenant(self, terme):
+        """Renvoie les mots de l'index qui contiennent `terme` (sans espace), par leurs n-grammes."""
+        if len(terme) <= N_GRAMMES:
+            return [self.mots[numero] for numero in self.ngrammes.get(terme, ())]
+        listes = sorted((self.ngrammes.get(terme[debut:debut + N_GRAMMES], set())
+                         for debut in range(len(terme) - N_GRAMMES + 1)), key=len)
+        candidats = set.intersection(*listes)
+        return [self.mots[numero] for numero in candidats if terme in self.mots[numero]]
+
+    def rechercher(self, terme):
+        """Renvoie l'ensemble des identifiants des catégories dont le titre contient `terme`."""
+        terme = replier(terme)
+        if terme not in self.cache:
+            mots = terme.split()
+            if mots == [terme]:
+                # Un terme sans espace ne peut apparaître qu'à l'intérieur d'un seul mot du titre
+                trouvees = set().union(*(self.index[mot] for mot in self._mots_contenant(terme)))
+            elif mots:
+                # Chaque mot du terme apparaît dans un mot du titre : vérification sur l'intersection
+                candidates = set.intersection(*(self.rechercher(mot) for mot in mots))
+                trouvees = {i for i in candidates if terme in self.titres[i]}
+            else:
+                trouvees = {i for i, titre in enumerate(self.titres) if terme in titre}
+            self.cache[terme] = trouvees
+        return self.cache[terme]
+
+    def correspondances(self, termes, tous=False):
+        """
+        Renvoie, dans l'ordre des fichiers, les identifiants des catégories contenant l'un
+        des `termes` (tous les termes avec `tous=True`).
+        """
+        ensembles = [self.rechercher(terme) for terme in termes]
+        if not ensembles:
+            return []
+        resultat = set.intersection(*ensembles) if tous else set().union(*ensembles)
+        return sorted(resultat)
\ No newline at end of file
@@ -5,13 +5,34 @@ Utile si vous voulez redémarrer complètement le processus.
 """
 
 import os
+import shutil
 
 def nettoyer_progression():
     """Supprime tous les fichiers de progression et de sortie temporaires."""
     
     fichiers_a_supprimer = [
         "hiertags_progress.txt",
+        "hiertags_progress.json",
         "hiertags_relations_raw.jsonl",
+        "hiertags_relations_raw.jsonl.plages",
+        "hiertags_relations_raw.jsonl.blocs",
+        "hiertags_relations_raw.vocab.txt",
+        "hiertags_relations_raw.aretes.bin",
+        "hiertags_relations_raw.sqlite",
+        "hiertags_relations_raw.sqlite-wal",
+        "hiertags_relations_raw.sqlite-shm",
+        "hiertags_relations_raw.parquet",
+        "hiertags_relations_raw.parquet.brut",
+        "hiertags_csr",
+        "hiertags_synonymes.json",
+        "hiertags_stats.json",
+        "hiertags_echantillon.tsv",
+        "hiertags_echantillon_progress.json",
+        "hiertags_echantillon_relations.vocab.txt",
+        "hiertags_echantillon_relations.aretes.bin",
+        "hiertags_echantillon_csr",
+        "hiertags_echantillon_synonymes.json",
+        "hashtag-thesaurus.echantillon.json",
         "predis_ai_raw.json"
     ]
     
@@ -19,7 +40,10 @@ def nettoyer_progression():
     
     for fichier in fichiers_a_supprimer:
         if os.path.exists(fichier):
-            os.remove(fichier)
+            if os.path.isdir(fichier):
+                shutil.rmtree(fichier)
+            else:
+                os.remove(fichier)
             print(f"  ✅ Supprimé : {fichier}")
         else:
             print(f"  ⏭️ Déjà absent : {fichier}")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Plongements vectoriels des hashtags à partir du graphe de co-occurrence HIERTAGS.
+
+La matrice de co-occurrence du stockage CSR est repondérée en PPMI (information mutuelle
+ponctuelle positive), puis factorisée par SVD tronquée randomisée (Halko, Martinsson et
+Tropp) : quelques produits matrice creuse × matrice dense et une SVD d'une petite matrice
+dense, sur CPU. Chaque tag reçoit un vecteur U·√S normalisé, enregistré en float16 dans
+`<csr_dir>/plongements.npy` et ouvert en mémoire mappée ; l'identifiant d'un tag est celui
+du stockage CSR.
+
+La recherche des plus proches voisins (similarité cosinus) parcourt la matrice mappée par
+blocs, convertis un à un en float32, et traite toutes les requêtes d'un bloc en un seul
+produit matriciel : la matrice n'est jamais copiée en entier en mémoire. C'est un parcours
+exhaustif, dont la durée croît avec le nombre de tags ; `python plongements_tags.py
+--latence mariage` la mesure sur le stockage réel. Un mot absent du
+vocabulaire est représenté par la moyenne des vecteurs de ses mots connus : on obtient
+ainsi des suggestions pour des mots ou expressions quelconques.
+"""
+
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+from expansion_semantique import charger_matrice
+from hiertags_csr import RelationsCSR
+from index_categories import replier
+
+FICHIER_PLONGEMENTS = 'plongements.npy'
+
+
+def matrice_ppmi(adjacence):
+    """Repondère une matrice d'adjacence symétrique en PPMI : max(0, log(w·S / (s_i·s_j)))."""
+    forces = np.asarray(adjacence.sum(axis=1), dtype=np.float64).ravel()
+    lignes = np.repeat(np.arange(adjacence.shape[0]), np.diff(adjacence.indptr))
+    with np.errstate(divide='ignore'):
+        ppmi = np.log(adjacence.data * forces.sum() / (forces[lignes] * forces[adjacence.indices]))
+    # Copie des index : ceux de la matrice d'origine peuvent être en mémoire mappée, en lecture seule
+    resultat = sparse.csr_matrix((np.maximum(ppmi, 0).astype(np.float32), np.array(adjacence.indices),
+                                  np.array(adjacence.indptr)), shape=adjacence.shape)
+    resultat.eliminate_zeros()
+    return resultat
+
+
+def svd_randomisee(matrice, dimension, surechantillonnage=10, iterations=2, graine=0):
+    """
+    SVD tronquée randomisée d'une matrice creuse : renvoie (U, S) pour les `dimension`
+    plus grandes valeurs singulières.
+
+    `iterations` itérations de puissance (avec réorthonormalisation) affinent la base
+    lorsque le spectre décroît lentement.
+    """
+    rng = np.random.default_rng(graine)
+    l = min(dimension + surechantillonnage, min(matrice.shape))
+    base, _ = np.linalg.qr(matrice @ rng.standard_normal((matrice.shape[1], l)).astype(np.float32))
+    for _ in range(iterations):
+        base, _ = np.linalg.qr(matrice.T @ base)
+        base, _ = np.linalg.qr(matrice @ base)
+    # Projection sur la base : B = Qᵀ·M, petite matrice dense (l × n)
+    u_reduit, valeurs, _ = np.linalg.svd((matrice.T @ base).T, full_matrices=False)
+    return (base @ u_reduit)[:, :dimension], valeurs[:dimension]
+
+
+def calculer_plongements(csr_dir="hiertags_csr", dimension=64, iterations=2, graine=0):
+    """Calcule les plongements PPMI + SVD du stockage CSR et les enregistre dans `csr_dir`."""
+    print(f"🧭 Calcul des plongements des tags (PPMI + SVD randomisée, dimension {dimension})...")
+    relations = RelationsCSR(csr_dir)
+    ppmi = matrice_ppmi(charger_matrice(relations))
+    u, valeurs = svd_randomisee(ppmi, dimension, iterations=iterations, graine=graine)
+
+    vecteurs = u * np.sqrt(valeurs)
+    normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    vecteurs = np.divide(vecteurs, normes, out=np.zeros_like(vecteurs), where=normes > 0)
+
+    chemin = os.path.join(csr_dir, FICHIER_PLONGEMENTS)
+    np.save(chemin + '.tmp.npy', vecteurs.astype(np.float16))
+    os.replace(chemin + '.tmp.npy', chemin)
+    print(f"✅ Plongements de {len(relations):,} tags sauvegardés dans '{chemin}'.")
+
+
+class PlongementsTags:
+    """Plongements d'un stockage CSR (en mémoire mappée) et recherche des tags les plus proches."""
+
+    def __init__(self, csr_dir="hiertags_csr", relations=None, taille_bloc=16384):
+        self.relations = relations if relations is not None else RelationsCSR(csr_dir)
+        self.vecteurs = np.load(os.path.join(csr_dir, FICHIER_PLONGEMENTS), mmap_mode='r')
+        self.taille_bloc = taille_bloc
+
+    def vecteur(self, texte):
+        """
+        Renvoie le vecteur normalisé d'un tag ou d'une expression, ou None si aucun mot n'est connu.
+
+        On essaie le texte tel quel, puis replié (minuscules, sans accents) et sans espaces
+        (`noir et blanc` -> `noiretblanc`), puis la moyenne des vecteurs de ses mots.
+        """
+        for candidat in dict.fromkeys((texte, replier(texte), replier(texte).replace(' ', ''))):
+            tag_id = self.relations.id_de(candidat)
+            if tag_id is not None and self.vecteurs[tag_id].any():
+                return np.asarray(self.vecteurs[tag_id], dtype=np.float32)
+
+        connus = [self.relations.id_de(mot) for mot in replier(texte).split()]
+        connus = [tag_id for tag_id in connus if tag_id is not None and self.vecteurs[tag_id].any()]
+        if not connus:
+            return None
+        moyenne = np.asarray(self.vecteurs[connus], dtype=np.float32).mean(axis=0)
+        norme = np.linalg.norm(moyenne)
+        return moyenne / norme if norme > 0 else None
+
+    def plus_proches_vecteurs(self, requetes, k=20, exclus=None):
+        """
+        Renvoie les identifiants et similarités cosinus (deux matrices m × k, triées par
+        similarité décroissante) des `k` tags les plus proches de chacun des `m` vecteurs.
+
+        `exclus[j]` est un identifiant de tag à ne pas renvoyer pour la requête j (ou -1).
+        """
+        requetes = np.atleast_2d(np.asarray(requetes, dtype=np.float32))
+        m, n = len(requetes), len(self.vecteurs)
+        k = min(k, n)
+        meilleurs = np.full((m, k), -np.inf, dtype=np.float32)
+        ids = np.full((m, k), -1, dtype=np.int64)
+
+        for debut in range(0, n, self.taille_bloc):
+            bloc = np.asarray(self.vecteurs[debut:debut + self.taille_bloc], dtype=np.float32)
+            scores = requetes @ bloc.T
+            if exclus is not None:
+                lignes = np.flatnonzero((exclus >= debut) & (exclus < debut + len(bloc)))
+                scores[lignes, exclus[lignes] - debut] = -np.inf
+            # Fusion des k meilleurs connus et des k meilleurs du bloc
+            candidats = np.concatenate((meilleurs, scores), axis=1)
+            candidats_ids = np.concatenate((ids, np.broadcast_to(np.arange(debut, debut + len(bloc)),
+                                                                  scores.shape)), axis=1)
+            selection = np.argpartition(-candidats, k - 1, axis=1)[:, :k]
+            meilleurs = np.take_along_axis(candidats, selection, axis=1)
+            ids = np.take_along_axis(candidats_ids, selection, axis=1)
+
+        ordre = np.argsort(-meilleurs, axis=1, kind='stable')
+        return np.take_along_axis(ids, ordre, axis=1), np.take_along_axis(meilleurs, ordre, axis=1)
+
+    def plus_proches(self, textes, k=20):
+        """
+        Renvoie, pour chaque tag ou expression, ses `k` tags les plus proches sous forme de
+        paires (tag, similarité). Les textes sans aucun mot connu reçoivent une liste vide.
+        """
+        connus, vecteurs, exclus, resultats = [], [], [], {texte: [] for texte in textes}
+        for texte in resultats:
+            vecteur = self.vecteur(texte)
+            if vecteur is not None:
+                tag_id = self.relations.id_de(texte)
+                connus.append(texte)
+                vecteurs.append(vecteur)
+                exclus.append(-1 if tag_id is None else tag_id)
+        if not connus:
+            return resultats
+
+        ids, scores = self.plus_proches_vecteurs(np.array(vecteurs), k, np.array(exclus))
+        for texte, ligne_ids, ligne_scores in zip(connus, ids, scores):
+            resultats[texte] = [(self.relations.nom(int(i)), float(s))
+                                for i, s in zip(ligne_ids, ligne_scores) if i >= 0 and s > -np.inf]
+        return resultats
+
+
+def mesurer_latence(plongements, textes, k=20, repetitions=20):
+    """
+    Mesure la durée d'une recherche des `k` plus proches voisins par texte, une requête à la
+    fois (comme la fusion pour un mot-clé absent du graphe). Renvoie (médiane, maximum) en ms.
+    """
+    durees = []
+    for _ in range(repetitions):
+        for texte in textes:
+            debut = time.perf_counter()
+            plongements.plus_proches([texte], k)
+            durees.append((time.perf_counter() - debut) * 1000)
+    return float(np.median(durees)), max(durees)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Tags les plus proches d'un mot ou d'une expression")
+    parser.add_argument("textes", nargs="*", default=["wedding", "noir et blanc"])
+    parser.add_argument("--csr", dest="csr_dir", default="hiertags_csr", help="Dossier du stockage CSR")
+    parser.add_argument("-k", type=int, default=20, help="Nombre de tags renvoyés par texte")
+    parser.add_argument("--latence", action="store_true",
+                        help="Mesurer la durée d'une recherche (médiane et maximum sur 20 répétitions)")
+    args = parser.parse_args()
+    plongements = PlongementsTags(args.csr_dir)
+    if args.latence:
+        mediane, maximum = mesurer_latence(plongements, args.textes, args.k)
+        print(f"⏱️ Top-{args.k} sur {len(plongements.vecteurs):,} tags : médiane {mediane:.2f} ms, "
+              f"maximum {maximum:.2f} ms par requête")
+    else:
+        for texte, voisins in plongements.plus_proches(args.textes, args.k).items():
+            print(f"{texte} : {[tag for tag, _ in voisins]}")
\ No newline at end of file
@@ -1,14 +1,210 @@
 import pandas as pd
+import numpy as np
+import heapq
 import json
+import os
+import shutil
+import tempfile
+
+from hiertags_compression import detecter_compression
+from hiertags_sorties import REDUCTEURS
+
+def aretes_canoniques(df, reducteur="max"):
+    """
+    Ramène chaque relation à sa forme non orientée canonique (tag1 < tag2) et fusionne
+    les doublons, (a, b) et (b, a) compris, en combinant leurs poids par `reducteur`
+    ("max", "sum" ou "mean").
+    """
+    if reducteur not in REDUCTEURS:
+        raise ValueError(f"Agrégation inconnue : '{reducteur}' (attendu : {', '.join(REDUCTEURS)})")
+
+    aretes = _orienter(df)
+    return aretes.groupby(['tag1', 'tag2'], sort=False)['weight'].agg(reducteur).reset_index()
+
+def _orienter(df):
+    """Renvoie les relations de `df` avec leurs tags (en texte) dans l'ordre canonique."""
+    tags1 = df['tag1'].astype(str).fillna('nan').to_numpy()
+    tags2 = df['tag2'].astype(str).fillna('nan').to_numpy()
+    inverser = tags1 > tags2
+    return pd.DataFrame({
+        'tag1': np.where(inverser, tags2, tags1),
+        'tag2': np.where(inverser, tags1, tags2),
+        'weight': df['weight'].to_numpy()
+    })
+
+class RelationsSymetriques:
+    """
+    Recherche des voisins d'un tag dans un dictionnaire où chaque relation n'est stockée
+    qu'une fois, sous son premier tag dans l'ordre canonique.
+
+    L'index inverse ne contient que des références vers les tags, pas les poids.
+    """
+
+    def __init__(self, relations):
+        self.relations = relations
+        self.inverse = {}
+        for tag1, voisins in relations.items():
+            for tag2 in voisins:
+                self.inverse.setdefault(tag2, []).append(tag1)
+
+    def voisins(self, tag):
+        """Renvoie le dictionnaire {voisin: poids} de `tag`, quelle que soit sa position dans l'arête."""
+        resultat = dict(self.relations.get(tag, {}))
+        for autre in self.inverse.get(tag, ()):
+            resultat[autre] = self.relations[autre][tag]
+        return resultat
+
+def _ecrire_run(aretes, colonne, dossier, numero):
+    """Écrit une série triée de relations (tag1, tag2, valeur, nombre) dans un fichier temporaire."""
+    chemin = os.path.join(dossier, f"run_{numero:05d}.tsv")
+    valeurs = list(map(float.__repr__, aretes[colonne].astype(float).tolist()))
+    lignes = (aretes['tag1'] + '\t' + aretes['tag2'] + '\t' + valeurs + '\t'
+              + aretes['size'].astype(str) + '\n')
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write(''.join(lignes))
+    return chemin
+
+def _lire_run(chemin):
+    """Relit une série triée sous forme de tuples (tag1, tag2, valeur, nombre)."""
+    with open(chemin, 'r', encoding='utf-8', buffering=1024 * 1024) as f:
+        for ligne in f:
+            tag1, tag2, valeur, nombre = ligne.rstrip('\n').split('\t')
+            yield tag1, tag2, float(valeur), int(nombre)
+
+def _fusionner_runs(chemins, combiner):
+    """
+    Fusionne (k-way) des séries triées par (tag1, tag2) en une seule série triée,
+    les relations identiques étant combinées au passage.
+    """
+    courant = None
+    for tag1, tag2, valeur, nombre in heapq.merge(*(_lire_run(c) for c in chemins),
+                                                   key=lambda r: (r[0], r[1])):
+        if courant and courant[0] == tag1 and courant[1] == tag2:
+            courant = (tag1, tag2, combiner(courant[2], valeur), courant[3] + nombre)
+        else:
+            if courant:
+                yield courant
+            courant = (tag1, tag2, valeur, nombre)
+    if courant:
+        yield courant
+
+def _ecrire_json_groupe(relations, f):
+    """
+    Écrit des relations triées par tag sous la forme d'un objet JSON {tag: {voisin: poids}},
+    groupe par groupe, avec la même mise en forme que `json.dump(..., indent=2)`.
+    """
+    precedent = None
+    for tag1, tag2, poids in relations:
+        if tag1 != precedent:
+            f.write('{\n' if precedent is None else '\n  },\n')
+            f.write(f'  {json.dumps(tag1, ensure_ascii=False)}: {{\n')
+            precedent = tag1
+        else:
+            f.write(',\n')
+        f.write(f'    {json.dumps(tag2, ensure_ascii=False)}: {json.dumps(poids)}')
+    f.write('{}' if precedent is None else '\n  }\n}')
+
+def _process_hiertags_externe(input_filename, output_filename, min_weight, reducteur,
+                              memoire_max_mo, chunk_size, fusion_max=64):
+    """
+    Variante à mémoire bornée : tri externe des relations canoniques puis écriture en flux.
+
+    Les lots lus sont mis en tampon jusqu'à environ un tiers de `memoire_max_mo`, puis agrégés,
+    triés et écrits sur disque (« runs »). Les runs sont fusionnés par k-way merge (par
+    passes successives s'ils sont plus de `fusion_max`), et chaque tag est écrit dès que
+    tous ses voisins sont connus : la mémoire ne dépend plus de la taille du jeu de données.
+    """
+    if reducteur not in REDUCTEURS:
+        raise ValueError(f"Agrégation inconnue : '{reducteur}' (attendu : {', '.join(REDUCTEURS)})")
+    # Les runs portent (valeur, nombre) pour que la moyenne reste exacte après fusion
+    agregation = 'max' if reducteur == 'max' else 'sum'
+    combiner = max if reducteur == 'max' else (lambda a, b: a + b)
+    taille_tampon = memoire_max_mo * 1024 * 1024 // 3
+    # Un lot lu ne doit pas à lui seul dépasser le tampon (~200 octets par ligne en mémoire)
+    chunk_size = max(1000, min(chunk_size, taille_tampon // 200))
+
+    dossier = tempfile.mkdtemp(prefix='hiertags_runs_', dir=os.path.dirname(os.path.abspath(output_filename)))
+    try:
+        runs, tampon, octets, lues, gardees = [], [], 0, 0, 0
+
+        def vider_tampon():
+            aretes = _orienter(pd.concat(tampon, ignore_index=True))
+            aretes = (aretes.groupby(['tag1', 'tag2'], sort=True)['weight']
+                      .agg([agregation, 'size']).reset_index())
+            runs.append(_ecrire_run(aretes, agregation, dossier, len(runs)))
+            print(f"  💾 Run {len(runs)} écrit ({len(aretes):,} relations).")
+
+        print(f"Lecture de '{input_filename}' par lots (budget mémoire : {memoire_max_mo} Mo)...")
+        lecteur = pd.read_csv(input_filename, sep='\t', header=None, names=['tag1', 'tag2', 'weight'],
+                              chunksize=chunk_size, compression=detecter_compression(input_filename))
+        with lecteur:
+            for chunk in lecteur:
+                lues += len(chunk)
+                chunk = chunk[chunk['weight'] >= min_weight]
+                gardees += len(chunk)
+                tampon.append(chunk)
+                octets += chunk.memory_usage(deep=True).sum()
+                if octets >= taille_tampon:
+                    vider_tampon()
+                    tampon, octets = [], 0
+        if tampon:
+            vider_tampon()
+        print(f"✅ {lues} relations lues, {gardees} avec un poids >= {min_weight}, {len(runs)} runs.")
+
+        # Fusions intermédiaires tant qu'il y a trop de runs à ouvrir en même temps
+        while len(runs) > fusion_max:
+            groupes = [runs[i:i + fusion_max] for i in range(0, len(runs), fusion_max)]
+            runs = []
+            for groupe in groupes:
+                chemin = os.path.join(dossier, f"fusion_{len(runs):05d}_{os.path.basename(groupe[0])}")
+                with open(chemin, 'w', encoding='utf-8') as f:
+                    for tag1, tag2, valeur, nombre in _fusionner_runs(groupe, combiner):
+                        f.write(f"{tag1}\t{tag2}\t{valeur!r}\t{nombre}\n")
+                for c in groupe:
+                    os.remove(c)
+                runs.append(chemin)
+
+        print("Fusion des runs et écriture du dictionnaire de relations...")
+        relations = ((tag1, tag2, valeur / nombre if reducteur == 'mean' else valeur)
+                     for tag1, tag2, valeur, nombre in _fusionner_runs(runs, combiner))
+        with open(output_filename + '.tmp', 'w', encoding='utf-8') as f:
+            _ecrire_json_groupe(relations, f)
+        os.replace(output_filename + '.tmp', output_filename)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    print(f"\n✅ Dictionnaire de relations sémantiques sauvegardé dans '{output_filename}'")
 
 def process_hiertags_complet(input_filename="flickr_tag_co-occurrence_network.tsv", 
                            output_filename="hiertags_relations_raw.json",
-                           min_weight=0.1):  # Seuil pour garder les relations pertinentes
-    """Analyse le fichier HIERTAGS et crée un dictionnaire de relations pondérées."""
+                           min_weight=0.1,  # Seuil pour garder les relations pertinentes (voir statistiques_poids.py)
+                           reducteur="max",  # Fusion des relations en double : "max", "sum" ou "mean"
+                           memoire_max_mo=None,  # Budget mémoire (Mo) : active le tri externe
+                           chunk_size=100000):  # Lignes lues par lot en mode tri externe
+    """
+    Analyse le fichier HIERTAGS et crée un dictionnaire de relations pondérées.
+
+    Chaque relation n'est enregistrée qu'une fois, sous le plus petit de ses deux tags
+    (voir `RelationsSymetriques` pour retrouver les voisins depuis l'un ou l'autre).
+
+    Avec `memoire_max_mo`, le fichier n'est plus chargé en entier : les relations sont triées
+    sur disque puis écrites tag par tag (voir `_process_hiertags_externe`). Le contenu est le
+    même, les tags étant simplement rangés par ordre alphabétique.
+    """
+
+    if memoire_max_mo:
+        try:
+            _process_hiertags_externe(input_filename, output_filename, min_weight, reducteur,
+                                      memoire_max_mo, chunk_size)
+        except FileNotFoundError:
+            print(f"❌ ERREUR: Fichier '{input_filename}' non trouvé.")
+        return
     
     try:
         print(f"Chargement du jeu de données '{input_filename}'...")
-        df = pd.read_csv(input_filename, sep='\t', header=None, names=['tag1', 'tag2', 'weight'])
+        # Fichier éventuellement compressé : le format est reconnu à son contenu
+        df = pd.read_csv(input_filename, sep='\t', header=None, names=['tag1', 'tag2', 'weight'],
+                         compression=detecter_compression(input_filename))
         print(f"✅ Chargement terminé. {len(df)} relations trouvées.")
     except FileNotFoundError:
         print(f"❌ ERREUR: Fichier '{input_filename}' non trouvé.")
@@ -17,22 +213,24 @@ def process_hiertags_complet(input_filename="flickr_tag_co-occurrence_network.ts
     # Filtrer les relations peu pertinentes pour alléger le fichier
     df = df[df['weight'] >= min_weight].copy()
     print(f"Filtrage des relations avec un poids >= {min_weight}. Reste {len(df)} relations.")
+
+    # Forme canonique non orientée ; les doublons sont fusionnés au lieu d'être écrasés
+    aretes = aretes_canoniques(df, reducteur)
+    if len(aretes) < len(df):
+        print(f"🔗 {len(df) - len(aretes)} relations en double fusionnées ({reducteur}).")
     
     relations = {}
     print("Construction du dictionnaire de relations...")
     
     # itertuples() est beaucoup plus rapide que iterrows()
-    for row in df.itertuples(index=False):
+    for row in aretes.itertuples(index=False):
         tag1, tag2, weight = row.tag1, row.tag2, row.weight
         
-        # Ajouter la relation dans les deux sens pour une recherche facile
+        # Une seule entrée par relation, sous son premier tag
         if tag1 not in relations: 
             relations[tag1] = {}
-        if tag2 not in relations: 
-            relations[tag2] = {}
             
         relations[tag1][tag2] = weight
-        relations[tag2][tag1] = weight
     
     # Sauvegarder les relations brutes
     with open(output_filename, 'w', encoding='utf-8') as f:
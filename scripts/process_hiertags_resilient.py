@@ -1,72 +1,514 @@
 import pandas as pd
 import json
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from hiertags_compression import LotsCompresses, detecter_compression
+from hiertags_csr import construire_csr, construire_csr_entiers
+from hiertags_elagage import NORMALISATIONS
+from hiertags_lecture import decouper_en_plages, empreinte_plage, lire_plage
+from hiertags_memoire import RegulateurLots
+from hiertags_mmap import MOTEURS, lire_plage_mmap
+from hiertags_parquet import SortieParquet, indexer_parquet
+from hiertags_sorties import REDUCTEURS, Vocabulaire, creer_sortie
+from hiertags_sqlite import SortieSqlite, indexer_sqlite
+from hiertags_top_k import TopKVoisins
+
+def _signature_entree(input_filename, min_weight, debut, fin):
+    """Identifie le travail décrit par un point de contrôle (fichier d'entrée, seuil et plage)."""
+    stat = os.stat(input_filename)
+    return {"input": os.path.abspath(input_filename), "size": stat.st_size,
+            "mtime": stat.st_mtime, "min_weight": min_weight, "debut": debut, "fin": fin}
+
+def _lire_manifeste(progress_file, signature):
+    """Renvoie l'état enregistré dans le manifeste de progression, ou None s'il est absent ou invalide."""
+    if not os.path.exists(progress_file):
+        return None
+    try:
+        with open(progress_file, 'r', encoding='utf-8') as f:
+            manifeste = json.load(f)
+    except (ValueError, OSError):
+        print("⚠️ Fichier de progression invalide, recommencement.")
+        return None
+    if manifeste.get("signature") != signature:
+        print("⚠️ Le fichier de progression ne correspond pas à ce traitement, recommencement.")
+        return None
+    return manifeste
+
+def _ecrire_manifeste(progress_file, manifeste):
+    """Écrit le manifeste de progression de façon atomique."""
+    with open(progress_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f)
+    os.replace(progress_file + '.tmp', progress_file)
+
+def _ouvrir_lots(input_filename, debut, fin, taille_lots, categoriel, moteur, min_weight, point_reprise=None):
+    """Lots (lot, position) de la plage [debut, fin), ou du flux décompressé à partir de `debut`."""
+    if detecter_compression(input_filename):
+        return LotsCompresses(input_filename, debut, taille_lots, categoriel=categoriel,
+                              point_reprise=point_reprise, moteur=moteur, min_weight=min_weight)
+    if moteur == "mmap":
+        return lire_plage_mmap(input_filename, debut, fin, taille_lots, categoriel=categoriel, min_weight=min_weight)
+    return lire_plage(input_filename, debut, fin, taille_lots, categoriel=categoriel)
+
+def _traiter_lots(input_filename, debut, fin, sortie, progress_file, min_weight, chunk_size, budget_mo=None,
+                  moteur="pandas"):
+    """
+    Filtre la plage [debut, fin) du fichier d'entrée lot par lot et l'écrit dans `sortie`.
+
+    Après chaque lot, la sortie est synchronisée sur disque puis le manifeste enregistre
+    l'offset atteint dans l'entrée et l'état validé de la sortie (longueurs des fichiers).
+    Une reprise se place directement à cet offset et tronque la sortie à cet état, ce qui
+    efface un éventuel lot à moitié écrit. Produit le nombre total de lignes lues après chaque lot.
+
+    Une entrée compressée est lue en entier (la plage est ignorée) ; l'offset est alors
+    celui du flux décompressé, accompagné d'un point de reprise du décompresseur.
+
+    Avec `budget_mo`, la taille des lots est réajustée après chaque lot pour maximiser
+    le débit sans dépasser ce budget mémoire (voir `hiertags_memoire.py`).
+
+    Avec `moteur="mmap"`, le fichier est lu en mémoire mappée et les lignes sous `min_weight`
+    sont écartées avant la création des tags (voir `hiertags_mmap.py`).
+    """
+    signature = _signature_entree(input_filename, min_weight, debut, fin)
+    compression = detecter_compression(input_filename)
+    manifeste = _lire_manifeste(progress_file, signature)
+    if manifeste and not sortie.coherente(manifeste["sortie"]):
+        print("⚠️ Fichier de sortie plus court que la progression enregistrée, recommencement.")
+        manifeste = None
+    if manifeste is None:
+        sortie.ouvrir()
+        manifeste = {"signature": signature, "offset": debut, "lines": 0, "sortie": sortie.valider()}
+    else:
+        # Effacer ce qui a pu être écrit après le dernier lot validé
+        sortie.ouvrir(manifeste["sortie"])
+        if manifeste["offset"] > debut:
+            print(f"🔄 Reprise du traitement à l'octet {manifeste['offset']:,} "
+                  f"(ligne {manifeste['lines']:,})...")
+
+    taille_lots = RegulateurLots(chunk_size, budget_mo) if budget_mo else chunk_size
+    lots = _ouvrir_lots(input_filename, manifeste["offset"], fin, taille_lots, sortie.categoriel,
+                        moteur, min_weight, point_reprise=manifeste.get("reprise"))
+
+    try:
+        for chunk, position in lots:
+            # Le moteur mmap ne renvoie que les lignes gardées : il indique le nombre de lignes lues
+            lues = chunk.attrs.get("lignes", len(chunk))
+            sortie.ecrire(chunk[chunk['weight'] >= min_weight])
+
+            manifeste["offset"] = position
+            if compression:
+                manifeste["reprise"] = lots.point_reprise_avant(position)
+            manifeste["lines"] += lues
+            manifeste["sortie"] = sortie.valider()
+            _ecrire_manifeste(progress_file, manifeste)
+            if budget_mo:
+                taille_lots.mesurer(lues)
+            yield manifeste["lines"]
+    finally:
+        sortie.fermer()
+
+def _chemin_plage(shard_dir, nom, output_filename):
+    """Chemin de la sortie partielle d'une plage, avec la même extension que la sortie finale."""
+    return os.path.join(shard_dir, f"plage_{nom}{os.path.splitext(output_filename)[1]}")
+
+def _traiter_plage(input_filename, debut, fin, shard_filename, format_sortie, min_weight, chunk_size,
+                   budget_mo=None, moteur="pandas"):
+    """
+    Filtre une plage d'octets du fichier d'entrée dans sa propre sortie partielle.
+
+    Chaque plage a son propre manifeste de progression ; un marqueur `.termine`
+    est créé une fois la plage entièrement traitée.
+    """
+    lignes_lues = 0
+    for lignes_lues in _traiter_lots(input_filename, debut, fin, creer_sortie(format_sortie, shard_filename),
+                                     shard_filename + '.progress.json', min_weight, chunk_size,
+                                     budget_mo, moteur):
+        pass
+    open(shard_filename + '.termine', 'w').close()
+    if os.path.exists(shard_filename + '.progress.json'):
+        os.remove(shard_filename + '.progress.json')
+    return lignes_lues
+
+def _executer_plages(input_filename, taches, nb_plages, format_sortie, min_weight, chunk_size, workers,
+                     budget_mo=None, moteur="pandas"):
+    """
+    Traite les plages `taches`, liste de (index, (debut, fin), sortie partielle), dans un pool
+    de `workers` processus (ou directement dans ce processus si `workers` vaut 1).
+    Le budget mémoire `budget_mo` est partagé également entre les processus.
+    """
+    print(f"⚙️ Traitement de {len(taches)} plages avec {workers} processus...")
+    budget_processus = budget_mo / max(workers, 1) if budget_mo else None
+
+    def annoncer(index, lignes_lues, termines):
+        print(f"  ✅ Plage {index + 1}/{nb_plages} traitée "
+              f"({lignes_lues:,} lignes, {termines}/{len(taches)}).")
+
+    if workers <= 1:
+        for termines, (index, (debut, fin), shard) in enumerate(taches, 1):
+            annoncer(index, _traiter_plage(input_filename, debut, fin, shard, format_sortie,
+                                           min_weight, chunk_size, budget_processus, moteur), termines)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_traiter_plage, input_filename, debut, fin,
+                            shard, format_sortie, min_weight, chunk_size, budget_processus, moteur): index
+            for index, (debut, fin), shard in taches
+        }
+        try:
+            for termines, future in enumerate(as_completed(futures), 1):
+                annoncer(futures[future], future.result(), termines)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+def _process_hiertags_parallele(input_filename, output_filename, format_sortie, min_weight,
+                                chunk_size, workers, range_size, budget_mo=None, moteur="pandas"):
+    """
+    Traite le fichier par plages d'octets dans un pool de processus.
+
+    Chaque plage produit une sortie partielle dans `<output_filename>.plages/`,
+    assemblées dans l'ordre des plages : la sortie est identique au traitement séquentiel.
+    """
+    shard_dir = output_filename + '.plages'
+    plan_filename = os.path.join(shard_dir, 'plages.json')
+    signature = dict(_signature_entree(input_filename, min_weight, None, None), format=format_sortie)
+
+    # Reprendre le découpage précédent s'il porte sur le même fichier d'entrée
+    plan = None
+    if os.path.exists(plan_filename):
+        with open(plan_filename, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        if plan.get("signature") != signature:
+            print("⚠️ Le fichier d'entrée a changé depuis le dernier lancement, recommencement.")
+            plan = None
+
+    if plan is None:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        os.makedirs(shard_dir)
+        plan = {"signature": signature, "plages": decouper_en_plages(input_filename, range_size)}
+        with open(plan_filename, 'w', encoding='utf-8') as f:
+            json.dump(plan, f)
+
+    plages = plan["plages"]
+    shards = [_chemin_plage(shard_dir, f"{i:05d}", output_filename) for i in range(len(plages))]
+    restantes = [i for i, shard in enumerate(shards) if not os.path.exists(shard + '.termine')]
+    if len(restantes) < len(plages):
+        print(f"🔄 Reprise : {len(plages) - len(restantes)}/{len(plages)} plages déjà traitées.")
+
+    _executer_plages(input_filename, [(i, plages[i], shards[i]) for i in restantes], len(plages),
+                     format_sortie, min_weight, chunk_size, workers, budget_mo, moteur)
+
+    # Assemblage déterministe : dans l'ordre des plages
+    creer_sortie(format_sortie, output_filename).assembler(
+        [creer_sortie(format_sortie, shard) for shard in shards])
+    shutil.rmtree(shard_dir, ignore_errors=True)
+
+def _process_hiertags_incremental(input_filename, output_filename, format_sortie, min_weight,
+                                  chunk_size, workers, range_size, budget_mo=None, moteur="pandas"):
+    """
+    Traite le fichier par blocs d'environ `range_size` octets en réutilisant les sorties
+    des blocs déjà traités lors d'un précédent lancement.
+
+    Chaque bloc est identifié par l'empreinte BLAKE2b de son contenu ; sa sortie partielle,
+    conservée dans `<output_filename>.blocs/`, porte cette empreinte. Seuls les blocs
+    nouveaux ou modifiés sont traités, puis les sorties sont assemblées dans l'ordre des blocs.
+    Les sorties des blocs qui ont disparu du fichier sont supprimées.
+    """
+    bloc_dir = output_filename + '.blocs'
+    index_filename = os.path.join(bloc_dir, 'index.json')
+    parametres = {"format": format_sortie, "min_weight": min_weight, "range_size": range_size}
+
+    # Des sorties produites avec d'autres paramètres ne sont pas réutilisables
+    if os.path.exists(index_filename):
+        with open(index_filename, 'r', encoding='utf-8') as f:
+            if json.load(f).get("parametres") != parametres:
+                print("⚠️ Paramètres modifiés depuis le dernier lancement, blocs recalculés.")
+                shutil.rmtree(bloc_dir, ignore_errors=True)
+    os.makedirs(bloc_dir, exist_ok=True)
+
+    print("🔎 Calcul des empreintes des blocs...")
+    plages = decouper_en_plages(input_filename, range_size)
+    empreintes = [empreinte_plage(input_filename, debut, fin) for debut, fin in plages]
+    shards = [_chemin_plage(bloc_dir, empreinte, output_filename) for empreinte in empreintes]
+
+    # Un bloc présent plusieurs fois dans le fichier n'est traité qu'une fois
+    restantes, prevus = [], set()
+    for i, shard in enumerate(shards):
+        if not os.path.exists(shard + '.termine') and shard not in prevus:
+            restantes.append((i, plages[i], shard))
+            prevus.add(shard)
+    print(f"♻️ {len(plages) - len(restantes)}/{len(plages)} blocs inchangés, "
+          f"{len(restantes)} à traiter.")
+
+    if restantes:
+        _executer_plages(input_filename, restantes, len(plages), format_sortie, min_weight,
+                         chunk_size, workers, budget_mo, moteur)
+
+    creer_sortie(format_sortie, output_filename).assembler(
+        [creer_sortie(format_sortie, shard) for shard in shards])
+
+    # Supprimer les sorties des blocs qui ne figurent plus dans le fichier
+    actuels = set(f"plage_{empreinte}" for empreinte in empreintes)
+    for nom in os.listdir(bloc_dir):
+        if nom.startswith('plage_') and nom.split('.')[0] not in actuels:
+            chemin = os.path.join(bloc_dir, nom)
+            if os.path.isdir(chemin):
+                shutil.rmtree(chemin)  # Lots bruts du format parquet
+            else:
+                os.remove(chemin)
+
+    with open(index_filename, 'w', encoding='utf-8') as f:
+        json.dump({"parametres": parametres, "blocs": [
+            {"debut": debut, "fin": fin, "empreinte": empreinte}
+            for (debut, fin), empreinte in zip(plages, empreintes)
+        ]}, f)
+
+def _process_hiertags_top_k(input_filename, output_filename, format_sortie, min_weight,
+                            chunk_size, top_k, budget_mo=None, moteur="pandas", reducteur="max"):
+    """
+    Lit le fichier en flux en ne gardant que les `top_k` voisins les plus forts de chaque tag,
+    puis écrit ce graphe élagué (relations orientées tag -> voisin retenu).
+
+    Les relations en double sont fusionnées selon `reducteur` avant la sélection, sauf en
+    JSONL, où la dernière occurrence l'emporte comme à la lecture du fichier par la fusion.
+    """
+    vocab = Vocabulaire()
+    voisins = TopKVoisins(top_k, reducteur=None if format_sortie == "jsonl" else reducteur)
+    taille = os.path.getsize(input_filename)
+    compression = detecter_compression(input_filename)
+    taille_lots = RegulateurLots(chunk_size, budget_mo) if budget_mo else chunk_size
+    lots = _ouvrir_lots(input_filename, 0, taille, taille_lots, True, moteur, min_weight)
+
+    for i, (chunk, position) in enumerate(lots):
+        chunk_filtered = chunk[chunk['weight'] >= min_weight]
+        tags1, _ = vocab.identifiants(chunk_filtered['tag1'])
+        tags2, _ = vocab.identifiants(chunk_filtered['tag2'])
+        voisins.ajouter(tags1, tags2, chunk_filtered['weight'].to_numpy(dtype='float64'))
+        if budget_mo:
+            taille_lots.mesurer(chunk.attrs.get("lignes", len(chunk)))
+        lu = lots.position_compressee if compression else position
+        print(f"  ✅ Lot {i+1} traité ({lu * 100 // max(taille, 1)} %).")
+
+    sources, cibles, poids = voisins.resultat()
+    categories = pd.Index(vocab.noms, dtype=object)
+    graphe = pd.DataFrame({
+        'tag1': pd.Categorical.from_codes(sources, categories=categories),
+        'tag2': pd.Categorical.from_codes(cibles, categories=categories),
+        'weight': poids
+    })
+    print(f"✂️ Graphe élagué : {len(graphe):,} relations pour {len(vocab):,} tags (k = {top_k}).")
+
+    sortie = creer_sortie(format_sortie, output_filename, oriente=True)
+    sortie.ouvrir()
+    sortie.ecrire(graphe)
+    sortie.valider()
+    sortie.fermer()
+
+def _terminer(sortie, csr_dir, reducteur, synonymes_file, elagage, dimension_plongements):
+    """
+    Annonce la fin du traitement et construit le stockage CSR (synonymes et plongements compris) si demandé.
+
+    `elagage` contient les options de `construire_csr_entiers` (degre_max, normalisation, degre_hub).
+    """
+    print(f"\n🎉 Traitement terminé avec succès !")
+    if isinstance(sortie, SortieSqlite):
+        print(f"📁 Données sauvegardées dans '{sortie.chemin}'")
+        indexer_sqlite(sortie.chemin, reducteur)
+        if csr_dir:
+            print("ℹ️ Base SQLite déjà indexée : pas de stockage CSR construit.")
+        return
+    if isinstance(sortie, SortieParquet):
+        indexer_parquet(sortie.chemin, reducteur)
+        print(f"📁 Données sauvegardées dans '{sortie.chemin}'")
+        if csr_dir:
+            print("ℹ️ Jeu de données Parquet déjà trié par tag : pas de stockage CSR construit.")
+        return
+    if sortie.categoriel:
+        print(f"📁 Données sauvegardées dans '{sortie.chemin_vocab}' et '{sortie.chemin_aretes}'")
+    else:
+        print(f"📁 Données sauvegardées dans '{sortie.chemin}'")
+
+    if csr_dir:
+        if sortie.categoriel:
+            construire_csr_entiers(sortie.chemin_vocab, sortie.chemin_aretes, csr_dir, reducteur, **elagage)
+        else:
+            if any(option is not None for option in elagage.values()):
+                print("ℹ️ Élagage des hubs disponible uniquement avec le format 'entiers' : ignoré.")
+            construire_csr(sortie.chemin, csr_dir)
+        if synonymes_file:
+            from synonymes_minhash import detecter_synonymes
+            detecter_synonymes(csr_dir, synonymes_file)
+        if dimension_plongements:
+            from plongements_tags import calculer_plongements  # Nécessite SciPy
+            calculer_plongements(csr_dir, dimension_plongements)
 
 def process_hiertags_resilient(
     input_filename="flickr_tag_co-occurrence_network.tsv", 
     output_filename="hiertags_relations_raw.jsonl",  # Format .jsonl
-    progress_file="hiertags_progress.txt",
-    min_weight=0.1,
-    chunk_size=100000  # Traiter 100 000 lignes à la fois
+    progress_file="hiertags_progress.json",  # Manifeste de reprise (offset d'entrée, longueur de sortie)
+    min_weight=0.1,  # Seuil des relations gardées (à choisir avec statistiques_poids.py)
+    chunk_size=100000,  # Traiter 100 000 lignes à la fois
+    csr_dir=None,  # Dossier du stockage CSR à générer en fin de traitement (optionnel)
+    workers=1,  # Nombre de processus (> 1 : traitement parallèle par plages d'octets)
+    range_size=64 * 1024 * 1024,  # Taille des plages en mode parallèle (64 Mo)
+    format_sortie="jsonl",  # "jsonl", "entiers" (vocabulaire + arêtes en identifiants int32), "sqlite" ou "parquet"
+    top_k=None,  # Ne garder que les k voisins les plus forts de chaque tag (optionnel)
+    reducteur="max",  # Fusion des arêtes en double dans le CSR : "max", "sum" ou "mean"
+    incremental=False,  # Ne retraiter que les blocs du fichier modifiés depuis le dernier lancement
+    synonymes_file=None,  # Groupes de tags synonymes (MinHash/LSH) à détecter après le CSR (optionnel)
+    degre_max=None,  # Nombre maximal de voisins gardés par tag dans le CSR (optionnel)
+    normalisation=None,  # Repondération des hubs dans le CSR : "pmi" ou "tfidf" (optionnel)
+    degre_hub=None,  # Supprimer du CSR les arêtes des tags de degré supérieur (optionnel)
+    dimension_plongements=None,  # Dimension des plongements PPMI + SVD à calculer après le CSR (optionnel)
+    budget_memoire_mo=None,  # Budget mémoire (Mo) : taille des lots adaptée en continu (optionnel)
+    moteur="pandas"  # Lecture du TSV : "pandas" (read_csv) ou "mmap" (balayage NumPy en mémoire mappée)
 ):
     """
     Analyse le fichier HIERTAGS de manière résiliente, en sauvegardant la progression.
+
+    Si `csr_dir` est fourni, les relations sont aussi converties en stockage CSR
+    mappable en mémoire (voir `hiertags_csr.py`), lu directement par l'étape de fusion.
+
+    Avec `workers > 1`, le fichier est découpé en plages d'octets traitées en parallèle ;
+    chaque plage terminée est conservée, et une reprise ne refait que les plages inachevées.
+
+    Avec `format_sortie="entiers"`, les tags sont lus en type catégoriel et encodés par
+    dictionnaire : `<sortie>.vocab.txt` associe un identifiant int32 à chaque tag (numéro
+    de ligne) et `<sortie>.aretes.bin` stocke chaque relation une seule fois sous forme
+    d'identifiants. Les noms des tags ne sont résolus qu'à la génération du thésaurus.
+    Chaque arête y est canonique (plus petit identifiant en premier) : à la construction
+    du CSR (ou à l'indexation SQLite), les paires (a, b) et (b, a) répétées sont fusionnées
+    selon `reducteur`.
+
+    Avec `format_sortie="sqlite"`, les relations sont insérées par lots dans la base
+    `<sortie>.sqlite` (mode WAL), puis fusionnées et indexées en fin de traitement :
+    les voisins d'un tag s'obtiennent par une requête indexée (voir `hiertags_sqlite.py`).
+
+    Avec `format_sortie="parquet"` (pyarrow requis), chaque lot est écrit dans un fichier
+    Parquet brut ; en fin de traitement, les relations fusionnées sont écrites dans le jeu
+    de données `<sortie>.parquet/`, partitionné par tranche de poids, trié par tag, avec
+    des statistiques par groupe de lignes : un lecteur peut ne lire que les tags et les
+    poids qui l'intéressent (voir `hiertags_parquet.py`).
+
+    Avec `top_k`, seuls les k voisins les plus forts de chaque tag sont conservés pendant
+    la lecture (en une passe, sans reprise) : la sortie ne contient plus que ce graphe élagué.
+
+    Avec `incremental`, le fichier est découpé en blocs de `range_size` octets dont les
+    sorties sont conservées sous l'empreinte de leur contenu : lors d'une mise à jour du
+    fichier, seuls les blocs modifiés ou ajoutés sont retraités (en parallèle si `workers > 1`).
+
+    Avec `degre_max`, `normalisation` ou `degre_hub` (format `entiers` et `csr_dir`), le degré
+    de chaque tag est calculé à la construction du CSR : les arêtes des hubs peuvent être
+    supprimées ou repondérées (PMI, TF-IDF) et chaque tag limité à ses `degre_max` voisins
+    les plus forts (voir `hiertags_elagage.py`).
+
+    Avec `synonymes_file` (et `csr_dir`), une signature MinHash de l'ensemble des voisins
+    de chaque tag est calculée sur le stockage CSR ; un index LSH en déduit les groupes
+    de tags quasi synonymes, enregistrés en JSON (voir `synonymes_minhash.py`).
+
+    Avec `dimension_plongements` (et `csr_dir`), la matrice de co-occurrence est factorisée
+    (PPMI + SVD tronquée randomisée) en vecteurs float16 enregistrés dans le stockage CSR,
+    pour chercher les tags les plus proches d'un mot quelconque (voir `plongements_tags.py`).
+
+    Avec `budget_memoire_mo`, `chunk_size` n'est plus que la taille du premier lot : après
+    chaque lot, la mémoire résidente et le débit sont mesurés et la taille du lot suivant
+    est ajustée pour maximiser le débit sans dépasser le budget (voir `hiertags_memoire.py`).
+    En mode parallèle, le budget est partagé entre les processus.
+
+    Avec `moteur="mmap"`, le TSV est projeté en mémoire et analysé par balayages NumPy des
+    octets (fins de ligne, tabulations, poids) ; seuls les tags des lignes au-dessus de
+    `min_weight` sont décodés (voir `hiertags_mmap.py`). Les relations produites sont les
+    mêmes qu'avec `pandas` pour les lignes `tag<TAB>tag<TAB>poids` dont le poids est un
+    nombre écrit avec au plus 15 chiffres (zéros de tête compris), ainsi que pour les lots
+    confiés à `read_csv` (champ entre guillemets, champs manquants ou en trop). Elles
+    diffèrent dans les cas suivants :
+
+    - tags d'allure numérique (`007`) avec les formats autres que `entiers` : `mmap` les
+      garde tels quels, alors que `read_csv` lit `7` si toute la colonne du lot est numérique ;
+    - poids de plus de 15 chiffres : `mmap` les arrondit comme `float()`, l'analyseur par
+      défaut de `read_csv` peut s'en écarter sur les derniers chiffres ;
+    - poids non numérique (`1,5`) : `mmap` le lit comme NaN et écarte la ligne, alors que
+      `read_csv` lit toute la colonne du lot comme du texte et le filtre `min_weight` échoue.
+
+    Un fichier d'entrée compressé (gzip, xz ou zstd, reconnu à son contenu) est décompressé
+    en flux, sans copie décompressée sur disque (voir `hiertags_compression.py`). Il est
+    alors toujours traité entièrement, par un seul processus.
     """
-    start_line = 0
-    
-    # Logique de reprise
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            try:
-                start_line = int(f.read().strip())
-                print(f"🔄 Reprise du traitement à partir de la ligne {start_line}...")
-            except ValueError:
-                print("⚠️ Fichier de progression invalide, recommencement.")
-                start_line = 0
-    else:
-        # Si le fichier de sortie existe mais pas le fichier de progression, on nettoie
-        if os.path.exists(output_filename):
-            os.remove(output_filename)
-            print("🧹 Nettoyage du fichier de sortie précédent.")
+    sortie = creer_sortie(format_sortie, output_filename)
+    if reducteur not in REDUCTEURS:
+        raise ValueError(f"Agrégation inconnue : '{reducteur}' (attendu : {', '.join(REDUCTEURS)})")
+    if normalisation is not None and normalisation not in NORMALISATIONS:
+        raise ValueError(f"Normalisation inconnue : '{normalisation}' (attendu : {', '.join(NORMALISATIONS)})")
+    if moteur not in MOTEURS:
+        raise ValueError(f"Moteur de lecture inconnu : '{moteur}' (attendu : {', '.join(MOTEURS)})")
+    elagage = {"degre_max": degre_max, "normalisation": normalisation, "degre_hub": degre_hub}
+
+    if top_k:
+        try:
+            print(f"📊 Sélection des {top_k} meilleurs voisins par tag dans '{input_filename}'...")
+            _process_hiertags_top_k(input_filename, output_filename, format_sortie,
+                                    min_weight, chunk_size, top_k, budget_memoire_mo, moteur, reducteur)
+        except FileNotFoundError:
+            print(f"❌ ERREUR: Fichier '{input_filename}' non trouvé.")
+            print("Téléchargez-le depuis : https://www.ims.uni-stuttgart.de/en/research/resources/corpora/HierTags/")
+            return
+        except KeyboardInterrupt:
+            print("\n⏸️ Interruption détectée. Ce mode ne conserve pas de progression : relancez le script.")
+            return
+        except Exception as e:
+            print(f"❌ Une erreur est survenue : {e}")
+            return
+
+        _terminer(sortie, csr_dir, reducteur, synonymes_file, elagage, dimension_plongements)
+        return
+
+    if ((workers > 1 or incremental) and os.path.exists(input_filename)
+            and detecter_compression(input_filename)):
+        print("ℹ️ Entrée compressée : pas de découpage en plages, traitement séquentiel complet.")
+        workers, incremental = 1, False
+
+    if workers > 1 or incremental:
+        try:
+            if incremental:
+                print(f"📊 Traitement incrémental de '{input_filename}'...")
+                _process_hiertags_incremental(input_filename, output_filename, format_sortie,
+                                              min_weight, chunk_size, workers, range_size,
+                                              budget_memoire_mo, moteur)
+            else:
+                print(f"📊 Traitement parallèle de '{input_filename}'...")
+                _process_hiertags_parallele(input_filename, output_filename, format_sortie,
+                                            min_weight, chunk_size, workers, range_size,
+                                            budget_memoire_mo, moteur)
+        except FileNotFoundError:
+            print(f"❌ ERREUR: Fichier '{input_filename}' non trouvé.")
+            print("Téléchargez-le depuis : https://www.ims.uni-stuttgart.de/en/research/resources/corpora/HierTags/")
+            return
+        except KeyboardInterrupt:
+            print("\n⏸️ Interruption détectée. Les plages terminées sont conservées.")
+            print("Vous pouvez relancer le script pour reprendre le traitement.")
+            return
+        except Exception as e:
+            print(f"❌ Une erreur est survenue : {e}")
+            print("Les plages terminées sont conservées. Vous pouvez relancer le script.")
+            return
+
+        _terminer(sortie, csr_dir, reducteur, synonymes_file, elagage, dimension_plongements)
+        return
+
+    processed_count = 0
 
     try:
         print(f"📊 Chargement du jeu de données '{input_filename}' par lots...")
+        taille = os.path.getsize(input_filename)
         
-        # Lecture par chunks pour économiser la mémoire
-        iterator = pd.read_csv(
-            input_filename, 
-            sep='\t', 
-            header=None, 
-            names=['tag1', 'tag2', 'weight'],
-            chunksize=chunk_size,
-            skiprows=range(1, start_line + 1) if start_line > 0 else None
-        )
-        
-        processed_count = start_line
-        
-        # Écriture en mode append
-        with open(output_filename, 'a', encoding='utf-8') as f:
-            for i, chunk in enumerate(iterator):
-                # Filtrer par poids minimum
-                chunk_filtered = chunk[chunk['weight'] >= min_weight]
-                
-                for row in chunk_filtered.itertuples(index=False):
-                    tag1, tag2, weight = str(row.tag1), str(row.tag2), float(row.weight)
-                    
-                    # Écrire une ligne JSON pour chaque relation (bidirectionnelle)
-                    relation1 = {"tag": tag1, "related": tag2, "weight": weight}
-                    relation2 = {"tag": tag2, "related": tag1, "weight": weight}
-                    
-                    f.write(json.dumps(relation1, ensure_ascii=False) + '\n')
-                    f.write(json.dumps(relation2, ensure_ascii=False) + '\n')
-                
-                processed_count += len(chunk)
-                
-                # Sauvegarde de la progression
-                with open(progress_file, 'w') as pf:
-                    pf.write(str(processed_count))
-                
-                print(f"  ✅ Lot {i+1} traité. Total de lignes analysées : {processed_count:,}")
+        # Lecture par lots ; la reprise repart directement de l'offset enregistré
+        # et tronque la sortie à la dernière longueur validée
+        lots = _traiter_lots(input_filename, 0, taille, sortie, progress_file,
+                             min_weight, chunk_size, budget_memoire_mo, moteur)
+        for i, processed_count in enumerate(lots):
+            print(f"  ✅ Lot {i+1} traité. Total de lignes analysées : {processed_count:,}")
                 
     except FileNotFoundError:
         print(f"❌ ERREUR: Fichier '{input_filename}' non trouvé.")
@@ -86,8 +528,19 @@ def process_hiertags_resilient(
         os.remove(progress_file)
         print("🧹 Fichier de progression supprimé (traitement terminé).")
     
-    print(f"\n🎉 Traitement terminé avec succès !")
-    print(f"📁 Données sauvegardées dans '{output_filename}'")
+    _terminer(sortie, csr_dir, reducteur, synonymes_file, elagage, dimension_plongements)
 
 if __name__ == "__main__":
-    process_hiertags_resilient()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Traitement résilient des données HIERTAGS")
+    parser.add_argument("input_filename", nargs="?", default="flickr_tag_co-occurrence_network.tsv")
+    parser.add_argument("--budget-memoire", "--memory-budget", dest="budget_memoire_mo", type=float,
+                        default=None, help="Budget mémoire en Mo : taille des lots adaptée en continu")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Taille (initiale) des lots")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus")
+    parser.add_argument("--moteur", "--engine", dest="moteur", choices=MOTEURS, default="pandas",
+                        help="Lecture du TSV : pandas (read_csv) ou mmap (balayage NumPy)")
+    args = parser.parse_args()
+    process_hiertags_resilient(input_filename=args.input_filename, chunk_size=args.chunk_size,
+                               workers=args.workers, budget_memoire_mo=args.budget_memoire_mo,
+                               moteur=args.moteur)
\ No newline at end of file
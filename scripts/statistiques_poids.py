@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Statistiques des poids HIERTAGS pour choisir le seuil `min_weight` sans relancer l'ingestion.
+
+Le fichier TSV (éventuellement compressé) est lu une seule fois. On construit :
+
+- un histogramme fin des poids (pas de 1/`resolution`), accompagné de la taille de la
+  sortie JSONL correspondant à chaque classe : le nombre de relations conservées, la taille
+  des sorties et la mémoire nécessaire s'en déduisent pour n'importe quel seuil ;
+- le poids maximal de chaque tag, qui donne le nombre de tags conservés (et la taille du
+  vocabulaire) pour n'importe quel seuil ;
+- pour chaque tag, le nombre de relations dans quelques classes de poids grossières
+  (`seuils`), regroupé en fin de lecture par tranche de degré (1, 2-3, 4-7, ...) : on voit
+  ainsi quels tags perdent leurs relations quand le seuil monte.
+
+Les statistiques sont enregistrées en JSON ; `estimer_seuil` les interroge ensuite
+pour un seuil quelconque sans relire le fichier.
+"""
+
+import json
+import math
+import os
+from json.encoder import encode_basestring
+
+import numpy as np
+import pandas as pd
+
+from hiertags_compression import lire_lots
+from hiertags_sorties import ARETE, Vocabulaire
+
+# Seuils candidats des classes grossières (relations par tag et par tranche de degré)
+SEUILS = (0.0, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75)
+
+# Octets d'une ligne JSONL hors tags et poids : {"tag": , "related": , "weight": }\n
+OCTETS_LIGNE_JSONL = len('{"tag": , "related": , "weight": }\n')
+
+# Stockage CSR : identifiant du voisin (int32) et poids (float32), dans les deux sens
+OCTETS_ARETE_CSR = 2 * (4 + 4)
+
+# Dictionnaire Python de `process_hiertags_complet` (mesuré sur un graphe de 900 000 relations)
+OCTETS_RELATION_DICT = 60
+
+
+class _Tableau:
+    """Tableau NumPy agrandi à la demande le long de son premier axe."""
+
+    def __init__(self, dtype, colonnes=(), valeur=0):
+        self.valeur = valeur
+        self.donnees = np.full((1024,) + tuple(colonnes), valeur, dtype=dtype)
+
+    def reserver(self, taille):
+        if taille > len(self.donnees):
+            nouveau = np.full((max(taille, 2 * len(self.donnees)),) + self.donnees.shape[1:],
+                              self.valeur, dtype=self.donnees.dtype)
+            nouveau[:len(self.donnees)] = self.donnees
+            self.donnees = nouveau
+        return self.donnees
+
+
+def _longueurs_json(noms):
+    """Longueur en octets (UTF-8) de chaque tag encodé en chaîne JSON."""
+    return np.fromiter((len(encode_basestring(nom).encode('utf-8')) for nom in noms),
+                       dtype=np.int64, count=len(noms))
+
+
+def collecter_statistiques(input_filename, chunk_size=500000, resolution=10000, poids_max=100.0,
+                           seuils=SEUILS):
+    """
+    Lit le fichier une fois et renvoie ses statistiques de poids (dictionnaire sérialisable en JSON).
+
+    L'histogramme fin compte les relations par classe [i/resolution, (i+1)/resolution) ;
+    les poids supérieurs à `poids_max` sont regroupés dans la dernière classe. Les lignes
+    de poids négatif ou manquant, qu'aucun seuil positif ne conserve, sont seulement comptées.
+    """
+    n_classes = int(round(poids_max * resolution)) + 1
+    bornes = np.asarray(seuils, dtype=np.float64)
+    histogramme = np.zeros(n_classes, dtype=np.int64)
+    octets_jsonl = np.zeros(n_classes, dtype=np.int64)
+
+    vocab = Vocabulaire()
+    longueurs = _Tableau(np.int64)
+    poids_maxi = _Tableau(np.float64, valeur=-np.inf)
+    par_tag = _Tableau(np.int64, colonnes=(len(bornes),))
+    lignes = invalides = 0
+    taille = os.path.getsize(input_filename)
+
+    print(f"📊 Analyse des poids de '{input_filename}'...")
+    for chunk, position in lire_lots(input_filename, chunk_size, categoriel=True):
+        lignes += len(chunk)
+        poids = chunk['weight'].to_numpy(dtype=np.float64)
+        valides = poids >= 0
+        invalides += int((~valides).sum())
+        chunk, poids = chunk[valides], poids[valides]
+
+        ids1, nouveaux = vocab.identifiants(chunk['tag1'])
+        longueurs.reserver(len(vocab))[len(vocab) - len(nouveaux):len(vocab)] = _longueurs_json(nouveaux)
+        ids2, nouveaux = vocab.identifiants(chunk['tag2'])
+        longueurs.reserver(len(vocab))[len(vocab) - len(nouveaux):len(vocab)] = _longueurs_json(nouveaux)
+        ids = np.concatenate((ids1, ids2))
+
+        # Histogramme fin et taille JSONL (deux lignes par relation) de chaque classe
+        classes = np.minimum(np.floor(poids * resolution), n_classes - 1).astype(np.int64)
+        codes_poids, valeurs = pd.factorize(poids)
+        longueurs_poids = np.fromiter(map(len, map(float.__repr__, valeurs.tolist())),
+                                      dtype=np.int64, count=len(valeurs))
+        octets = 2 * (OCTETS_LIGNE_JSONL + longueurs.donnees[ids1] + longueurs.donnees[ids2]
+                      + longueurs_poids[codes_poids])
+        histogramme += np.bincount(classes, minlength=n_classes)
+        octets_jsonl += np.bincount(classes, weights=octets, minlength=n_classes).astype(np.int64)
+
+        # Poids maximal de chaque tag et relations par tag dans les classes grossières
+        np.maximum.at(poids_maxi.reserver(len(vocab)), ids, np.concatenate((poids, poids)))
+        grossieres = np.searchsorted(bornes, poids, side='right') - 1
+        grossieres = np.concatenate((grossieres, grossieres))
+        cles = ids.astype(np.int64)[grossieres >= 0] * len(bornes) + grossieres[grossieres >= 0]
+        comptes = np.bincount(cles, minlength=len(vocab) * len(bornes))
+        par_tag.reserver(len(vocab))[:len(vocab)] += comptes.reshape(len(vocab), len(bornes))
+
+        print(f"  {lignes:,} lignes lues ({position / max(taille, 1):.0%})")
+
+    n_tags = len(vocab)
+    poids_maxi = poids_maxi.donnees[:n_tags]
+    par_tag = par_tag.donnees[:n_tags]
+
+    # Tags conservés par classe fine : un tag reste tant que son poids maximal atteint le seuil
+    classes_tags = np.minimum(np.floor(poids_maxi * resolution), n_classes - 1).astype(np.int64)
+    octets_vocabulaire = np.array([len(nom.encode('utf-8')) + 1 for nom in vocab.noms], dtype=np.int64)
+
+    # Regroupement par tranche de degré : [1], [2, 3], [4, 7], ...
+    degres = par_tag.sum(axis=1)
+    tranches_tags = np.floor(np.log2(np.maximum(degres, 1))).astype(np.int64)
+    conserves_tag = np.cumsum(par_tag[:, ::-1], axis=1)[:, ::-1]  # Relations de poids >= chaque seuil
+    tranches = []
+    for tranche in np.unique(tranches_tags[degres > 0]).tolist():
+        membres = (tranches_tags == tranche) & (degres > 0)
+        tranches.append({
+            "degre_min": 2 ** tranche,
+            "degre_max": 2 ** (tranche + 1) - 1,
+            "tags": int(membres.sum()),
+            "relations": int(degres[membres].sum()),
+            "relations_conservees": conserves_tag[membres].sum(axis=0).tolist(),
+            "tags_conserves": (conserves_tag[membres] > 0).sum(axis=0).tolist(),
+        })
+
+    dernier = int(np.flatnonzero(histogramme)[-1]) + 1 if histogramme.any() else 0
+    stats = {
+        "fichier": input_filename,
+        "lignes": lignes,
+        "invalides": invalides,
+        "tags": n_tags,
+        "resolution": resolution,
+        "histogramme": histogramme[:dernier].tolist(),
+        "octets_jsonl": octets_jsonl[:dernier].tolist(),
+        "histogramme_tags": np.bincount(classes_tags, minlength=dernier)[:dernier].tolist(),
+        "octets_vocabulaire": np.bincount(classes_tags, weights=octets_vocabulaire,
+                                          minlength=dernier)[:dernier].astype(np.int64).tolist(),
+        "seuils": bornes.tolist(),
+        "tranches_degre": tranches,
+    }
+    print(f"✅ {lignes:,} lignes, {n_tags:,} tags analysés.")
+    return stats
+
+
+def estimer_seuil(stats, seuil):
+    """
+    Estime, pour `min_weight = seuil`, le nombre de relations et de tags conservés, la taille
+    des sorties et la mémoire nécessaire aux différents traitements.
+
+    Le résultat est exact pour un seuil multiple de 1/`resolution` ; sinon le seuil est
+    arrondi à la classe supérieure. Les relations en double dans le fichier sont comptées
+    autant de fois qu'elles apparaissent : les tailles du stockage CSR et du dictionnaire
+    sont donc des majorants.
+    """
+    debut = max(math.ceil(seuil * stats["resolution"] - 1e-9), 0)
+    relations = sum(stats["histogramme"][debut:])
+    tags = sum(stats["histogramme_tags"][debut:])
+    octets_vocabulaire = sum(stats["octets_vocabulaire"][debut:])
+    return {
+        "seuil": seuil,
+        "relations": relations,
+        "part_relations": relations / max(stats["lignes"], 1),
+        "tags": tags,
+        "octets_jsonl": sum(stats["octets_jsonl"][debut:]),
+        "octets_entiers": relations * ARETE.itemsize + octets_vocabulaire,
+        "memoire_csr": relations * OCTETS_ARETE_CSR + 8 * (tags + 1) + octets_vocabulaire,
+        "memoire_dict": relations * OCTETS_RELATION_DICT,
+    }
+
+
+def _taille(octets):
+    """Taille lisible (o, Ko, Mo, Go)."""
+    for unite in ('o', 'Ko', 'Mo', 'Go'):
+        if octets < 1024 or unite == 'Go':
+            return f"{octets:.0f} {unite}" if unite == 'o' else f"{octets:.1f} {unite}"
+        octets /= 1024
+
+
+def afficher_rapport(stats, seuils=None):
+    """Affiche les estimations pour chaque seuil candidat, puis la survie des relations par tranche de degré."""
+    seuils = stats["seuils"] if seuils is None else seuils
+    print(f"\n{'seuil':>8} {'relations':>14} {'part':>6} {'tags':>10} {'JSONL':>11} "
+          f"{'entiers':>11} {'CSR':>11} {'dict':>11}")
+    for seuil in seuils:
+        e = estimer_seuil(stats, seuil)
+        print(f"{seuil:>8g} {e['relations']:>14,} {e['part_relations']:>6.1%} {e['tags']:>10,} "
+              f"{_taille(e['octets_jsonl']):>11} {_taille(e['octets_entiers']):>11} "
+              f"{_taille(e['memoire_csr']):>11} {_taille(e['memoire_dict']):>11}")
+
+    print("\nRelations conservées par tranche de degré (tags gardant au moins une relation) :")
+    print(f"{'degré':>15} {'tags':>10} " + " ".join(f"{'>= ' + format(s, 'g'):>16}" for s in stats["seuils"]))
+    for tranche in stats["tranches_degre"]:
+        cellules = [f"{c / max(tranche['relations'], 1):>6.1%} ({t / max(tranche['tags'], 1):>6.1%})"
+                    for c, t in zip(tranche["relations_conservees"], tranche["tags_conserves"])]
+        print(f"{tranche['degre_min']:>7,}-{tranche['degre_max']:<7,} {tranche['tags']:>10,} "
+              + " ".join(f"{c:>16}" for c in cellules))
+
+
+def statistiques_poids(input_filename="flickr_tag_co-occurrence_network.tsv",
+                       output_filename="hiertags_stats.json",
+                       seuils=None,  # Seuils à afficher (par défaut, les classes grossières)
+                       chunk_size=500000):
+    """Analyse les poids du fichier HIERTAGS, enregistre les statistiques en JSON et affiche le rapport."""
+    if os.path.exists(output_filename):
+        with open(output_filename, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        if (stats.get("fichier") == input_filename and os.path.exists(input_filename)
+                and os.path.getmtime(output_filename) >= os.path.getmtime(input_filename)):
+            print(f"📊 Statistiques reprises de '{output_filename}'.")
+            afficher_rapport(stats, seuils)
+            return stats
+
+    stats = collecter_statistiques(input_filename, chunk_size)
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+    print(f"💾 Statistiques sauvegardées dans '{output_filename}'.")
+    afficher_rapport(stats, seuils)
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        statistiques_poids(sys.argv[1], seuils=[float(s) for s in sys.argv[2:]] or None)
+    else:
+        statistiques_poids()
\ No newline at end of file
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Détection des hashtags quasi synonymes (MinHash + LSH) à partir du stockage CSR.
+
+Deux tags dont les ensembles de voisins se recouvrent presque entièrement (`bnw`,
+`blackandwhite`, `bnwphotography`...) sont des variantes d'un même hashtag. Plutôt que
+de comparer tous les couples de tags (O(n²)), chaque tag reçoit une signature MinHash
+de son ensemble de voisins ; le découpage de ces signatures en bandes (LSH) ne propose
+que les couples susceptibles d'être similaires, dont la similarité de Jaccard estimée
+est ensuite vérifiée. Les groupes se forment autour d'un représentant, le tag le plus
+fortement relié : chaque membre est similaire au représentant lui-même (et pas seulement
+par une chaîne de couples), et la taille des groupes est bornée.
+"""
+
+import json
+
+import numpy as np
+from hiertags_csr import RelationsCSR
+
+
+def signatures_minhash(relations, n_hachages=64, degre_min=3, graine=0, voisins_par_bloc=10000000):
+    """
+    Calcule la signature MinHash (n_tags × n_hachages, uint32) de l'ensemble des voisins de chaque tag.
+
+    Les tags ayant moins de `degre_min` voisins ne reçoivent pas de signature (trop peu
+    d'information pour juger d'une synonymie) : le masque des tags signés est renvoyé
+    avec les signatures. Les voisins sont traités par blocs de tags consécutifs.
+    """
+    # Hachage « multiply-shift » : 32 bits de poids fort de (a·x + b) mod 2^64, a impair
+    rng = np.random.default_rng(graine)
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=n_hachages, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=n_hachages, dtype=np.uint64, endpoint=True)
+
+    offsets = np.asarray(relations.offsets)
+    degres = np.diff(offsets)
+    valides = degres >= degre_min
+    signatures = np.zeros((len(relations), n_hachages), dtype=np.uint32)
+
+    debut = 0
+    while debut < len(relations):
+        # Bloc de tags dont les voisins tiennent dans `voisins_par_bloc` valeurs
+        fin = int(np.searchsorted(offsets, offsets[debut] + voisins_par_bloc, side='right')) - 1
+        fin = min(max(fin, debut + 1), len(relations))
+        # Un segment par tag ayant des voisins (les tags sans voisins n'occupent aucune place)
+        non_vides = np.flatnonzero(degres[debut:fin] > 0) + debut
+        signes = valides[non_vides]
+        if signes.any():
+            voisins = np.asarray(relations.voisins_ids[offsets[debut]:offsets[fin]], dtype=np.uint64)
+            debuts_segments = offsets[non_vides] - offsets[debut]
+            for h in range(n_hachages):
+                valeurs = (a[h] * voisins + b[h]) >> np.uint64(32)
+                minimums = np.minimum.reduceat(valeurs, debuts_segments)[signes]
+                signatures[non_vides[signes], h] = minimums.astype(np.uint32)
+        debut = fin
+
+    return signatures, valides
+
+
+def paires_candidates(signatures, valides, bandes=16, taille_max_seau=50):
+    """
+    Découpe les signatures en `bandes` et renvoie les couples (i, j), i < j, de tags ayant
+    au moins une bande identique. Les seaux de plus de `taille_max_seau` tags sont ignorés.
+    """
+    n_hachages = signatures.shape[1]
+    lignes = n_hachages // bandes
+    tags = np.flatnonzero(valides)
+    paires = []
+
+    for bande in range(bandes):
+        bloc = signatures[tags, bande * lignes:(bande + 1) * lignes].astype(np.uint64)
+        # Clé de seau : mélange des valeurs de la bande (de type FNV-1a sur 64 bits)
+        cles = np.full(len(tags), 0xCBF29CE484222325, dtype=np.uint64)
+        for colonne in bloc.T:
+            cles = (cles ^ colonne) * np.uint64(0x100000001B3)
+
+        ordre = np.argsort(cles, kind='stable')
+        cles_triees = cles[ordre]
+        debuts = np.flatnonzero(np.r_[True, cles_triees[1:] != cles_triees[:-1]])
+        tailles = np.diff(np.r_[debuts, len(cles_triees)])
+        for debut, taille in zip(debuts[(tailles > 1) & (tailles <= taille_max_seau)],
+                                 tailles[(tailles > 1) & (tailles <= taille_max_seau)]):
+            membres = tags[ordre[debut:debut + taille]]
+            i, j = np.triu_indices(taille, k=1)
+            paires.append(np.column_stack((membres[i], membres[j])))
+
+    if not paires:
+        return np.empty((0, 2), dtype=np.int64)
+    paires = np.sort(np.concatenate(paires), axis=1)
+    return np.unique(paires, axis=0)
+
+
+def grouper_synonymes(relations, signatures, paires, seuil=0.5, taille_max=10):
+    """
+    Garde les couples dont la similarité de Jaccard estimée atteint `seuil` et renvoie
+    des groupes de synonymes, triés par taille décroissante.
+
+    Les tags sont pris par somme des poids de leurs relations décroissante : le plus fort
+    des tags encore libres devient représentant, et son groupe reçoit ceux de ses couples
+    retenus encore libres, les plus similaires d'abord, dans la limite de `taille_max` tags.
+    Chaque membre atteint donc le seuil avec le représentant, qui ouvre le groupe : une
+    chaîne A~B, B~C ne suffit pas à réunir A et C.
+    """
+    similarites = (signatures[paires[:, 0]] == signatures[paires[:, 1]]).mean(axis=1)
+    retenues = similarites >= seuil
+    paires, similarites = paires[retenues], similarites[retenues]
+    if not len(paires):
+        return []
+
+    voisins = {}
+    for (i, j), similarite in zip(paires.tolist(), similarites.tolist()):
+        voisins.setdefault(i, []).append((-similarite, j))
+        voisins.setdefault(j, []).append((-similarite, i))
+
+    def force(tag):
+        return float(relations.poids[relations.offsets[tag]:relations.offsets[tag + 1]].sum())
+
+    forces = {tag: force(tag) for tag in voisins}
+    ordre = sorted(voisins, key=lambda tag: (-forces[tag], relations.nom(tag)))
+    groupes, groupes_de = [], set()
+    for representant in ordre:
+        if representant in groupes_de:
+            continue
+        membres = [tag for _, tag in sorted(voisins[representant]) if tag not in groupes_de]
+        membres = membres[:taille_max - 1]
+        if not membres:
+            continue
+        groupes_de.update(membres)
+        groupes_de.add(representant)
+        membres.sort(key=lambda tag: (-forces[tag], relations.nom(tag)))
+        groupes.append([relations.nom(tag) for tag in [representant] + membres])
+    return sorted(groupes, key=lambda groupe: (-len(groupe), groupe[0]))
+
+
+def detecter_synonymes(csr_dir="hiertags_csr", output_filename="hiertags_synonymes.json",
+                       n_hachages=64, bandes=16, seuil=0.5, degre_min=3, taille_max=10):
+    """Détecte les groupes de hashtags synonymes du stockage CSR et les enregistre en JSON."""
+    print(f"🔍 Détection des synonymes (MinHash {n_hachages} hachages, {bandes} bandes, seuil {seuil})...")
+    relations = RelationsCSR(csr_dir)
+    signatures, valides = signatures_minhash(relations, n_hachages, degre_min)
+    paires = paires_candidates(signatures, valides, bandes)
+    groupes = grouper_synonymes(relations, signatures, paires, seuil, taille_max)
+
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump({"parametres": {"n_hachages": n_hachages, "bandes": bandes, "seuil": seuil,
+                                  "degre_min": degre_min, "taille_max": taille_max},
+                   "groupes": groupes}, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ {len(groupes):,} groupes de synonymes ({len(paires):,} couples candidats) "
+          f"sauvegardés dans '{output_filename}'.")
+    return groupes
+
+
+if __name__ == "__main__":
+    detecter_synonymes()
\ No newline at end of file
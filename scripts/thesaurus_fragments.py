@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Découpage du thésaurus de hashtags en fragments chargés à la demande par le client.
+
+`HashtagManager` (public/script.js) retient une entrée du thésaurus si sa clé, ou sa forme
+normalisée (voir `automate_thesaurus.normaliser`), apparaît dans le texte normalisé : une
+clé ne peut donc correspondre que si le préfixe de sa forme normalisée (ses
+`longueur_prefixe` premiers caractères) apparaît aussi dans le texte. Les entrées sont
+regroupées par préfixe, puis les préfixes (triés) sont réunis en fragments
+d'environ `entrees_par_fragment` entrées ; le client ne télécharge que les fragments dont
+l'un des préfixes figure dans le texte.
+
+Le dossier produit contient :
+
+- `manifest.json` : longueur des préfixes, noms des fragments, fragment de chaque préfixe et
+  empreinte des clés (la même que celle de l'automate des clés, pour vérifier leur accord) ;
+- `fragment.<empreinte>.json` : entrées du thésaurus (même format que le fichier complet),
+  nommées d'après l'empreinte SHA-256 de leur contenu : un fragment inchangé garde son nom
+  (et reste dans le cache du navigateur) d'une génération à l'autre.
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+from automate_thesaurus import empreinte_cles, normaliser
+
+FICHIER_MANIFESTE = 'manifest.json'
+
+
+def _nom_fragment(contenu):
+    return f"fragment.{hashlib.sha256(contenu).hexdigest()[:16]}.json"
+
+
+def ecrire_fragments(thesaurus, dossier,
+                     longueur_prefixe=4,  # Caractères de clé déterminant le fragment
+                     entrees_par_fragment=64):  # Taille visée des fragments (en entrées)
+    """
+    Écrit `thesaurus` ({clé: {"p": priorité, "h": hashtags}}) en fragments dans `dossier`,
+    avec son manifeste. Les fragments qui ne sont plus référencés sont supprimés après
+    l'écriture du nouveau manifeste.
+    """
+    par_prefixe = defaultdict(dict)
+    for cle, entree in thesaurus.items():
+        par_prefixe[normaliser(cle)[:longueur_prefixe]][cle] = entree
+
+    # Préfixes consécutifs réunis jusqu'à atteindre la taille visée
+    groupes, courant, taille = [], [], 0
+    for prefixe in sorted(par_prefixe):
+        courant.append(prefixe)
+        taille += len(par_prefixe[prefixe])
+        if taille >= entrees_par_fragment:
+            groupes.append(courant)
+            courant, taille = [], 0
+    if courant:
+        groupes.append(courant)
+
+    os.makedirs(dossier, exist_ok=True)
+    fragments, prefixes = [], {}
+    for numero, groupe in enumerate(groupes):
+        # Les clés d'un même préfixe gardent l'ordre du thésaurus
+        entrees = {cle: entree for prefixe in groupe for cle, entree in par_prefixe[prefixe].items()}
+        contenu = json.dumps(entrees, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        nom = _nom_fragment(contenu)
+        chemin = os.path.join(dossier, nom)
+        if not os.path.exists(chemin):
+            with open(chemin + '.tmp', 'wb') as f:
+                f.write(contenu)
+            os.replace(chemin + '.tmp', chemin)
+        fragments.append(nom)
+        prefixes.update(dict.fromkeys(groupe, numero))
+
+    manifeste = {"version": 1, "longueur_prefixe": longueur_prefixe, "entrees": len(thesaurus),
+                 "empreinte_cles": empreinte_cles(thesaurus),
+                 "fragments": fragments, "prefixes": prefixes}
+    chemin_manifeste = os.path.join(dossier, FICHIER_MANIFESTE)
+    with open(chemin_manifeste + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(chemin_manifeste + '.tmp', chemin_manifeste)
+
+    for nom in os.listdir(dossier):
+        if nom.startswith('fragment.') and nom not in fragments:
+            os.remove(os.path.join(dossier, nom))
+    print(f"🧩 Thésaurus découpé en {len(fragments)} fragments ({len(prefixes):,} préfixes) dans '{dossier}'.")
+    return manifeste
\ No newline at end of file